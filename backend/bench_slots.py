@@ -0,0 +1,111 @@
+# backend/bench_slots.py
+# ─────────────────────────────────────────────────
+# Slot üretimi mikro-benchmark
+#
+#   cd backend && python bench_slots.py [--days 90] [--busy 400] [--slot 15]
+#
+# Karşılaştırılanlar:
+#   legacy : eski döngü (her slot × her busy, her seferinde fromisoformat)
+#   sweep  : parse + merge + tek geçiş (services.calendar_service)
+#   numpy  : vektörel searchsorted yolu (numpy kuruluysa)
+# ─────────────────────────────────────────────────
+
+import argparse, random, sys, os, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from services import calendar_service as cs
+
+
+def _make_busy(from_date: datetime, days: int, n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        d = rnd.randrange(days)
+        start = from_date + timedelta(days=d, minutes=rnd.randrange(8 * 60, 19 * 60, 15))
+        end = start + timedelta(minutes=rnd.choice([15, 30, 45, 60, 90, 120]))
+        out.append({
+            "start": start.replace(tzinfo=cs.TR_TZ).isoformat(),
+            "end": end.replace(tzinfo=cs.TR_TZ).isoformat(),
+        })
+    return out
+
+
+def legacy(from_date, days, start_min, end_min, slot_minutes, busy_list, now_naive):
+    slots = []
+    for d in range(days):
+        day = from_date + timedelta(days=d)
+        if day.date() < now_naive.date():
+            continue
+        for m in range(start_min, end_min, slot_minutes):
+            h, mn = divmod(m, 60)
+            slot_start = day.replace(hour=h, minute=mn, second=0, microsecond=0)
+            slot_end = slot_start + timedelta(minutes=slot_minutes)
+            if slot_start <= now_naive:
+                continue
+            overlap = False
+            for b in busy_list:
+                b_start = cs._parse_api_time_to_tr_naive(b.get("start", ""))
+                b_end = cs._parse_api_time_to_tr_naive(b.get("end", ""))
+                if b_start is None or b_end is None:
+                    continue
+                if slot_start < b_end and slot_end > b_start:
+                    overlap = True
+                    break
+            if not overlap:
+                slots.append(slot_start)
+    return slots
+
+
+def sweep(from_date, days, start_min, end_min, slot_minutes, busy_list, now_naive, use_numpy):
+    saved = cs._NUMPY_AVAILABLE
+    cs._NUMPY_AVAILABLE = use_numpy
+    try:
+        busy = cs._parse_busy(busy_list)
+        return cs.generate_free_slots(from_date, days, start_min, end_min, slot_minutes, busy, now_naive)
+    finally:
+        cs._NUMPY_AVAILABLE = saved
+
+
+def _timeit(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--busy", type=int, default=400)
+    ap.add_argument("--slot", type=int, default=15)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from_date = datetime(2030, 1, 1)
+    now_naive = from_date
+    start_min, end_min = 9 * 60, 18 * 60
+    busy_list = _make_busy(from_date, args.days, args.busy)
+    common = (from_date, args.days, start_min, end_min, args.slot, busy_list, now_naive)
+
+    print(f"days={args.days} busy={args.busy} slot={args.slot}dk")
+    t_legacy, r_legacy = _timeit(lambda: legacy(*common), args.repeat)
+    print(f"  legacy : {t_legacy * 1000:9.2f} ms  ({len(r_legacy)} slot)")
+
+    t_sweep, r_sweep = _timeit(lambda: sweep(*common, use_numpy=False), args.repeat)
+    assert r_sweep == r_legacy, "sweep sonucu legacy ile aynı değil"
+    print(f"  sweep  : {t_sweep * 1000:9.2f} ms  (x{t_legacy / t_sweep:.0f})")
+
+    if cs._NUMPY_AVAILABLE:
+        t_np, r_np = _timeit(lambda: sweep(*common, use_numpy=True), args.repeat)
+        assert r_np == r_legacy, "numpy sonucu legacy ile aynı değil"
+        print(f"  numpy  : {t_np * 1000:9.2f} ms  (x{t_legacy / t_np:.0f})")
+    else:
+        print("  numpy  : (kurulu değil)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # backend/config.py
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -12,15 +13,90 @@ FAL_API_KEY = os.getenv("FAL_API_KEY")
 FAL_STT_URL = "https://fal.run/freya-mypsdi253hbk/freya-stt/audio/transcriptions"
 FAL_TTS_URL = "https://fal.run/freya-mypsdi253hbk/freya-tts/audio/speech"
 FAL_LLM_URL = "https://fal.run/openrouter/router"
+FAL_LLM_STREAM_URL = FAL_LLM_URL + "/stream"  # SSE: token token cevap
+
+# Paylasilan HTTP istemcisi (services/http_client.py)
+# Tek process = tek baglanti havuzu; handshake her turda tekrarlanmaz.
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") != "0"
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "50"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+FAL_WARMUP_URL = os.getenv("FAL_WARMUP_URL", "https://fal.run")
 
 # HIZ AYARLARI
 LLM_MODEL = "google/gemini-3-flash-preview"
 LLM_MAX_TOKENS = 200  # RANDEVU satırı + kapanış için yeterli
 LLM_TEMPERATURE = 0.4
 
+# Konusma hafizasi (services/conversation_memory.py): gecmis bu token butcesini
+# asinca en eski mesajlar booking ozetine katlanir; son mesajlar aynen kalir
+LLM_HISTORY_TOKEN_BUDGET = int(os.getenv("LLM_HISTORY_TOKEN_BUDGET", "350"))
+LLM_MIN_RECENT_MESSAGES = int(os.getenv("LLM_MIN_RECENT_MESSAGES", "4"))
+
+# Arac cagrisi modu: LLM "ARAC: {json}" satiriyla check_slots / book / suggest_alternatives
+# cagirir, sunucu ayni turda calistirip sonucu geri verir ("RANDEVU:" satiri yerine)
+LLM_TOOL_MODE = os.getenv("LLM_TOOL_MODE", "1") != "0"
+LLM_TOOL_MAX_STEPS = int(os.getenv("LLM_TOOL_MAX_STEPS", "3"))  # tur basina en fazla arac cagrisi
+
+# Model katmanlari: basit turlar (selam, evet, tesekkur) hizli/kucuk modele,
+# tarih/saat/booking iceren turlar LLM_MODEL'e. Hizli modelin cevabi
+# bozuksa (bos, rol sizintisi, gecersiz ARAC satiri) tur guclu modelle tekrarlanir.
+LLM_ROUTING = os.getenv("LLM_ROUTING", "1") != "0"
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "google/gemini-2.5-flash-lite")
+LLM_FAST_MAX_TOKENS = int(os.getenv("LLM_FAST_MAX_TOKENS", "120"))
+LLM_FAST_TIMEOUT = float(os.getenv("LLM_FAST_TIMEOUT", "6"))
+LLM_FAST_MAX_WORDS = int(os.getenv("LLM_FAST_MAX_WORDS", "8"))  # bundan uzun mesaj guclu modele
+LLM_STRONG_TIMEOUT = float(os.getenv("LLM_STRONG_TIMEOUT", "12"))
+
+# SSS hizli yolu (services/faq_service.py): adres/saat/fiyat/personel sorulari LLM'siz
+FAQ_FAST_PATH = os.getenv("FAQ_FAST_PATH", "1") != "0"
+FAQ_MIN_CONFIDENCE = float(os.getenv("FAQ_MIN_CONFIDENCE", "0.75"))
+
+# Telefon turunda LLM stream + cumle cumle TTS (ilk ses daha erken hazir)
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") != "0"
+
+# TTS ses ayarlari (bos = Freya varsayilani; cache anahtarina da girer)
+TTS_VOICE = os.getenv("TTS_VOICE", "")
+TTS_RESPONSE_FORMAT = os.getenv("TTS_RESPONSE_FORMAT", "")
+
+# TTS cache (services/tts_cache.py): bellek LRU + disk (restart'ta korunur)
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or str(Path(__file__).parent / "tts_cache")
+TTS_CACHE_MEMORY_MAX_BYTES = int(os.getenv("TTS_CACHE_MEMORY_MAX_MB", "64")) * 1024 * 1024
+TTS_CACHE_DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_MAX_MB", "512")) * 1024 * 1024
+
+# Twilio <Play> ses deposu (services/audio_store.py)
+# Klasor tum uvicorn worker'larinda AYNI olmali (<Play> fetch'i herhangi birine duser)
+AUDIO_STORE_DIR = os.getenv("AUDIO_STORE_DIR") or os.path.join(tempfile.gettempdir(), "randevuses-audio")
+AUDIO_STORE_MAX_BYTES = int(os.getenv("AUDIO_STORE_MAX_MB", "64")) * 1024 * 1024
+AUDIO_STORE_SPILL_BYTES = int(os.getenv("AUDIO_STORE_SPILL_KB", "256")) * 1024  # bundan buyuk klip bellege alinmaz
+AUDIO_STORE_DISK_MAX_BYTES = int(os.getenv("AUDIO_STORE_DISK_MAX_MB", "512")) * 1024 * 1024
+AUDIO_STORE_SWEEP_SECONDS = float(os.getenv("AUDIO_STORE_SWEEP_SECONDS", "30"))
+
+# Oturum deposu (services/session_store.py): LLM gecmisi + telefon booking state
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "5000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(2 * 60 * 60)))  # eski PHONE_STATE suresi
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+# "sqlite": oturumlar paylasilan tabloda (worker degisse / restart olsa da arama devam eder)
+# "memory": sadece process ici
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+SESSION_FLUSH_SECONDS = float(os.getenv("SESSION_FLUSH_SECONDS", "0.05"))  # write-behind toplama penceresi
+SESSION_COMPRESS_MIN_BYTES = int(os.getenv("SESSION_COMPRESS_MIN_BYTES", "512"))
+
 # SQLite veritabani yolu
 DB_PATH = Path(__file__).parent / "randevuses.db"
 
+# SQLite baglanti havuzu (thread basina tek baglanti, bir kez ayarlanir)
+DB_WAL_ENABLED = os.getenv("DB_WAL_ENABLED", "1") != "0"
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # WAL ile NORMAL guvenli
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "8192"))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+
+# Async DB cephesi (services/db_executor.py): okumalar havuzda, yazmalar tek thread'de
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))
+
 # ─────────────────────────────────────────
 # Google Calendar (Service Account) Ayarlari
 #
@@ -36,4 +112,33 @@ GOOGLE_CALENDAR_CREDENTIALS_PATH = (
 
 # Isletme kaydinda google_calendar_id bos gelirse fallback.
 # Not: "primary" sadece user OAuth icindir; service account'ta genelde calismaz.
-DEFAULT_GOOGLE_CALENDAR_ID = os.getenv("DEFAULT_GOOGLE_CALENDAR_ID") or ""
\ No newline at end of file
+DEFAULT_GOOGLE_CALENDAR_ID = os.getenv("DEFAULT_GOOGLE_CALENDAR_ID") or ""
+
+# Takvim istekleri ayri thread havuzunda (event loop bloklanmasin)
+CALENDAR_MAX_WORKERS = int(os.getenv("CALENDAR_MAX_WORKERS", "8"))
+CALENDAR_HTTP_TIMEOUT = float(os.getenv("CALENDAR_HTTP_TIMEOUT", "10"))
+
+# Freebusy cache: kisa TTL (sn), 0 = kapali. Sorgu en az bu kadar gun ceker.
+CALENDAR_FREEBUSY_TTL = float(os.getenv("CALENDAR_FREEBUSY_TTL", "30"))
+CALENDAR_FREEBUSY_PREFETCH_DAYS = int(os.getenv("CALENDAR_FREEBUSY_PREFETCH_DAYS", "31"))
+
+# Yerel takvim aynasi (events.list + syncToken). Ayna bu kadar sn'den
+# bayatsa freebusy'ye dusulur. Webhook verilirse push kanali acilir.
+CALENDAR_MIRROR_ENABLED = os.getenv("CALENDAR_MIRROR_ENABLED", "1") != "0"
+CALENDAR_MIRROR_INTERVAL = float(os.getenv("CALENDAR_MIRROR_INTERVAL", "60"))
+CALENDAR_MIRROR_MAX_STALENESS = float(os.getenv("CALENDAR_MIRROR_MAX_STALENESS", "300"))
+# Ayna sadece [dun, bugun + HORIZON_DAYS) penceresini tutar; pencere disi sorgu freebusy'ye.
+# Pencere RESYNC_HOURS'ta bir tam senkronla kaydirilir.
+CALENDAR_MIRROR_HORIZON_DAYS = int(os.getenv("CALENDAR_MIRROR_HORIZON_DAYS", "62"))
+CALENDAR_MIRROR_RESYNC_HOURS = float(os.getenv("CALENDAR_MIRROR_RESYNC_HOURS", "24"))
+CALENDAR_WEBHOOK_URL = os.getenv("CALENDAR_WEBHOOK_URL", "")  # ör. https://alan.com/api/calendar/notify
+# Musaitlik indeksi (isletme basina gun->bitmap). Bu kadar sn sonra bastan
+# yuklenir (baska worker'in booking'leri icin emniyet), 0 = kapali.
+# Aynasiz Google takvimlerinde en fazla CALENDAR_FREEBUSY_TTL kadar tutulur.
+AVAILABILITY_INDEX_TTL = float(os.getenv("AVAILABILITY_INDEX_TTL", "300"))
+
+# Isletme config cache (slug -> isletme). create/delete aninda gecersiz kilar.
+# Baska worker'in degisikligi: en fazla bu kadar sn'de bir PRAGMA data_version
+# kontrolu (-1 = kontrol yok, 0 = her cagrida).
+BUSINESS_CACHE_ENABLED = os.getenv("BUSINESS_CACHE_ENABLED", "1") != "0"
+BUSINESS_CACHE_CHECK_SECONDS = float(os.getenv("BUSINESS_CACHE_CHECK_SECONDS", "1"))
@@ -2,25 +2,63 @@
 import sqlite3
 import json
 import re
-from typing import Optional, List, Set
-from datetime import datetime, timedelta
-from config import DB_PATH, DEFAULT_GOOGLE_CALENDAR_ID
+import threading
+import time
+from typing import Dict, Optional, List, Tuple
+from datetime import date, datetime, timedelta
+from config import (
+    DEFAULT_GOOGLE_CALENDAR_ID,
+    AVAILABILITY_INDEX_TTL,
+    CALENDAR_FREEBUSY_TTL,
+    BUSINESS_CACHE_ENABLED,
+    BUSINESS_CACHE_CHECK_SECONDS,
+)
+from services.availability_index import AvailabilityIndex, bitmap_from_slots
+from services.db_pool import get_connection, open_connection
+from services.db_executor import run_db_read, run_db_write
+from services.schedule import schedule_for
 
 # Calendar entegrasyonu (Google)
 try:
-    from services.calendar_service import get_available_slots_google, create_google_event
+    from services.calendar_service import (
+        get_available_slots_google,
+        create_google_event,
+        run_calendar_io,
+        is_interval_free_google,
+        get_busy_intervals,
+        is_mirrored,
+        generate_free_slots,
+        CALENDAR_MIRROR,
+        TR_TZ,
+    )
 except Exception:
     try:
-        from calendar_service import get_available_slots_google, create_google_event  # type: ignore
+        from calendar_service import (  # type: ignore
+            get_available_slots_google,
+            create_google_event,
+            run_calendar_io,
+            is_interval_free_google,
+            get_busy_intervals,
+            is_mirrored,
+            generate_free_slots,
+            CALENDAR_MIRROR,
+            TR_TZ,
+        )
     except Exception:
         get_available_slots_google = None  # type: ignore
         create_google_event = None  # type: ignore
+        run_calendar_io = None  # type: ignore
+        is_interval_free_google = None  # type: ignore
+        get_busy_intervals = None  # type: ignore
+        is_mirrored = None  # type: ignore
+        generate_free_slots = None  # type: ignore
+        CALENDAR_MIRROR = None  # type: ignore
+        TR_TZ = None  # type: ignore
 
 
 def get_db():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Thread'in havuzdaki bağlantısı (WAL + pragma'lar hazır). close() = bırak."""
+    return get_connection()
 
 
 def init_db():
@@ -54,10 +92,26 @@ def init_db():
             customer_name TEXT DEFAULT '',
             customer_phone TEXT DEFAULT '',
             google_calendar_id TEXT DEFAULT '',
+            duration_minutes INTEGER DEFAULT 30,
+            end_at TEXT DEFAULT '',
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     """)
 
+    # ✅ İşletmeye özel ön-hazır sesler (karşılama / fallback)
+    # text_hash: metin + ses ayarı; işletme adı değişirse yeniden üretilir
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS business_audio (
+            business_slug TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            text_hash TEXT NOT NULL,
+            audio_format TEXT DEFAULT 'wav',
+            audio BLOB,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (business_slug, kind)
+        )
+    """)
+
     # ✅ Aynı işletmede aynı slot 2 kez book edilemesin
     try:
         conn.execute(
@@ -66,19 +120,173 @@ def init_db():
     except Exception:
         pass
 
+    # ✅ businesses değişim sayacı (worker'lar arası cache geçersiz kılma)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER DEFAULT 0
+        )
+    """)
+    for op in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS businesses_version_{op.lower()} AFTER {op} ON businesses BEGIN
+                INSERT INTO app_meta (key, value) VALUES ('businesses_version', 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            END
+        """)
+
     # businesses kolon kontrolü (geriye dönük uyum)
     try:
         cols = [r[1] for r in conn.execute("PRAGMA table_info(businesses)").fetchall()]
         if "google_calendar_id" not in cols:
             conn.execute("ALTER TABLE businesses ADD COLUMN google_calendar_id TEXT DEFAULT ''")
+        if "phone_key" not in cols:
+            conn.execute("ALTER TABLE businesses ADD COLUMN phone_key TEXT DEFAULT ''")
     except Exception:
         pass
 
+    # ✅ Gelen arama yönlendirme: normalize telefon (son 10 hane) indeksli
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_businesses_phone_key ON businesses(phone_key)")
+        rows = conn.execute(
+            "SELECT id, phone FROM businesses WHERE (phone_key IS NULL OR phone_key = '') AND phone != ''"
+        ).fetchall()
+        for r in rows:
+            key = phone_key(r["phone"])
+            if key:
+                conn.execute("UPDATE businesses SET phone_key = ? WHERE id = ?", (key, r["id"]))
+    except Exception:
+        pass
+
+    # appointments kolon kontrolü: randevu = aralık (slot_at, end_at)
+    try:
+        cols = [r[1] for r in conn.execute("PRAGMA table_info(appointments)").fetchall()]
+        if "duration_minutes" not in cols:
+            conn.execute("ALTER TABLE appointments ADD COLUMN duration_minutes INTEGER DEFAULT 30")
+        if "end_at" not in cols:
+            conn.execute("ALTER TABLE appointments ADD COLUMN end_at TEXT DEFAULT ''")
+        if "reminded" not in cols:
+            conn.execute("ALTER TABLE appointments ADD COLUMN reminded INTEGER DEFAULT 0")
+        conn.execute("""
+            UPDATE appointments
+            SET end_at = strftime('%Y-%m-%d %H:%M', slot_at, '+' || COALESCE(duration_minutes, 30) || ' minutes')
+            WHERE end_at IS NULL OR end_at = ''
+        """)
+    except Exception:
+        pass
+
+    _init_appointment_spans(conn)
+
     conn.commit()
     conn.close()
     print("[DB] Veritabani hazir")
 
 
+# ─────────────────────────────────────────
+# RANDEVU ARALIK İNDEKSİ (R-tree)
+# Eskiden çakışma sadece başlangıç slotuna bakıyordu (unique slot_at):
+# 90 dk'lık hizmet sonraki 2 slotla çakışabiliyordu.
+# appointment_spans: (id, başlangıç dk, bitiş dk, +business_slug) — trigger'larla
+# appointments ile senkron. "Çakışan var mı?" = O(log n) R-tree sorgusu.
+# rtree modülü yoksa (slot_at, end_at) üzerinden düz sorgu.
+# Dakikalar: naive 'YYYY-MM-DD HH:MM' -> epoch dakika (SQLite strftime('%s') ile aynı).
+# ─────────────────────────────────────────
+_SPANS_RTREE = False
+_EPOCH = datetime(1970, 1, 1)
+_SPAN_START_SQL = "CAST(strftime('%s', {0}.slot_at) AS INTEGER) / 60"
+_SPAN_END_SQL = "CAST(strftime('%s', {0}.slot_at) AS INTEGER) / 60 + COALESCE({0}.duration_minutes, 30)"
+
+
+def _to_minutes(dt: datetime) -> int:
+    return int((dt - _EPOCH).total_seconds()) // 60
+
+
+def _init_appointment_spans(conn):
+    global _SPANS_RTREE
+    for module in ("rtree_i32", "rtree"):
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS appointment_spans USING {module}(id, start_min, end_min, +business_slug)"
+            )
+            break
+        except sqlite3.OperationalError:
+            continue
+    else:
+        print("[DB] rtree modülü yok -> çakışma sorgusu slot_at/end_at üzerinden")
+        _SPANS_RTREE = False
+        return
+
+    insert_new = (
+        "INSERT INTO appointment_spans (id, start_min, end_min, business_slug) VALUES "
+        f"(NEW.id, {_SPAN_START_SQL.format('NEW')}, {_SPAN_END_SQL.format('NEW')}, NEW.business_slug);"
+    )
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS appointments_span_ai AFTER INSERT ON appointments BEGIN
+            {insert_new}
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS appointments_span_ad AFTER DELETE ON appointments BEGIN
+            DELETE FROM appointment_spans WHERE id = OLD.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS appointments_span_au
+        AFTER UPDATE OF slot_at, duration_minutes, business_slug ON appointments BEGIN
+            DELETE FROM appointment_spans WHERE id = OLD.id;
+            {insert_new}
+        END
+    """)
+
+    # Eski kayıtlar (trigger'dan önce eklenenler)
+    conn.execute(f"""
+        INSERT INTO appointment_spans (id, start_min, end_min, business_slug)
+        SELECT a.id, {_SPAN_START_SQL.format('a')}, {_SPAN_END_SQL.format('a')}, a.business_slug
+        FROM appointments a
+        WHERE a.id NOT IN (SELECT id FROM appointment_spans)
+    """)
+    _SPANS_RTREE = True
+
+
+def _appointment_intervals(conn, slug: str, start: datetime, end: datetime) -> List[tuple]:
+    """[start, end) ile çakışan randevular: [(başlangıç, bitiş)] (sıralı)."""
+    if _SPANS_RTREE:
+        rows = conn.execute(
+            """
+            SELECT a.slot_at, a.end_at, a.duration_minutes
+            FROM appointment_spans s JOIN appointments a ON a.id = s.id
+            WHERE s.start_min < ? AND s.end_min > ? AND s.business_slug = ?
+            """,
+            (_to_minutes(end), _to_minutes(start), slug),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            """
+            SELECT slot_at, end_at, duration_minutes FROM appointments
+            WHERE business_slug = ? AND slot_at < ? AND end_at > ?
+            """,
+            (slug, end.strftime("%Y-%m-%d %H:%M"), start.strftime("%Y-%m-%d %H:%M")),
+        ).fetchall()
+
+    out = []
+    for r in rows:
+        try:
+            a_start = datetime.strptime((r["slot_at"] or "").strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            continue
+        a_end = a_start + timedelta(minutes=int(r["duration_minutes"] or 30))
+        # R-tree (float modülü) sınırları genişletebilir -> kesin kontrol
+        if a_start < end and a_end > start:
+            out.append((a_start, a_end))
+    return sorted(out)
+
+
+def phone_key(phone: str) -> str:
+    """Telefon -> yönlendirme anahtarı (son 10 hane; +90 / 0 öneki fark etmez)."""
+    digits = re.sub(r"[^\d]", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
 def slugify(text: str) -> str:
     tr_map = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU")
     text = (text or "").translate(tr_map)
@@ -100,9 +308,9 @@ def create_business(data: dict) -> dict:
     conn.execute("""
         INSERT INTO businesses (
             slug, name, agent_name, sector, address, phone, working_hours,
-            services, staff, campaigns, custom_rules, google_calendar_id
+            services, staff, campaigns, custom_rules, google_calendar_id, phone_key
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         slug,
         data.get("name", ""),
@@ -116,16 +324,119 @@ def create_business(data: dict) -> dict:
         json.dumps(data.get("campaigns", []), ensure_ascii=False),
         json.dumps(data.get("custom_rules", []), ensure_ascii=False),
         (data.get("google_calendar_id") or "").strip(),
+        phone_key(data.get("phone", "")),
     ))
     conn.commit()
+    _business_written(conn, slug)
+    conn.close()
 
     biz = get_business_by_slug(slug)
-    conn.close()
     print(f"[DB] Isletme olusturuldu: {slug}")
     return biz
 
 
-def get_business_by_slug(slug: str) -> Optional[dict]:
+# ─────────────────────────────────────────
+# İŞLETME CACHE
+# Her turda (voice_chat, booking, slots...) get_business_by_slug tekrar
+# tekrar: yeni bağlantı + SELECT + 4 json.loads. Artık slug başına bellekte.
+# - create/delete (ve ileride update) -> _business_written ile anında düşer
+# - başka worker yazdıysa: kalıcı bir bağlantıda PRAGMA data_version değişir
+#   -> app_meta.businesses_version'a bak, değiştiyse hepsini düşür
+# - her kayıt bir sürüm numarası taşır (get_business_version): işletmeye
+#   bağlı türetilmiş cache'ler bununla anahtarlanabilir
+# Dönen dict paylaşılmaz (sığ kopya); alanlarını değiştirmeyin.
+# ─────────────────────────────────────────
+_BIZ_CACHE: Dict[str, Tuple[int, Optional[dict]]] = {}
+_BIZ_LIST: Optional[List[dict]] = None
+_BIZ_LOCK = threading.Lock()
+_BIZ_GEN = 0
+_BIZ_EPOCH = 0               # her geçersiz kılmada artar (yükleme sırasında yazma olduysa saklama)
+_BIZ_SEEN_VERSION = -1       # son görülen app_meta.businesses_version
+_BIZ_WATCH_CONN = None       # data_version kalıcı bağlantıda anlamlı
+_BIZ_DATA_VERSION = -1
+_BIZ_CHECKED_AT = 0.0
+BUSINESS_CACHE_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0, "external_changes": 0}
+
+
+def _businesses_version(conn) -> int:
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'businesses_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def invalidate_business_cache(slug: Optional[str] = None):
+    """Yazma sonrası çağır (slug=None: hepsi). Müsaitlik indeksi de düşer."""
+    global _BIZ_LIST, _BIZ_EPOCH, _PHONE_INDEX
+    with _BIZ_LOCK:
+        _BIZ_EPOCH += 1
+        if slug is None:
+            _BIZ_CACHE.clear()
+        else:
+            _BIZ_CACHE.pop(slug, None)
+        _BIZ_LIST = None
+        _PHONE_INDEX = None
+    BUSINESS_CACHE_STATS["invalidations"] += 1
+    AVAILABILITY.invalidate(slug)
+
+
+def _business_written(conn, slug: str):
+    """Bu process'in kendi yazması: sayacı kaydet (kendi yazmamızı 'dış değişiklik' sanmayalım)."""
+    global _BIZ_SEEN_VERSION
+    try:
+        _BIZ_SEEN_VERSION = _businesses_version(conn)
+    except sqlite3.Error:
+        pass
+    invalidate_business_cache(slug)
+
+
+def _check_business_changes():
+    global _BIZ_WATCH_CONN, _BIZ_DATA_VERSION, _BIZ_SEEN_VERSION, _BIZ_CHECKED_AT
+    if BUSINESS_CACHE_CHECK_SECONDS < 0:
+        return
+    now = time.monotonic()
+    if now - _BIZ_CHECKED_AT < BUSINESS_CACHE_CHECK_SECONDS:
+        return
+    _BIZ_CHECKED_AT = now
+
+    with _BIZ_LOCK:
+        try:
+            if _BIZ_WATCH_CONN is None:
+                _BIZ_WATCH_CONN = open_connection(check_same_thread=False)
+            dv = _BIZ_WATCH_CONN.execute("PRAGMA data_version").fetchone()[0]
+            if dv == _BIZ_DATA_VERSION:
+                return
+            _BIZ_DATA_VERSION = dv
+            version = _businesses_version(_BIZ_WATCH_CONN)
+        except sqlite3.Error as e:
+            print(f"[DB] data_version kontrolü hatası: {e}")
+            return
+        if version == _BIZ_SEEN_VERSION:
+            return
+        first = _BIZ_SEEN_VERSION < 0
+        _BIZ_SEEN_VERSION = version
+
+    if not first:
+        BUSINESS_CACHE_STATS["external_changes"] += 1
+        print("[DB] İşletmeler başka bir worker'da değişti -> cache temizlendi")
+        invalidate_business_cache()
+
+
+def _business_check_due() -> bool:
+    return BUSINESS_CACHE_CHECK_SECONDS >= 0 and time.monotonic() - _BIZ_CHECKED_AT >= BUSINESS_CACHE_CHECK_SECONDS
+
+
+def _peek_business(slug: str) -> Tuple[bool, Optional[dict]]:
+    """Sadece bellekten (DB'ye dokunmaz). (bulundu mu, işletme kopyası)"""
+    if not BUSINESS_CACHE_ENABLED or _business_check_due():
+        return False, None
+    entry = _BIZ_CACHE.get(slug)
+    if entry is None:
+        return False, None
+    BUSINESS_CACHE_STATS["hits"] += 1
+    biz = entry[1]
+    return True, (dict(biz) if biz is not None else None)
+
+
+def _fetch_business(slug: str) -> Optional[dict]:
     conn = get_db()
     row = conn.execute(
         "SELECT * FROM businesses WHERE slug = ? AND is_active = 1",
@@ -137,202 +448,333 @@ def get_business_by_slug(slug: str) -> Optional[dict]:
     return _row_to_dict(row)
 
 
+def _cached_business(slug: str) -> Tuple[int, Optional[dict]]:
+    global _BIZ_GEN
+    _check_business_changes()
+    entry = _BIZ_CACHE.get(slug)
+    if entry is not None:
+        BUSINESS_CACHE_STATS["hits"] += 1
+        return entry
+    BUSINESS_CACHE_STATS["misses"] += 1
+    epoch = _BIZ_EPOCH
+    biz = _fetch_business(slug)
+    with _BIZ_LOCK:
+        _BIZ_GEN += 1
+        entry = (_BIZ_GEN, biz)
+        if epoch == _BIZ_EPOCH:
+            _BIZ_CACHE[slug] = entry
+    return entry
+
+
+def get_business_by_slug(slug: str) -> Optional[dict]:
+    if not BUSINESS_CACHE_ENABLED:
+        return _fetch_business(slug)
+    biz = _cached_business(slug)[1]
+    return dict(biz) if biz is not None else None
+
+
+def get_business_version(slug: str) -> int:
+    """İşletme kaydı her yeniden yüklendiğinde artar (türetilmiş cache anahtarı için)."""
+    if not BUSINESS_CACHE_ENABLED:
+        return 0
+    return _cached_business(slug)[0]
+
+
 def list_businesses() -> List[dict]:
+    global _BIZ_LIST
+    if BUSINESS_CACHE_ENABLED:
+        _check_business_changes()
+        cached = _BIZ_LIST
+        if cached is not None:
+            BUSINESS_CACHE_STATS["hits"] += 1
+            return [dict(b) for b in cached]
+        BUSINESS_CACHE_STATS["misses"] += 1
+    epoch = _BIZ_EPOCH
+
     conn = get_db()
     rows = conn.execute(
         "SELECT * FROM businesses WHERE is_active = 1 ORDER BY created_at DESC"
     ).fetchall()
     conn.close()
-    return [_row_to_dict(r) for r in rows]
+    out = [_row_to_dict(r) for r in rows]
+    if BUSINESS_CACHE_ENABLED and epoch == _BIZ_EPOCH:
+        _BIZ_LIST = out
+    return [dict(b) for b in out]
 
 
-def delete_business(slug: str):
+# Telefon indeksi: phone_key -> slug (+ eşleşme yoksa varsayılan işletme)
+# İşletme yazmalarında cache ile birlikte düşer, ilk aramada tek indeksli sorguyla kurulur.
+_PHONE_INDEX: Optional[Tuple[Dict[str, str], str]] = None
+
+
+def _load_phone_index() -> Tuple[Dict[str, str], str]:
+    global _PHONE_INDEX
+    if BUSINESS_CACHE_ENABLED:
+        _check_business_changes()
+        cached = _PHONE_INDEX
+        if cached is not None:
+            return cached
+    epoch = _BIZ_EPOCH
+
     conn = get_db()
-    conn.execute("UPDATE businesses SET is_active = 0 WHERE slug = ?", (slug,))
-    conn.commit()
+    rows = conn.execute(
+        "SELECT slug, phone_key FROM businesses WHERE is_active = 1 ORDER BY created_at DESC"
+    ).fetchall()
     conn.close()
 
+    by_key: Dict[str, str] = {}
+    for r in rows:
+        if r["phone_key"]:
+            by_key.setdefault(r["phone_key"], r["slug"])  # aynı numara: en yeni işletme (eski davranış)
+    index = (by_key, rows[0]["slug"] if rows else "")
+    if BUSINESS_CACHE_ENABLED and epoch == _BIZ_EPOCH:
+        _PHONE_INDEX = index
+    return index
 
-def _allowed_weekdays_from_working_hours(wh: str) -> Optional[set]:
+
+def find_business_by_phone(called_number: str, fallback_first: bool = True) -> Optional[dict]:
     """
-    working_hours alanından gün filtresi çıkarır.
-    'Pzt-Cuma 12:00-19:00' => {0,1,2,3,4}
+    Aranan numara -> işletme (O(1) sözlük + slug cache).
+    Eşleşme yoksa (fallback_first) en son eklenen aktif işletme.
     """
-    t = (wh or "").lower()
-    if not t:
+    by_key, default_slug = _load_phone_index()
+    slug = by_key.get(phone_key(called_number))
+    if not slug and fallback_first:
+        slug = default_slug
+    return get_business_by_slug(slug) if slug else None
+
+
+def business_cache_info() -> dict:
+    return {
+        **BUSINESS_CACHE_STATS,
+        "entries": len(_BIZ_CACHE),
+        "list_cached": _BIZ_LIST is not None,
+        "phone_keys": len(_PHONE_INDEX[0]) if _PHONE_INDEX else 0,
+    }
+
+
+def delete_business(slug: str):
+    conn = get_db()
+    try:
+        with conn:  # tek transaction: işletme pasif + sesleri silinir
+            conn.execute("UPDATE businesses SET is_active = 0 WHERE slug = ?", (slug,))
+            conn.execute("DELETE FROM business_audio WHERE business_slug = ?", (slug,))
+        _business_written(conn, slug)
+    finally:
+        conn.close()
+
+
+def save_business_audio(slug: str, kind: str, text_hash: str, data: bytes, audio_format: str = "wav"):
+    conn = get_db()
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO business_audio (business_slug, kind, text_hash, audio_format, audio)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (slug, kind, text_hash, audio_format or "wav", sqlite3.Binary(data)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_business_audio_hash(slug: str, kind: str) -> str:
+    """Blob'u okumadan sadece hash (TwiML üretirken hızlı kontrol)."""
+    conn = get_db()
+    row = conn.execute(
+        "SELECT text_hash FROM business_audio WHERE business_slug = ? AND kind = ?",
+        (slug, kind),
+    ).fetchone()
+    conn.close()
+    return row["text_hash"] if row else ""
+
+
+def get_business_audio(slug: str, kind: str) -> Optional[dict]:
+    conn = get_db()
+    row = conn.execute(
+        "SELECT text_hash, audio_format, audio FROM business_audio WHERE business_slug = ? AND kind = ?",
+        (slug, kind),
+    ).fetchone()
+    conn.close()
+    if not row or not row["audio"]:
         return None
+    return {"text_hash": row["text_hash"], "audio_format": row["audio_format"], "audio": bytes(row["audio"])}
 
-    if (("pzt" in t) or ("pazartesi" in t)) and ("cuma" in t or "cum" in t):
-        return {0, 1, 2, 3, 4}
 
-    if "cumartesi" in t:
-        return {0, 1, 2, 3, 4, 5}
+def get_due_reminders(from_at: str, to_at: str) -> List[dict]:
+    """[from_at, to_at] aralığında, telefonu olan ve henüz hatırlatılmamış randevular."""
+    conn = get_db()
+    rows = conn.execute("""
+        SELECT a.*, b.name as business_name
+        FROM appointments a
+        JOIN businesses b ON b.slug = a.business_slug
+        WHERE a.slot_at >= ? AND a.slot_at <= ?
+        AND a.customer_phone != ''
+        AND (a.reminded IS NULL OR a.reminded = 0)
+    """, (from_at, to_at)).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
 
-    if "pazar" in t:
-        return {0, 1, 2, 3, 4, 5, 6}
 
-    return None
+def mark_reminded(appointment_id: int):
+    conn = get_db()
+    conn.execute("UPDATE appointments SET reminded = 1 WHERE id = ?", (appointment_id,))
+    conn.commit()
+    conn.close()
 
 
-def _get_booked_slot_set(slug: str, from_dt: datetime, to_dt: datetime) -> Set[str]:
+def _get_booked_intervals(slug: str, from_dt: datetime, to_dt: datetime) -> List[tuple]:
     """
     ✅ Doluluk için TEK KAYNAK: SQLite appointments
-    Bu aralıkta (slot_at) dolu olanları set olarak döndürür.
-    slot_at formatı: 'YYYY-MM-DD HH:MM'
+    Bu aralıkla çakışan randevular (başlangıç, bitiş) olarak.
     """
     conn = get_db()
-    rows = conn.execute(
-        """
-        SELECT slot_at FROM appointments
-        WHERE business_slug = ?
-          AND slot_at >= ?
-          AND slot_at <  ?
-        """,
-        (
-            slug,
-            from_dt.strftime("%Y-%m-%d %H:%M"),
-            to_dt.strftime("%Y-%m-%d %H:%M"),
-        ),
-    ).fetchall()
+    out = _appointment_intervals(conn, slug, from_dt, to_dt)
     conn.close()
-    return set([(r["slot_at"] or "").strip() for r in rows if r and r["slot_at"]])
+    return out
 
 
-def get_available_slots(slug: str, days: int = 7, slot_minutes: int = 30) -> List[dict]:
+def _load_availability(slug: str, slot_minutes: int, first_day: Optional[date], n_days: int) -> Optional[dict]:
+    """
+    Müsaitlik indeksi loader'ı: [first_day, first_day + n_days) için gün başına boş slot bitmap'i.
+    ✅ Google varsa: busy (ayna/freebusy) + DB dolu + gün filtresi
+    ✅ Yoksa: mesai ızgarası + DB dolu + gün filtresi
+    """
     biz = get_business_by_slug(slug)
     if not biz:
-        return []
+        return None
 
     cal_id = (biz.get("google_calendar_id") or "").strip() or (DEFAULT_GOOGLE_CALENDAR_ID or "").strip()
-    working_hours = biz.get("working_hours", "") or ""
-    allowed = _allowed_weekdays_from_working_hours(working_hours)
-
-    now = datetime.now()
-    from_dt = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    to_dt = from_dt + timedelta(days=days)
-
-    # ✅ DB dolu slotlar (Google’dan gelse bile filtreleyeceğiz)
-    booked_set = _get_booked_slot_set(slug, from_dt, to_dt)
-
-    # ✅ GOOGLE freebusy
-    if cal_id and get_available_slots_google:
-        print("[SLOTS] using GOOGLE freebusy. cal_id=", cal_id, "working_hours=", working_hours)
-
-        slots = get_available_slots_google(
-            calendar_id=cal_id,
-            working_hours_str=working_hours,
-            from_date=None,
-            days=days,
-            slot_minutes=slot_minutes,
-        ) or []
-
-        # ✅ weekday filtresi + ✅ DB doluluk filtresi
-        filtered = []
-        for s in slots:
-            sa = (s.get("slot_at", "") or "").strip()
-            if not sa:
-                continue
-
-            # DB doluysa çıkar
-            if sa in booked_set:
-                continue
-
-            # weekday filtresi
-            if allowed is not None:
-                try:
-                    dt = datetime.strptime(sa, "%Y-%m-%d %H:%M")
-                    if dt.weekday() not in allowed:
-                        continue
-                except Exception:
-                    continue
-
-            filtered.append(s)
-
-        return filtered
-
-    # ✅ FALLBACK local slots
-    print("[SLOTS] FALLBACK local slots (NO google freebusy). cal_id=", cal_id)
-
-    import re as _re
-
-    def _parse_working_hours_local(hours_str: str):
-        if not hours_str or not str(hours_str).strip():
-            return 9 * 60, 18 * 60
-        m = _re.search(r"(\d{1,2}):?(\d{2})?\s*-\s*(\d{1,2}):?(\d{2})?", str(hours_str))
-        if not m:
-            return 9 * 60, 18 * 60
-        sh, sm = int(m.group(1)), int(m.group(2) or 0)
-        eh, em = int(m.group(3)), int(m.group(4) or 0)
-        return sh * 60 + sm, eh * 60 + em
-
-    start_min, end_min = _parse_working_hours_local(working_hours)
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-    slots: List[dict] = []
-    for d in range(days):
-        day = today + timedelta(days=d)
-        for m in range(start_min, end_min, slot_minutes):
-            h, mn = divmod(m, 60)
-            slot_start = day.replace(hour=h, minute=mn)
-
-            # ✅ gün filtresi
-            if allowed is not None and slot_start.weekday() not in allowed:
-                continue
-
-            if slot_start <= datetime.now():
-                continue
-
-            key = slot_start.strftime("%Y-%m-%d %H:%M")
-
-            # ✅ DB doluysa çıkar
-            if key in booked_set:
-                continue
-
-            slots.append({
-                "slot_at": key,
-                "display": slot_start.strftime("%d.%m.%Y %H:%M"),
-            })
-
-    return slots[:200]
-
-
-def _slot_is_currently_available(slug: str, slot_at: str, duration_minutes: int = 30) -> bool:
+    sched = schedule_for(biz)
+    start_min, end_min = sched.start_min, sched.end_min
+    use_google = bool(cal_id and get_busy_intervals)
+
+    # Google yolu günleri TR saatine göre sayar
+    clock = (lambda: datetime.now(TR_TZ).replace(tzinfo=None)) if use_google else datetime.now
+
+    first_day = first_day or clock().date()
+    from_dt = datetime(first_day.year, first_day.month, first_day.day)
+    to_dt = from_dt + timedelta(days=n_days)
+    ttl = AVAILABILITY_INDEX_TTL
+
+    busy = []
+    if use_google:
+        print("[SLOTS] using GOOGLE busy. cal_id=", cal_id, "working_hours=", sched.source)
+        busy = get_busy_intervals(cal_id, from_dt, to_dt)
+        if busy is None:
+            busy, ttl = None, 0  # takvime ulaşılamadı: slot yok, indekse yazma
+        elif not is_mirrored(cal_id, from_dt, to_dt):
+            # Değişiklikler dinleyiciye akmıyor -> freebusy cache kadar tut
+            ttl = min(ttl, CALENDAR_FREEBUSY_TTL)
+    else:
+        print("[SLOTS] FALLBACK local slots (NO google freebusy). cal_id=", cal_id)
+
+    days = {}
+    if busy is not None:
+        # DB randevuları aralık olarak busy'ye eklenir (uzun hizmet sonraki slotları da kapatır)
+        busy = list(busy) + _get_booked_intervals(slug, from_dt, to_dt)
+        # "Şimdi" filtresi okuma anında yapılır -> burada ızgaranın tamamı
+        if generate_free_slots is not None:
+            free = generate_free_slots(from_dt, n_days, start_min, end_min, slot_minutes, busy, from_dt - timedelta(minutes=1))
+        else:
+            slot_len = timedelta(minutes=slot_minutes)
+            free = [
+                st for st in (
+                    from_dt + timedelta(days=d, minutes=m)
+                    for d in range(n_days) for m in range(start_min, end_min, slot_minutes)
+                )
+                if not any(b_start < st + slot_len and b_end > st for b_start, b_end in busy)
+            ]
+        days = bitmap_from_slots(
+            (st for st in free if sched.fits(st, slot_minutes)),  # gün/mola/kapalı tarih
+            start_min,
+            slot_minutes,
+        )
+
+    return {
+        "calendar_id": cal_id if use_google else "",
+        "start_min": start_min,
+        "end_min": end_min,
+        "cap": 50 if use_google else 200,  # eski liste sınırları
+        "clock": clock,
+        "ttl": ttl,
+        "days": days,
+    }
+
+
+AVAILABILITY = AvailabilityIndex(_load_availability)
+if CALENDAR_MIRROR is not None:
+    CALENDAR_MIRROR.add_listener(AVAILABILITY.calendar_changed)
+
+
+def get_available_slots(slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+    """
+    Müsait slotlar (indeksten; eksik/dirty günler yüklenir).
+    duration_minutes > slot ise sadece hizmetin tamamı sığan başlangıçlar.
+    """
+    return AVAILABILITY.slots(slug, days, slot_minutes, duration_minutes)
+
+
+def get_day_slots(slug: str, date_ymd: str, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+    """Tek günün müsait slotları (liste sınırı yok)."""
+    try:
+        day = datetime.strptime(date_ymd, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return []
+    return AVAILABILITY.day(slug, day, slot_minutes, duration_minutes)
+
+
+def _slot_is_currently_available(slug: str, slot_at: str, duration_minutes: int = 30, slot_minutes: int = 30) -> bool:
     """
-    ✅ TEK GARANTİ:
-    - Slot, get_available_slots() çıktısında yoksa: dolu/kapalı/mesai dışı kabul et.
-    - Böylece LLM/Twilio nereden gelirse gelsin, dolu slota asla booking yapılmaz.
+    ✅ TEK GARANTİ (son kapı):
+    - DB'de [slot, slot+süre) ile çakışan randevu var mı? (R-tree)
+    - Mesai içinde mi (hizmet bitişi + mola dahil), ızgaraya oturuyor mu, gün açık mı?
+    - Takvimde [slot, slot+süre) meşgul mü?
+    Eskiden hedef güne kadar TÜM slot listesi yeniden üretiliyordu (uzak tarih =
+    pahalı, üstelik Google yolu 50 slotla kesildiği için uzak slotlar hiç
+    bulunamıyordu). Şimdi sadece o aralığa bakılır: maliyet tarihten bağımsız.
     """
     slot_at = (slot_at or "").strip()
     if not slot_at:
         return False
 
-    # DB'de zaten varsa zaten dolu
-    conn = get_db()
-    exists = conn.execute(
-        "SELECT id FROM appointments WHERE business_slug = ? AND slot_at = ?",
-        (slug, slot_at),
-    ).fetchone()
-    conn.close()
-    if exists:
-        return False
-
-    # Google/freebusy slot listesi üzerinden doğrula
-    # (7 gün yetmiyorsa: randevu tarihi çok ileri ise gün sayısını büyüt)
     try:
         target_dt = datetime.strptime(slot_at, "%Y-%m-%d %H:%M")
     except Exception:
         return False
 
-    now = datetime.now()
-    base = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    delta_days = (target_dt.date() - base.date()).days
-    if delta_days < 0:
+    if target_dt <= datetime.now():
         return False
 
-    days = max(7, delta_days + 2)  # hedef tarih kapsansın
-    slots = get_available_slots(slug, days=days, slot_minutes=30) or []
-    sset = set([(s.get("slot_at") or "").strip() for s in slots if s.get("slot_at")])
-    return slot_at in sset
+    biz = get_business_by_slug(slug)
+    if not biz:
+        return False
+
+    end_dt = target_dt + timedelta(minutes=max(duration_minutes, 1))
+
+    # DB'de çakışan randevu varsa dolu
+    conn = get_db()
+    overlapping = _appointment_intervals(conn, slug, target_dt, end_dt)
+    conn.close()
+    if overlapping:
+        return False
+
+    cal_id = (biz.get("google_calendar_id") or "").strip() or (DEFAULT_GOOGLE_CALENDAR_ID or "").strip()
+    use_google = bool(cal_id and is_interval_free_google)
+
+    # Izgara + mesai (get_available_slots ile aynı Schedule)
+    sched = schedule_for(biz)
+    minute = target_dt.hour * 60 + target_dt.minute
+    if (minute - sched.start_min) % slot_minutes:
+        return False
+    if not sched.fits(target_dt, duration_minutes):
+        return False  # kapalı gün / mola / hizmet mesai bitiminden taşıyor
+
+    if not use_google:
+        return True
+
+    free = is_interval_free_google(cal_id, target_dt, end_dt)
+    # Takvime ulaşılamadıysa güvenli taraf: müsait sayma
+    return bool(free)
 
 
 def book_appointment(
@@ -358,94 +800,106 @@ def book_appointment(
     if not _slot_is_currently_available(slug, slot_at, duration_minutes=duration_minutes):
         raise ValueError("Bu saat dolu veya mesai dışı (slot listesinde yok)")
 
-    conn = get_db()
+    start_dt = datetime.strptime(slot_at, "%Y-%m-%d %H:%M")
+    end_dt = start_dt + timedelta(minutes=max(duration_minutes, 1))
 
-    exists = conn.execute(
-        "SELECT id FROM appointments WHERE business_slug = ? AND slot_at = ?",
-        (slug, slot_at),
-    ).fetchone()
-    if exists:
-        conn.close()
-        raise ValueError("Bu saat zaten dolu (DB)")
-
-    cal_id = (biz.get("google_calendar_id") or "").strip() or (DEFAULT_GOOGLE_CALENDAR_ID or "").strip()
-
-    print(f"\n{'='*60}")
-    print(f"[BOOKING] Isletme: {biz.get('name')}")
-    print(f"[BOOKING] Calendar ID: '{cal_id}' {'MEVCUT' if cal_id else 'YOK - Google kayit yapilmayacak!'}")
-    print(f"[BOOKING] Slot: {slot_at}")
-    print(f"[BOOKING] Musteri: {customer_name} ({customer_phone})")
-    if service_name:
-        print(f"[BOOKING] Hizmet: {service_name}")
-    if staff_name:
-        print(f"[BOOKING] Personel: {staff_name}")
-    if create_google_event:
-        print(f"[BOOKING] create_google_event: MEVCUT")
-    else:
-        print(f"[BOOKING] create_google_event: YOK")
-    print(f"{'='*60}")
+    conn = get_db()
+    try:
+        if _appointment_intervals(conn, slug, start_dt, end_dt):
+            raise ValueError("Bu saat zaten dolu (DB)")
 
-    # Önce Google
-    if cal_id and create_google_event:
-        summary = f"Randevu - {customer_name}".strip()
+        cal_id = (biz.get("google_calendar_id") or "").strip() or (DEFAULT_GOOGLE_CALENDAR_ID or "").strip()
 
-        extra = []
+        print(f"\n{'='*60}")
+        print(f"[BOOKING] Isletme: {biz.get('name')}")
+        print(f"[BOOKING] Calendar ID: '{cal_id}' {'MEVCUT' if cal_id else 'YOK - Google kayit yapilmayacak!'}")
+        print(f"[BOOKING] Slot: {slot_at}")
+        print(f"[BOOKING] Musteri: {customer_name} ({customer_phone})")
         if service_name:
-            extra.append(f"Hizmet: {service_name}")
+            print(f"[BOOKING] Hizmet: {service_name}")
         if staff_name:
-            extra.append(f"Doktor/Personel: {staff_name}")
-        if price_tl:
-            extra.append(f"Ucret: {price_tl} TL")
-
-        desc_lines = [
-            f"Telefon: {customer_phone}",
-            f"Isletme: {biz.get('name','')}",
-        ]
-        if extra:
-            desc_lines.append(" | ".join(extra))
-        if session_id:
-            desc_lines.append(f"Session: {session_id}")
-
-        desc = "\n".join([l for l in desc_lines if l]).strip()
-
-        ok = create_google_event(
-            calendar_id=cal_id,
-            start_datetime=slot_at,
-            summary=summary,
-            description=desc,
-            duration_minutes=duration_minutes,
-        )
-        if not ok:
-            conn.close()
-            print(f"[BOOKING] Google Calendar'a etkinlik olusturulamadi!")
-            raise RuntimeError("Google Calendar'a etkinlik olusturulamadi")
-        print(f"[BOOKING] Google Calendar'a basariyla kaydedildi!")
-    elif not cal_id:
-        print(f"[BOOKING] Google Calendar ID bos - SADECE DB'ye kaydediliyor")
-    elif not create_google_event:
-        print(f"[BOOKING] create_google_event fonksiyonu yuklenemedi")
-
-    # DB insert
-    try:
-        conn.execute(
-            """
-            INSERT INTO appointments (business_slug, session_id, slot_at, customer_name, customer_phone, google_calendar_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (slug, session_id or "", slot_at, customer_name or "", customer_phone or "", cal_id),
-        )
-        conn.commit()
-    except sqlite3.IntegrityError:
+            print(f"[BOOKING] Personel: {staff_name}")
+        if create_google_event:
+            print(f"[BOOKING] create_google_event: MEVCUT")
+        else:
+            print(f"[BOOKING] create_google_event: YOK")
+        print(f"{'='*60}")
+
+        # Önce Google
+        if cal_id and create_google_event:
+            summary = f"Randevu - {customer_name}".strip()
+
+            extra = []
+            if service_name:
+                extra.append(f"Hizmet: {service_name}")
+            if staff_name:
+                extra.append(f"Doktor/Personel: {staff_name}")
+            if price_tl:
+                extra.append(f"Ucret: {price_tl} TL")
+
+            desc_lines = [
+                f"Telefon: {customer_phone}",
+                f"Isletme: {biz.get('name','')}",
+            ]
+            if extra:
+                desc_lines.append(" | ".join(extra))
+            if session_id:
+                desc_lines.append(f"Session: {session_id}")
+
+            desc = "\n".join([l for l in desc_lines if l]).strip()
+
+            ok = create_google_event(
+                calendar_id=cal_id,
+                start_datetime=slot_at,
+                summary=summary,
+                description=desc,
+                duration_minutes=duration_minutes,
+            )
+            if not ok:
+                print(f"[BOOKING] Google Calendar'a etkinlik olusturulamadi!")
+                raise RuntimeError("Google Calendar'a etkinlik olusturulamadi")
+            print(f"[BOOKING] Google Calendar'a basariyla kaydedildi!")
+        elif not cal_id:
+            print(f"[BOOKING] Google Calendar ID bos - SADECE DB'ye kaydediliyor")
+        elif not create_google_event:
+            print(f"[BOOKING] create_google_event fonksiyonu yuklenemedi")
+
+        # DB insert (çakışma kontrolü + insert tek yazma kilidi altında)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if _appointment_intervals(conn, slug, start_dt, end_dt):
+                raise ValueError("Bu saat zaten dolu (DB)")
+            cur = conn.execute(
+                """
+                INSERT INTO appointments (
+                    business_slug, session_id, slot_at, customer_name, customer_phone, google_calendar_id,
+                    duration_minutes, end_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    slug, session_id or "", slot_at, customer_name or "", customer_phone or "", cal_id,
+                    max(duration_minutes, 1), end_dt.strftime("%Y-%m-%d %H:%M"),
+                ),
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            raise ValueError("Bu saat zaten dolu (DB unique)")
+        except Exception:
+            conn.rollback()
+            raise
+        appt_id = cur.lastrowid
+    finally:
         conn.close()
-        raise ValueError("Bu saat zaten dolu (DB unique)")
 
-    appt_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
-    conn.close()
+    AVAILABILITY.mark_booked(slug, start_dt, duration_minutes)
 
     return {
         "id": appt_id,
         "business_slug": slug,
         "slot_at": slot_at,
+        "duration_minutes": max(duration_minutes, 1),
         "customer_name": customer_name,
         "customer_phone": customer_phone,
         "google_calendar_id": cal_id,
@@ -453,6 +907,105 @@ def book_appointment(
 
 
 
+# ─────────────────────────────────────────
+# ASYNC (Google Calendar'a dokunan fonksiyonlar)
+# freebusy / event insert senkron → event loop'u bloklamasın diye
+# takvim executor'ında çalıştırılır.
+# ─────────────────────────────────────────
+async def _run_blocking(fn, *args, **kwargs):
+    if run_calendar_io is not None:
+        return await run_calendar_io(fn, *args, **kwargs)
+    import asyncio, functools
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+async def get_available_slots_async(slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+    # İndeks hazırsa thread'e bile gitme
+    slots = AVAILABILITY.peek(slug, days, slot_minutes, duration_minutes)
+    if slots is not None:
+        return slots
+    return await _run_blocking(
+        get_available_slots, slug, days=days, slot_minutes=slot_minutes, duration_minutes=duration_minutes
+    )
+
+
+async def get_day_slots_async(slug: str, date_ymd: str, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+    try:
+        day = datetime.strptime(date_ymd, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return []
+    slots = AVAILABILITY.peek_day(slug, day, slot_minutes, duration_minutes)
+    if slots is not None:
+        return slots
+    return await _run_blocking(
+        get_day_slots, slug, date_ymd, slot_minutes=slot_minutes, duration_minutes=duration_minutes
+    )
+
+
+async def book_appointment_async(slug: str, slot_at: str, customer_name: str, customer_phone: str, **kwargs) -> dict:
+    return await _run_blocking(book_appointment, slug, slot_at, customer_name, customer_phone, **kwargs)
+
+
+# ─────────────────────────────────────────
+# ASYNC (sadece SQLite) — handler'lar bunları await eder
+# Okumalar DB thread havuzunda (aynı anda gelen aynı okuma tek sorgu),
+# yazmalar tek yazar thread'inde. Cache'te olan işletme thread'e gitmez.
+# ─────────────────────────────────────────
+async def get_business_by_slug_async(slug: str) -> Optional[dict]:
+    found, biz = _peek_business(slug)
+    if found:
+        return biz
+    return await run_db_read(get_business_by_slug, slug)
+
+
+async def list_businesses_async() -> List[dict]:
+    cached = _BIZ_LIST
+    if BUSINESS_CACHE_ENABLED and cached is not None and not _business_check_due():
+        BUSINESS_CACHE_STATS["hits"] += 1
+        return [dict(b) for b in cached]
+    return await run_db_read(list_businesses)
+
+
+async def find_business_by_phone_async(called_number: str, fallback_first: bool = True) -> Optional[dict]:
+    index = _PHONE_INDEX
+    if BUSINESS_CACHE_ENABLED and index is not None and not _business_check_due():
+        slug = index[0].get(phone_key(called_number)) or (index[1] if fallback_first else "")
+        if not slug:
+            return None
+        found, biz = _peek_business(slug)
+        if found:
+            return biz
+    return await run_db_read(find_business_by_phone, called_number, fallback_first)
+
+
+async def create_business_async(data: dict) -> dict:
+    return await run_db_write(create_business, data)
+
+
+async def delete_business_async(slug: str):
+    return await run_db_write(delete_business, slug)
+
+
+async def save_business_audio_async(slug: str, kind: str, text_hash: str, data: bytes, audio_format: str = "wav"):
+    return await run_db_write(save_business_audio, slug, kind, text_hash, data, audio_format)
+
+
+async def get_business_audio_hash_async(slug: str, kind: str) -> str:
+    return await run_db_read(get_business_audio_hash, slug, kind)
+
+
+async def get_business_audio_async(slug: str, kind: str) -> Optional[dict]:
+    return await run_db_read(get_business_audio, slug, kind)
+
+
+async def get_due_reminders_async(from_at: str, to_at: str) -> List[dict]:
+    return await run_db_read(get_due_reminders, from_at, to_at)
+
+
+async def mark_reminded_async(appointment_id: int):
+    return await run_db_write(mark_reminded, appointment_id)
+
+
 def _row_to_dict(row) -> dict:
     d = dict(row)
     for key in ["services", "staff", "campaigns", "custom_rules"]:
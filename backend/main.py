@@ -5,28 +5,35 @@ from typing import Optional, List, Dict, Any, Tuple
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from services.stt_service import transcribe_audio
-from services.llm_service import chat, clear_history
+from services.llm_service import chat, clear_history, llm_stats, record_exchange, register_tool, sessions as CHAT_SESSIONS
+from services.faq_service import answer_faq, faq_texts, faq_stats
 from services.tts_service import synthesize_speech
+from services.http_client import warmup_http_client, close_http_client
+from services.tts_cache import get_tts_cache, cache_key
+from services.audio_store import AUDIO_STORE
+from services.speech_pipeline import stream_reply_with_tts, same_spoken_text, cancel_pieces
+from services.schedule import schedule_for
+from services.db_pool import close_all as close_db_pool, pool_info as db_pool_info
+from services.db_executor import db_executor_info, flush_db_writes
+from services.session_store import SessionStore
+from services.session_backend import get_session_backend
+from config import LLM_STREAMING, LLM_TOOL_MODE, TTS_VOICE, TTS_RESPONSE_FORMAT
 
-import time
+import asyncio
 
-PHONE_STATE = {}
+# Booking state (oturum başına); boşta kalan / fazla olan sweeper'da düşer
+PHONE_STATE = SessionStore("phone")
 
-def _get_state(session_id: str) -> dict:
-    now = time.time()
-    st = PHONE_STATE.get(session_id) or {"ts": now}
-    if now - st.get("ts", now) > 2 * 60 * 60:
-        st = {"ts": now}
-    st["ts"] = now
-    PHONE_STATE[session_id] = st
-    return st
+async def _get_state(session_id: str) -> dict:
+    # Tur başka worker'a düştüyse paylaşılan backend'den gelir
+    return await PHONE_STATE.aget_or_create(session_id, dict)
 
 def _clear_state(session_id: str):
-    PHONE_STATE.pop(session_id, None)
+    PHONE_STATE.pop(session_id)
 
 
 # ─────────────────────────────────────────
@@ -51,42 +58,70 @@ except ImportError:
     TWILIO_PHONE_NUMBER = ""
 
 from database import (
-    create_business,
-    get_business_by_slug,
-    list_businesses,
-    delete_business,
-    get_available_slots,
-    book_appointment,
+    create_business_async,
+    get_business_by_slug_async,
+    list_businesses_async,
+    delete_business_async,
+    business_cache_info,
+    find_business_by_phone_async,
+    get_due_reminders_async,
+    mark_reminded_async,
+    get_available_slots_async,
+    get_day_slots_async,
+    AVAILABILITY,
+    book_appointment_async,
+    save_business_audio_async,
+    get_business_audio_async,
+    get_business_audio_hash_async,
 )
 
-# ✅ Calendar service import (list_calendars)
+# ✅ Calendar service import (list_calendars) — async facade (executor'da çalışır)
 try:
-    from services.calendar_service import list_calendars
+    from services.calendar_service import list_calendars_async
 except Exception:
     try:
-        from calendar_service import list_calendars  # type: ignore
+        from calendar_service import list_calendars_async  # type: ignore
     except Exception:
-        list_calendars = None  # type: ignore
+        list_calendars_async = None  # type: ignore
+
+# ✅ Yerel takvim aynası (events.list + syncToken)
+try:
+    from services.calendar_service import (
+        CALENDAR_MIRROR,
+        register_mirror_calendar,
+        request_mirror_sync,
+        run_calendar_mirror_worker,
+        watch_calendar_async,
+        calendar_for_channel,
+    )
+except Exception:
+    CALENDAR_MIRROR = None  # type: ignore
+from config import CALENDAR_WEBHOOK_URL, DEFAULT_GOOGLE_CALENDAR_ID
 
 TR_TZ = timezone(timedelta(hours=3))
 
 # ─────────────────────────────────────────
 # PHONE TTS AUDIO CACHE (Twilio <Play> needs a public URL)
 # ─────────────────────────────────────────
-_AUDIO_CACHE: Dict[str, Tuple[bytes, str, datetime]] = {}  # audio_id -> (bytes, media_type, expires_at)
+# Paylaşımlı store: tüm worker'lar aynı klasörden okur, id = metin hash'i (services/audio_store.py)
 
 
-def _cache_audio(data: bytes, media_type: str, ttl_seconds: int = 300) -> str:
-    audio_id = uuid.uuid4().hex
-    _AUDIO_CACHE[audio_id] = (data, media_type, datetime.now(TR_TZ) + timedelta(seconds=ttl_seconds))
+def _media_type_for(fmt: str) -> str:
+    return "audio/mpeg" if (fmt or "").lower() == "mp3" else "audio/wav"
 
-    # opportunistic cleanup
-    now = datetime.now(TR_TZ)
-    for k, (_, __, exp) in list(_AUDIO_CACHE.items()):
-        if exp <= now:
-            _AUDIO_CACHE.pop(k, None)
 
-    return audio_id
+def _audio_id_for_text(text: str) -> str:
+    """Deterministik id: aynı metin (+ses ayarı) = aynı dosya, tüm worker'larda."""
+    return cache_key(text, TTS_VOICE, TTS_RESPONSE_FORMAT)[:32]
+
+
+async def _cache_audio(data: bytes, media_type: str, audio_id: str, ttl_seconds: int = 300) -> str:
+    return await AUDIO_STORE.put(data, media_type, ttl_seconds=ttl_seconds, audio_id=audio_id)
+
+
+def _cache_audio_task(task: "asyncio.Task", text: str, ttl_seconds: int = 300) -> str:
+    """TTS task'i bitmeden audio_id ver (TwiML hemen dönebilsin)."""
+    return AUDIO_STORE.put_task(task, _media_type_for, _audio_id_for_text(text), ttl_seconds=ttl_seconds)
 
 
 async def _tts_url_for_text(base_url: str, text: str) -> str:
@@ -94,19 +129,111 @@ async def _tts_url_for_text(base_url: str, text: str) -> str:
     Freya TTS üret -> cache -> /api/phone/audio/{id}
     """
     try:
+        audio_id = _audio_id_for_text(text)
+        if await AUDIO_STORE.touch(audio_id, ttl_seconds=300):
+            return f"{base_url}/api/phone/audio/{audio_id}"
+
         audio_bytes, fmt = await synthesize_speech(text)
         if not audio_bytes or len(audio_bytes) < 50:
             return ""
-        media_type = "audio/mpeg" if (fmt or "").lower() == "mp3" else "audio/wav"
-        audio_id = _cache_audio(audio_bytes, media_type, ttl_seconds=300)
+        audio_id = await _cache_audio(audio_bytes, _media_type_for(fmt), audio_id, ttl_seconds=300)
+        if not audio_id:
+            return ""
         return f"{base_url}/api/phone/audio/{audio_id}"
     except Exception:
         return ""
 
 
+# ─────────────────────────────────────────
+# İŞLETME SESLERİ (ön-hazır karşılama / fallback)
+# İşletme oluşturulunca + startup'ta bir kez üretilir, DB'de saklanır.
+# Gelen aramada TTS beklenmez: sadece DB'de hash kontrolü.
+# ─────────────────────────────────────────
+NO_INPUT_TEXT = "Sizi tam duyamadım, tekrar söyleyebilir misiniz?"
+
+
+def _welcome_text(biz: dict) -> str:
+    agent = (biz.get("agent_name") or "Asistan")
+    biz_name = (biz.get("name") or "")
+    return f"Merhaba, {biz_name} hoş geldiniz. Ben {agent}. Size nasıl yardımcı olabilirim?"
+
+
+def _test_call_welcome_text(biz: dict) -> str:
+    agent = biz.get("agent_name", "Asistan")
+    biz_name = biz.get("name", "")
+    return f"Merhaba, ben {biz_name}'den {agent}. Size nasıl yardımcı olabilirim?"
+
+
+def _business_audio_texts(biz: dict) -> Dict[str, str]:
+    return {
+        "welcome": _welcome_text(biz),
+        "test_call_welcome": _test_call_welcome_text(biz),
+        "no_input": NO_INPUT_TEXT,
+    }
+
+
+def _audio_hash(text: str) -> str:
+    return cache_key(text, TTS_VOICE, TTS_RESPONSE_FORMAT)
+
+
+async def _prerender_business_audio(biz: dict) -> int:
+    """Eksik/eskimiş işletme seslerini üretir. Kaç ses üretildiğini döndürür."""
+    slug = biz.get("slug") or ""
+    if not slug:
+        return 0
+
+    made = 0
+    for kind, text in _business_audio_texts(biz).items():
+        h = _audio_hash(text)
+        if await get_business_audio_hash_async(slug, kind) == h:
+            continue
+        audio_bytes, fmt = await synthesize_speech(text)
+        if not audio_bytes or len(audio_bytes) < 50:
+            print(f"[BIZ-AUDIO] {slug}/{kind} üretilemedi")
+            continue
+        await save_business_audio_async(slug, kind, h, audio_bytes, fmt)
+        made += 1
+
+    if made:
+        print(f"[BIZ-AUDIO] {slug}: {made} ses hazırlandı")
+
+    # SSS cevapları sabit metin: TTS cache'i ısıt (ilk soruda da beklenmesin)
+    for text in faq_texts(biz):
+        await synthesize_speech(text)
+    return made
+
+
+async def _prerender_all_business_audio():
+    for biz in await list_businesses_async():
+        try:
+            await _prerender_business_audio(biz)
+        except Exception as e:
+            print(f"[BIZ-AUDIO] Hata ({biz.get('slug')}): {e}")
+
+
+async def _business_audio_url(base_url: str, slug: str, kind: str, text: str) -> str:
+    """Ön-hazır ses metinle uyuşuyorsa URL, yoksa ''."""
+    if not slug:
+        return ""
+    h = _audio_hash(text)
+    if await get_business_audio_hash_async(slug, kind) != h:
+        return ""
+    return f"{base_url}/api/phone/business-audio/{slug}/{kind}?v={h[:12]}"
+
+
 # ─────────────────────────────────────────
 # HELPERS
 # ─────────────────────────────────────────
+async def _faq_reply(session_id: str, biz: dict, user_text: str) -> Optional[str]:
+    """SSS hızlı yolu: eminsek LLM'siz cevap (geçmişe de yazılır), değilsek None."""
+    answer = answer_faq(user_text, biz)
+    if answer is None:
+        return None
+    print(f"[FAQ] -> \"{answer[:80]}\"")
+    await record_exchange(user_text, answer, session_id, biz)
+    return answer
+
+
 def _norm(s: str) -> str:
     return (s or "").strip()
 
@@ -390,8 +517,10 @@ def _target_date(text: str) -> str:
     return explicit
 
 
-def _slots_set(slug: str, days: int = 7, slot_minutes: int = 30) -> Tuple[List[Dict[str, Any]], set]:
-    slots = get_available_slots(slug, days=days, slot_minutes=slot_minutes) or []
+async def _slots_set(slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0) -> Tuple[List[Dict[str, Any]], set]:
+    slots = await get_available_slots_async(
+        slug, days=days, slot_minutes=slot_minutes, duration_minutes=duration_minutes
+    ) or []
     sset = set([s.get("slot_at") for s in slots if s.get("slot_at")])
     return slots, sset
 
@@ -451,52 +580,12 @@ def _format_services_for_prompt(services: List[Dict[str, Any]]) -> str:
     return "\n".join(lines) if lines else ""
 
 
-def _allowed_weekdays_from_working_hours(wh: str) -> Optional[set]:
-    """
-    'Pzt-Cuma 12:00-19:00' gibi metinden çalışma günlerini çıkar.
-    """
-    t = _lower(wh)
-    if not t:
-        return None
-
-    map_tok = {
-        "pzt": 0, "pazartesi": 0,
-        "sal": 1, "sali": 1, "salı": 1,
-        "car": 2, "çar": 2, "cars": 2, "çarş": 2, "carsamba": 2, "çarşamba": 2,
-        "per": 3, "persembe": 3, "perşembe": 3,
-        "cum": 4, "cuma": 4,
-        "cmt": 5, "cumartesi": 5,
-        "paz": 6, "pazar": 6,
-    }
-
-    m = re.search(r"\b([a-zçğıöşü]{2,9})\s*-\s*([a-zçğıöşü]{2,9})\b", t)
-    if not m:
-        return None
-
-    a = m.group(1).strip().lower()
-    b = m.group(2).strip().lower()
-    if a not in map_tok or b not in map_tok:
-        return None
-
-    wa, wb = map_tok[a], map_tok[b]
-    allowed = set()
-    cur = wa
-    allowed.add(cur)
-    while cur != wb:
-        cur = (cur + 1) % 7
-        allowed.add(cur)
-        if len(allowed) > 7:
-            break
-    return allowed
-
-
-def _is_open_on_date(working_hours: str, date_ymd: str) -> Optional[bool]:
-    allowed = _allowed_weekdays_from_working_hours(working_hours or "")
-    if allowed is None:
+def _is_open_on_date(biz: dict, date_ymd: str) -> Optional[bool]:
+    sched = schedule_for(biz)
+    if sched.allowed_weekdays is None and not sched.closures:
         return None
     try:
-        dt = datetime.strptime(date_ymd, "%Y-%m-%d").replace(tzinfo=TR_TZ)
-        return dt.weekday() in allowed
+        return sched.is_open_on(datetime.strptime(date_ymd, "%Y-%m-%d").date())
     except Exception:
         return None
 
@@ -529,7 +618,7 @@ async def home():
 
 @app.get("/chat/{slug}", response_class=HTMLResponse)
 async def chat_page(slug: str):
-    biz = get_business_by_slug(slug)
+    biz = await get_business_by_slug_async(slug)
     if not biz:
         return HTMLResponse("<h1>İşletme bulunamadı</h1>", status_code=404)
 
@@ -552,7 +641,14 @@ async def chat_page(slug: str):
 @app.post("/api/businesses")
 async def api_create_business(request: Request):
     data = await request.json()
-    biz = create_business(data)
+    biz = await create_business_async(data)
+
+    # Karşılama/fallback seslerini arka planda hazırla
+    asyncio.create_task(_prerender_business_audio(biz))
+
+    # Takvimi aynaya ekle
+    if CALENDAR_MIRROR is not None:
+        register_mirror_calendar(_biz_calendar_id(biz))
 
     phone = (data.get("phone") or "").strip()
     if phone and TWILIO_AVAILABLE:
@@ -564,12 +660,12 @@ async def api_create_business(request: Request):
 
 @app.get("/api/businesses")
 async def api_list_businesses():
-    return JSONResponse(list_businesses())
+    return JSONResponse(await list_businesses_async())
 
 
 @app.get("/api/businesses/{slug}")
 async def api_get_business(slug: str):
-    biz = get_business_by_slug(slug)
+    biz = await get_business_by_slug_async(slug)
     if not biz:
         return JSONResponse({"error": "Bulunamadi"}, status_code=404)
     return JSONResponse(biz)
@@ -577,7 +673,7 @@ async def api_get_business(slug: str):
 
 @app.delete("/api/businesses/{slug}")
 async def api_delete_business(slug: str):
-    delete_business(slug)
+    await delete_business_async(slug)
     return JSONResponse({"status": "ok"})
 
 # ─────────────────────────────────────────
@@ -585,10 +681,10 @@ async def api_delete_business(slug: str):
 # ─────────────────────────────────────────
 @app.get("/api/calendars")
 async def api_calendars():
-    if not list_calendars:
+    if not list_calendars_async:
         return JSONResponse({"error": "calendar_service list_calendars import edilemedi"}, status_code=500)
 
-    items, err = list_calendars()
+    items, err = await list_calendars_async()
     if err:
         return JSONResponse({"error": err, "items": items}, status_code=400)
 
@@ -598,8 +694,8 @@ async def api_calendars():
 @app.get("/api/calendar/whoami")
 async def api_calendar_whoami():
     try:
-        from services.calendar_service import whoami
-        return JSONResponse({"service_account": whoami()})
+        from services.calendar_service import whoami_async
+        return JSONResponse({"service_account": await whoami_async()})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -607,20 +703,49 @@ async def api_calendar_whoami():
 @app.post("/api/calendars/add")
 async def api_calendars_add(calendar_id: str):
     try:
-        from services.calendar_service import add_calendar_to_list
-        ok, err = add_calendar_to_list(calendar_id)
+        from services.calendar_service import add_calendar_to_list_async
+        ok, err = await add_calendar_to_list_async(calendar_id)
         if not ok:
             return JSONResponse({"ok": False, "error": err}, status_code=400)
         return JSONResponse({"ok": True, "added": calendar_id})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@app.post("/api/calendar/notify")
+async def api_calendar_notify(request: Request):
+    """Google push bildirimi (events.watch): ilgili takvimi hemen senkronla."""
+    channel_id = request.headers.get("x-goog-channel-id", "")
+    state = request.headers.get("x-goog-resource-state", "")
+    cal_id = calendar_for_channel(channel_id) if CALENDAR_MIRROR is not None else ""
+    if cal_id and state != "sync":
+        print(f"[Mirror] Push: {cal_id} ({state})")
+        request_mirror_sync()
+    return Response(status_code=200)
+
+
+def _biz_calendar_id(biz: dict) -> str:
+    return (biz.get("google_calendar_id") or "").strip() or (DEFAULT_GOOGLE_CALENDAR_ID or "").strip()
+
+
+async def _start_calendar_mirror():
+    if CALENDAR_MIRROR is None:
+        return
+    cal_ids = {c for c in (_biz_calendar_id(b) for b in await list_businesses_async()) if c}
+    for cal_id in cal_ids:
+        register_mirror_calendar(cal_id)
+    asyncio.create_task(run_calendar_mirror_worker())
+
+    if CALENDAR_WEBHOOK_URL:
+        for cal_id in cal_ids:
+            await watch_calendar_async(cal_id, CALENDAR_WEBHOOK_URL)
+
+
 # ─────────────────────────────────────────
 # SLOTS API
 # ─────────────────────────────────────────
 @app.get("/api/chat/{slug}/slots")
-async def api_slots(slug: str, days: int = 7, slot_minutes: int = 30):
-    slots = get_available_slots(slug, days=days, slot_minutes=slot_minutes)
+async def api_slots(slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0):
+    slots = await get_available_slots_async(slug, days=days, slot_minutes=slot_minutes, duration_minutes=duration_minutes)
     return JSONResponse(slots)
 
 
@@ -649,7 +774,7 @@ async def _try_auto_book_from_llm(slug: str, session_id: str, ai_text: str) -> s
     print(f"[AUTO-BOOK] slot={slot_at} name={name} phone={phone}")
 
     try:
-        booked = book_appointment(
+        booked = await book_appointment_async(
             slug=slug, slot_at=slot_at,
             customer_name=name, customer_phone=phone,
             session_id=session_id, duration_minutes=30,
@@ -669,15 +794,98 @@ async def _try_auto_book_from_llm(slug: str, session_id: str, ai_text: str) -> s
         return clean
 
 
+# ─────────────────────────────────────────
+# LLM ARAÇLARI (aynı turda, sunucu tarafında)
+# ─────────────────────────────────────────
+# LLM "ARAC: {...}" yazınca llm_service bunları çağırır, sonucu modele
+# geri verir, model aynı turda cevabı tamamlar. Müsaitlik kontrolü +
+# booking tek turda biter (her ara adım ayrı STT+LLM+TTS turu ödemez).
+# LLM_TOOL_MODE=0 ise eski RANDEVU: satırı + _try_auto_book_from_llm.
+
+def _tool_service(biz: dict, name: Any) -> Optional[Dict[str, Any]]:
+    return _match_by_name(str(name or ""), _biz_services(biz), key="name") if name else None
+
+
+async def _tool_check_slots(args: Dict[str, Any], biz: dict, session_id: str) -> Dict[str, Any]:
+    date_ymd = str(args.get("date") or "").strip()[:10]
+    try:
+        day = datetime.strptime(date_ymd, "%Y-%m-%d").date()
+    except ValueError:
+        return {"ok": False, "error": "date YYYY-MM-DD olmali"}
+    svc = _tool_service(biz, args.get("service"))
+    dur = int((svc or {}).get("duration") or 0)
+    slots = await get_day_slots_async(biz["slug"], date_ymd, duration_minutes=dur)
+    free = [s["slot_at"][11:16] for s in slots if s.get("slot_at")]
+    out: Dict[str, Any] = {"ok": True, "date": date_ymd, "free": free[:16]}
+    if not free:
+        out["open"] = schedule_for(biz).is_open_on(day)
+    return out
+
+
+async def _tool_book(args: Dict[str, Any], biz: dict, session_id: str) -> Dict[str, Any]:
+    slot_at = str(args.get("datetime") or "").strip()
+    name = _norm(str(args.get("name") or ""))
+    phone = _norm(str(args.get("phone") or ""))
+    if not re.fullmatch(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}", slot_at):
+        return {"ok": False, "error": "datetime YYYY-MM-DD HH:MM olmali"}
+    if not name or not phone:
+        return {"ok": False, "error": "ad soyad ve telefon gerekli"}
+    svc = _tool_service(biz, args.get("service")) or {}
+    try:
+        booked = await book_appointment_async(
+            slug=biz["slug"], slot_at=slot_at,
+            customer_name=name, customer_phone=phone,
+            session_id=session_id,
+            duration_minutes=int(svc.get("duration") or 30),
+            service_name=_norm(svc.get("name", "")),
+            price_tl=int(svc.get("price") or 0),
+        )
+    except Exception as e:
+        print(f"[TOOL-BOOK] ❌ Hata: {e}")
+        return {"ok": False, "error": str(e)}
+    print(f"[TOOL-BOOK] ✅ OK: {booked}")
+    return {"ok": True, "slot_at": booked.get("slot_at", slot_at)}
+
+
+async def _tool_suggest_alternatives(args: Dict[str, Any], biz: dict, session_id: str) -> Dict[str, Any]:
+    svc = _tool_service(biz, args.get("service"))
+    slots = await get_available_slots_async(
+        biz["slug"], days=14, duration_minutes=int((svc or {}).get("duration") or 0)
+    ) or []
+    try:
+        want = datetime.strptime(str(args.get("datetime") or "").strip(), "%Y-%m-%d %H:%M")
+    except ValueError:
+        want = None
+    if want is not None:
+        slots = sorted(
+            slots,
+            key=lambda s: abs((datetime.strptime(s["slot_at"], "%Y-%m-%d %H:%M") - want).total_seconds()),
+        )
+    return {"ok": True, "slots": [s["slot_at"] for s in slots[:3]]}
+
+
+register_tool("check_slots", _tool_check_slots)
+register_tool("book", _tool_book)
+register_tool("suggest_alternatives", _tool_suggest_alternatives)
+
+
 # ─────────────────────────────────────────
 # BOOKING CORE (STATE DESTEKLİ - TEMİZ HAL)
 # ─────────────────────────────────────────
 async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text: str) -> str:
-    biz = get_business_by_slug(slug)
+    try:
+        return await _booking_turn(slug, session_id, user_text)
+    finally:
+        # Tur içinde değişen state'i kaydet (booking bittiyse zaten silinmiş)
+        PHONE_STATE.save(session_id)
+
+
+async def _booking_turn(slug: str, session_id: str, user_text: str) -> str:
+    biz = await get_business_by_slug_async(slug)
     if not biz:
         return "İşletme bulunamadı."
 
-    st = _get_state(session_id)
+    st = await _get_state(session_id)
 
     # -------------------------------------------------------------
     # 0) Eğer state'te seçilmiş slot varsa:
@@ -719,7 +927,7 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
 
             if final_name and final_phone and final_approved:
                 try:
-                    booked = book_appointment(
+                    booked = await book_appointment_async(
                         slug=slug,
                         slot_at=chosen,
                         customer_name=final_name,
@@ -769,13 +977,14 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
 
 
     if (not _has_booking_intent(user_text)) and (not booking_in_progress):
-        return await chat(user_text, session_id, biz)
+        return await _faq_reply(session_id, biz, user_text) or await chat(user_text, session_id, biz)
 
 
     # -------------------------------------------------------------
     # 2) Slot havuzunu çek
     # -------------------------------------------------------------
-    slots, slot_set = _slots_set(slug, days=7, slot_minutes=30)
+    # Hizmet seçildiyse süresi sığan başlangıçlar (90 dk -> 3 ardışık boş slot)
+    slots, _ = await _slots_set(slug, days=7, slot_minutes=30, duration_minutes=int(st.get("duration_minutes") or 0))
 
     effective_text = user_text
     if st.get("pending_request_text"):
@@ -788,12 +997,13 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
     time_hhmm = _extract_time_hhmm(effective_text)
 
 
-    # ✅ KRITIK FIX: TR konuşma saat düzeltme (işletme 12:00 sonrası açıksa)
+    # ✅ KRITIK FIX: TR konuşma saat düzeltme (o gün hh:mm kapalı, hh+12 açıksa)
     # "saat 3" -> 15:00, "2.30" -> 14:30
     if time_hhmm:
         try:
             hh, mm = map(int, time_hhmm.split(":"))
-            hh2, mm2, changed = normalize_ambiguous_time(hh, mm, biz.get("working_hours", ""))
+            day = datetime.strptime(date_ymd, "%Y-%m-%d").date() if re.fullmatch(r"\d{4}-\d{2}-\d{2}", date_ymd or "") else None
+            hh2, mm2, changed = normalize_ambiguous_time(hh, mm, schedule_for(biz), day)
             if changed:
                 time_hhmm = f"{hh2:02d}:{mm2:02d}"
         except Exception:
@@ -804,9 +1014,12 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
 
     requested_exact = f"{date_ymd} {time_hhmm}" if time_hhmm else ""
 
+    # Gün slotları indeksten (genel listenin ilk N slotuyla sınırlı değil)
+    day_slots = await get_day_slots_async(slug, date_ymd, duration_minutes=int(st.get("duration_minutes") or 0))
+    day_set = set([s.get("slot_at") for s in day_slots if s.get("slot_at")])
+
     # Kullanıcı net saat söylediyse ve yoksa: asla "oluşturuyorum" deme
-    if requested_exact and (requested_exact not in slot_set):
-        day_slots = [s for s in (slots or []) if (s.get("slot_at", "") or "").startswith(date_ymd)]
+    if requested_exact and (requested_exact not in day_set):
         top_day = _suggest_top3(day_slots)
         top_any = _suggest_top3(slots)
 
@@ -883,11 +1096,13 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
     # -------------------------------------------------------------
     chosen = None
 
-    day_slots = [s for s in (slots or []) if (s.get("slot_at", "") or "").startswith(date_ymd)]
+    # Bu turda hizmet seçildiyse süre değişti -> gün slotlarını süreye göre tekrar al (indeksten)
+    day_slots = await get_day_slots_async(slug, date_ymd, duration_minutes=int(st.get("duration_minutes") or 0))
+    day_set = set([s.get("slot_at") for s in day_slots if s.get("slot_at")])
     day_slots_sorted = sorted([s.get("slot_at") for s in day_slots if s.get("slot_at")])
 
     if time_hhmm:
-        if requested_exact in slot_set:
+        if requested_exact in day_set:
             chosen = requested_exact
         else:
             top_day = _suggest_top3(day_slots)
@@ -923,7 +1138,7 @@ async def _handle_message_and_maybe_book(slug: str, session_id: str, user_text:
 
     if final_name and final_phone and final_approved:
         try:
-            booked = book_appointment(
+            booked = await book_appointment_async(
                 slug=slug,
                 slot_at=chosen,
                 customer_name=final_name,
@@ -952,7 +1167,7 @@ async def voice_chat(
     audio: UploadFile = File(...),
     session_id: str = Form(default=None),
 ):
-    biz = get_business_by_slug(slug)
+    biz = await get_business_by_slug_async(slug)
     if not biz:
         return JSONResponse({"error": "Isletme bulunamadi"}, status_code=404)
 
@@ -965,12 +1180,14 @@ async def voice_chat(
         user_text = await transcribe_audio(audio_bytes, audio.filename or "audio.wav", biz)
 
         if not user_text or not user_text.strip():
+            # Ön-hazır fallback sesi varsa onu gönder
+            item = await get_business_audio_async(slug, "no_input")
             return JSONResponse({
                 "session_id": session_id,
                 "user_text": "",
-                "ai_text": "Sizi tam duyamadım, tekrar söyleyebilir misiniz?",
-                "ai_audio": "",
-                "audio_format": "wav",
+                "ai_text": NO_INPUT_TEXT,
+                "ai_audio": base64.b64encode(item["audio"]).decode("utf-8") if item else "",
+                "audio_format": item["audio_format"] if item else "wav",
             })
 
         ai_response = await _handle_message_and_maybe_book(slug, session_id, user_text)
@@ -1003,7 +1220,7 @@ async def text_chat(
     message: str = Form(...),
     session_id: str = Form(default="default"),
 ):
-    biz = get_business_by_slug(slug)
+    biz = await get_business_by_slug_async(slug)
     if not biz:
         return JSONResponse({"error": "Isletme bulunamadi"}, status_code=404)
 
@@ -1041,23 +1258,25 @@ async def health():
         "status": "ok",
         "twilio": TWILIO_AVAILABLE,
         "twilio_phone": TWILIO_PHONE_NUMBER or "(ayarlanmamış)",
+        "tts_cache": get_tts_cache().info() if get_tts_cache() else None,
+        "audio_store": AUDIO_STORE.info(),
+        "calendar_mirror": CALENDAR_MIRROR.info() if CALENDAR_MIRROR is not None else None,
+        "availability_index": AVAILABILITY.info(),
+        "business_cache": business_cache_info(),
+        "db_pool": db_pool_info(),
+        "db_executor": db_executor_info(),
+        "llm": llm_stats(),
+        "faq": faq_stats(),
+        "sessions": {"chat": CHAT_SESSIONS.info(), "phone": PHONE_STATE.info(), "backend": get_session_backend().info()},
     }
 
 
 # ═══════════════════════════════════════════════════════════════════
 #                   TELEFON ENDPOINT'LERİ (Twilio)
 # ═══════════════════════════════════════════════════════════════════
-def _find_business_by_twilio_number(called_number: str):
-    businesses = list_businesses()
-    clean = re.sub(r"[^\d]", "", called_number or "")
-
-    for biz in businesses:
-        biz_phone = re.sub(r"[^\d]", "", biz.get("phone", "") or "")
-        if biz_phone and len(biz_phone) >= 10 and len(clean) >= 10:
-            if clean[-10:] == biz_phone[-10:]:
-                return biz
-
-    return businesses[0] if businesses else None
+async def _find_business_by_twilio_number(called_number: str):
+    # phone_key indeksi (son 10 hane); eşleşme yoksa en son eklenen işletme
+    return await find_business_by_phone_async(called_number)
 
 
 def _configure_twilio_webhook(twilio_number: str, base_url: str):
@@ -1100,7 +1319,7 @@ def _get_base_url(request: Request) -> str:
 
 @app.get("/api/phone/test")
 async def phone_test():
-    businesses = list_businesses()
+    businesses = await list_businesses_async()
     return {
         "status": "ok",
         "twilio_available": TWILIO_AVAILABLE,
@@ -1113,16 +1332,30 @@ async def phone_test():
 
 @app.get("/api/phone/audio/{audio_id}")
 async def phone_audio(audio_id: str):
-    item = _AUDIO_CACHE.get(audio_id)
+    # Pipeline cümlesi: TTS bitene kadar bekle
+    await AUDIO_STORE.wait_pending(audio_id, timeout=10.0)
+
+    item = await AUDIO_STORE.get(audio_id)
     if not item:
         return Response(status_code=404)
 
-    data, media_type, exp = item
-    if exp <= datetime.now(TR_TZ):
-        _AUDIO_CACHE.pop(audio_id, None)
-        return Response(status_code=404)
+    if item.path:
+        # Temp dosyaya taşınmış büyük klip → sendfile
+        return FileResponse(item.path, media_type=item.media_type)
+    return Response(content=item.data, media_type=item.media_type)
 
-    return Response(content=data, media_type=media_type)
+
+@app.get("/api/phone/business-audio/{slug}/{kind}")
+async def phone_business_audio(slug: str, kind: str):
+    item = await get_business_audio_async(slug, kind)
+    if not item:
+        return Response(status_code=404)
+    # URL ?v=hash taşıdığı için güvenle cache'lenebilir
+    return Response(
+        content=item["audio"],
+        media_type=_media_type_for(item["audio_format"]),
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
 
 
 @app.post("/api/phone/incoming")
@@ -1140,7 +1373,7 @@ async def phone_incoming(request: Request):
         print(f"  CallSid: {call_sid}")
         print(f"{'='*50}")
 
-        biz = _find_business_by_twilio_number(to_number)
+        biz = await _find_business_by_twilio_number(to_number)
 
         if not biz:
             twiml = """<?xml version="1.0" encoding="UTF-8"?>
@@ -1154,10 +1387,11 @@ async def phone_incoming(request: Request):
 
         base_url = _get_base_url(request)
 
-        agent = (biz.get("agent_name") or "Asistan")
-        biz_name = (biz.get("name") or "")
-        welcome_text = f"Merhaba, {biz_name} hoş geldiniz. Ben {agent}. Size nasıl yardımcı olabilirim?"
-        welcome_audio_url = await _tts_url_for_text(base_url, welcome_text)
+        welcome_text = _welcome_text(biz)
+        welcome_audio_url = (
+            await _business_audio_url(base_url, biz["slug"], "welcome", welcome_text)
+            or await _tts_url_for_text(base_url, welcome_text)
+        )
 
         twiml = create_welcome_twiml(biz, base_url, welcome_audio_url)
         return Response(content=twiml, media_type="application/xml")
@@ -1189,7 +1423,8 @@ async def phone_gather(
     YENİ YAKLAŞIM:
     - Sade chat() (LLM) kullan → doğal, sıcak konuşma
     - LLM prompt'ta randevu akışını biliyor (hizmet→tarih→saat→onay→ad+tel)
-    - LLM RANDEVU: formatı yazınca _try_auto_book_from_llm() otomatik book eder
+    - LLM araçları (check_slots / book / suggest_alternatives) aynı turda çalışır;
+      LLM_TOOL_MODE=0 ise RANDEVU: formatını _try_auto_book_from_llm() book eder
     - Google Calendar SADECE booking anında çağrılır (her turda değil)
     
     Freya TTS + <Play> KALIYOR.
@@ -1209,17 +1444,20 @@ async def phone_gather(
 
         # Müşteri konuşmadı
         if not speech_result or not (speech_result or "").strip():
-            ai_text = "Sizi tam duyamadım, tekrar söyleyebilir misiniz?"
-            audio_url = await _tts_url_for_text(base_url, ai_text)
+            ai_text = NO_INPUT_TEXT
+            audio_url = (
+                await _business_audio_url(base_url, slug, "no_input", ai_text)
+                or await _tts_url_for_text(base_url, ai_text)
+            )
             twiml = create_response_twiml(ai_text, slug, session_id, base_url, end_call=False, audio_url=audio_url)
             return Response(content=twiml, media_type="application/xml")
 
         # İşletmeyi bul
-        biz = get_business_by_slug(slug) if slug else None
+        biz = await get_business_by_slug_async(slug) if slug else None
         if not biz:
-            biz = _find_business_by_twilio_number(form.get("To", ""))
+            biz = await _find_business_by_twilio_number(form.get("To", ""))
         if not biz:
-            biz = _find_business_by_twilio_number("")
+            biz = await _find_business_by_twilio_number("")
         if not biz:
             twiml = '<?xml version="1.0" encoding="UTF-8"?><Response><Say language="tr-TR">Bir sorun oluştu.</Say><Hangup/></Response>'
             return Response(content=twiml, media_type="application/xml")
@@ -1230,19 +1468,38 @@ async def phone_gather(
         # LLM doğal konuşma yapar, prompt'ta randevu akışını biliyor.
         # "Merhaba nasılsınız" → sıcak cevap verir
         # "Randevu istiyorum" → hizmet sorar, sonra gün/saat sorar
-        # Tüm bilgiler tamam olunca RANDEVU: formatı yazar
-        ai_response = await chat(speech_result, session_id, biz)
-
-        # LLM "RANDEVU: 2026-02-16 14:30 | Ad Soyad | 05551234567" yazdıysa → auto book
-        ai_response = await _try_auto_book_from_llm(effective_slug, session_id, ai_response)
+        # Tüm bilgiler tamam olunca book aracını çağırır (araç modu kapalıysa RANDEVU: satırı)
+        #
+        # LLM_STREAMING: token'lar geldikçe cümle cümle TTS başlar;
+        # cevap bitince TwiML her cümle için ayrı <Play> içerir.
+        pieces = []
+        # SSS (adres/saat/fiyat/personel): sabit metin, LLM yok, ses TTS cache'ten
+        ai_response = await _faq_reply(session_id, biz, speech_result)
+        if ai_response is None:
+            if LLM_STREAMING:
+                ai_response, pieces = await stream_reply_with_tts(speech_result, session_id, biz)
+            else:
+                ai_response = await chat(speech_result, session_id, biz)
+
+        # Araç modu kapalıysa: LLM "RANDEVU: 2026-02-16 14:30 | Ad Soyad | 05551234567" yazdıysa → auto book
+        if not LLM_TOOL_MODE:
+            ai_response = await _try_auto_book_from_llm(effective_slug, session_id, ai_response)
 
         print(f'  🤖 AI: "{ai_response}"')
 
         # ═══ FREYA TTS + <Play> ═══
-        audio_url = await _tts_url_for_text(base_url, ai_response)
+        audio_urls = []
+        if pieces and same_spoken_text(" ".join(p for p, _ in pieces), ai_response):
+            audio_urls = [f"{base_url}/api/phone/audio/{_cache_audio_task(t, p)}" for p, t in pieces]
+        else:
+            # Booking sonrası metin değişti (ya da stream yok) → tek parça TTS
+            cancel_pieces(pieces)
+            audio_url = await _tts_url_for_text(base_url, ai_response)
+            if audio_url:
+                audio_urls = [audio_url]
         end_call = should_end_call(ai_response)
 
-        twiml = create_response_twiml(ai_response, effective_slug, session_id, base_url, end_call, audio_url=audio_url)
+        twiml = create_response_twiml(ai_response, effective_slug, session_id, base_url, end_call, audio_urls=audio_urls)
         return Response(content=twiml, media_type="application/xml")
 
     except Exception as e:
@@ -1290,9 +1547,9 @@ async def phone_test_call(request: Request):
             status_code=500
         )
 
-    biz = get_business_by_slug(slug) if slug else None
+    biz = await get_business_by_slug_async(slug) if slug else None
     if not biz:
-        businesses = list_businesses()
+        businesses = await list_businesses_async()
         biz = businesses[0] if businesses else None
     if not biz:
         return JSONResponse({"error": "İşletme bulunamadı"}, status_code=404)
@@ -1301,11 +1558,12 @@ async def phone_test_call(request: Request):
     formatted_phone = format_phone_for_twilio(phone)
 
     try:
-        agent = biz.get("agent_name", "Asistan")
-        biz_name = biz.get("name", "")
-        welcome = f"Merhaba, ben {biz_name}'den {agent}. Size nasıl yardımcı olabilirim?"
+        welcome = _test_call_welcome_text(biz)
 
-        welcome_audio_url = await _tts_url_for_text(base_url, welcome)
+        welcome_audio_url = (
+            await _business_audio_url(base_url, biz["slug"], "test_call_welcome", welcome)
+            or await _tts_url_for_text(base_url, welcome)
+        )
         play_or_say = f"<Play>{welcome_audio_url}</Play>" if welcome_audio_url else f'<Say language="tr-TR">{welcome}</Say>'
 
         twiml_str = f"""<Response>
@@ -1337,7 +1595,6 @@ async def phone_test_call(request: Request):
 # ═══════════════════════════════════════════════════════════════════
 #               RANDEVU HATIRLATMA ZAMANLAYICISI
 # ═══════════════════════════════════════════════════════════════════
-import asyncio
 
 async def reminder_scheduler():
     print("[REMINDER] Hatırlatma zamanlayıcısı başlatıldı")
@@ -1349,32 +1606,13 @@ async def reminder_scheduler():
             continue
 
         try:
-            import sqlite3
-            from config import DB_PATH
-
             now = datetime.now(TR_TZ)
             four_hours = now + timedelta(hours=4)
 
-            conn = sqlite3.connect(str(DB_PATH))
-            conn.row_factory = sqlite3.Row
-
-            try:
-                conn.execute("ALTER TABLE appointments ADD COLUMN reminded INTEGER DEFAULT 0")
-                conn.commit()
-            except Exception:
-                pass
-
-            rows = conn.execute("""
-                SELECT a.*, b.name as business_name
-                FROM appointments a
-                JOIN businesses b ON b.slug = a.business_slug
-                WHERE a.slot_at >= ? AND a.slot_at <= ?
-                AND a.customer_phone != ''
-                AND (a.reminded IS NULL OR a.reminded = 0)
-            """, (
+            rows = await get_due_reminders_async(
                 now.strftime("%Y-%m-%d %H:%M"),
                 four_hours.strftime("%Y-%m-%d %H:%M"),
-            )).fetchall()
+            )
 
             for row in rows:
                 phone = format_phone_for_twilio(row["customer_phone"])
@@ -1391,13 +1629,7 @@ async def reminder_scheduler():
                 )
 
                 if success:
-                    conn.execute(
-                        "UPDATE appointments SET reminded = 1 WHERE id = ?",
-                        (row["id"],)
-                    )
-                    conn.commit()
-
-            conn.close()
+                    await mark_reminded_async(row["id"])
 
         except Exception as e:
             print(f"[REMINDER] Hata: {e}")
@@ -1417,7 +1649,24 @@ async def startup_tasks():
         print("  Tel Numara:   (ayarlanmamış)")
     print("=" * 50 + "\n")
 
+    # fal.run baglantisini onceden ac (ilk turda handshake beklenmesin)
+    asyncio.create_task(warmup_http_client())
     asyncio.create_task(reminder_scheduler())
+    asyncio.create_task(AUDIO_STORE.run_sweeper())
+    asyncio.create_task(CHAT_SESSIONS.run_sweeper())
+    asyncio.create_task(PHONE_STATE.run_sweeper())
+    asyncio.create_task(_start_calendar_mirror())
+    # Mevcut işletmelerin karşılama/fallback sesleri
+    asyncio.create_task(_prerender_all_business_audio())
+
+
+@app.on_event("shutdown")
+async def shutdown_tasks():
+    await close_http_client()
+    AUDIO_STORE.close()
+    flush_db_writes()
+    get_session_backend().flush()
+    close_db_pool()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,367 @@
+# backend/services/audio_store.py
+# ─────────────────────────────────────────────────
+# Twilio <Play> ses deposu (main._AUDIO_CACHE yerine)
+#
+# Eski hali: sinirsiz dict, sadece yeni kayit eklenince temizleniyordu.
+# Yogun aramada yuzlerce MB bellekte kalabiliyordu. Ustelik sadece
+# uretildigi process'te vardi: Twilio'nun <Play> fetch'i baska bir
+# uvicorn worker'ina duserse 404 -> arayan sessizlik duyuyordu.
+#
+# Simdi:
+#   - kaynak: paylasilan klasor (AUDIO_STORE_DIR), her worker okuyabilir
+#     dosya adi = audio_id (icerik hash'i -> ayni metin ayni dosya)
+#     dosya mtime = son kullanma zamani (worker'lar arasi TTL)
+#   - bellek: kucuk kliplerin process ici LRU kopyasi (byte butceli)
+#   - disk butcesi + arka planda periyodik temizlik (sweeper)
+#   - hit/miss/eviction sayaclari (/health)
+#   - pipeline cumleleri: TTS bitmeden id verilir; "<id>.pending" isareti
+#     sayesinde baska worker da dosyanin gelmesini bekleyebilir
+#     (TTS suresinden eski isaret = coken worker'dan kalmis, yok sayilir/silinir)
+#   - dosya islemleri (yazma/okuma/stat/sweep) asyncio.to_thread ile; event
+#     loop'ta sadece bellek LRU'su degisir (paylasimli/ag klasoru aramalari dondurmasin)
+# ─────────────────────────────────────────────────
+
+import asyncio, os, sys, time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    AUDIO_STORE_DIR,
+    AUDIO_STORE_MAX_BYTES,
+    AUDIO_STORE_SPILL_BYTES,
+    AUDIO_STORE_DISK_MAX_BYTES,
+    AUDIO_STORE_SWEEP_SECONDS,
+)
+
+_EXT_TO_MEDIA = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+_MEDIA_TO_EXT = {v: k for k, v in _EXT_TO_MEDIA.items()}
+_PENDING_EXT = "pending"
+# TTS istegi (8 sn) + url'den indirme (8 sn) + pay: bundan eski isaret bayat
+PENDING_MAX_AGE = 20.0
+
+
+class AudioItem:
+    __slots__ = ("data", "path", "media_type", "size", "expires_at")
+
+    def __init__(self, data: Optional[bytes], path: str, media_type: str, size: int, expires_at: float):
+        self.data = data
+        self.path = path
+        self.media_type = media_type
+        self.size = size
+        self.expires_at = expires_at
+
+
+class AudioStore:
+    def __init__(self, directory: str, max_bytes: int, spill_bytes: int, disk_max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.disk_max_bytes = disk_max_bytes
+
+        self._mem: "OrderedDict[str, AudioItem]" = OrderedDict()
+        self._mem_bytes = 0
+        self._pending: Dict[str, "asyncio.Task"] = {}
+
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ── ic yardimcilar ──
+    @staticmethod
+    def _valid_id(audio_id: str) -> bool:
+        # URL'den gelir: path traversal olmasin
+        return bool(audio_id) and audio_id.isalnum() and len(audio_id) <= 64
+
+    def _path(self, audio_id: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.{ext}")
+
+    def _pending_marker(self, audio_id: str) -> str:
+        return os.path.join(self.directory, f"{audio_id}.{_PENDING_EXT}")
+
+    def _find_file(self, audio_id: str):
+        for ext, media_type in _EXT_TO_MEDIA.items():
+            p = self._path(audio_id, ext)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            return p, media_type, st
+        return None
+
+    def _mem_drop(self, audio_id: str):
+        item = self._mem.pop(audio_id, None)
+        if item is not None:
+            self._mem_bytes -= item.size
+
+    def _mem_put(self, audio_id: str, item: AudioItem):
+        if item.data is None or item.size >= self.spill_bytes:
+            return
+        self._mem_drop(audio_id)
+        self._mem[audio_id] = item
+        self._mem_bytes += item.size
+        while self._mem_bytes > self.max_bytes and self._mem:
+            self._mem_drop(next(iter(self._mem)))
+            self.stats["evictions"] += 1
+
+    # ── disk (thread'de; _mem'e dokunmaz) ──
+    def _disk_write(self, path: str, data: bytes, expires_at: float) -> bool:
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)  # atomik: yarim dosya okunmasin
+            except OSError as e:
+                print(f"[AUDIO] Yazma hatasi: {e}")
+                return False
+        os.utime(path, (expires_at, expires_at))
+        return True
+
+    def _disk_touch(self, audio_id: str, ttl_seconds: int) -> Optional[float]:
+        found = self._find_file(audio_id)
+        if not found:
+            return None
+        path, _, st = found
+        expires_at = max(st.st_mtime, time.time() + ttl_seconds)
+        try:
+            os.utime(path, (expires_at, expires_at))
+        except OSError:
+            return None
+        return expires_at
+
+    def _disk_load(self, audio_id: str, now: float):
+        """(AudioItem | None, süresi dolmuş mu)."""
+        found = self._find_file(audio_id)
+        if not found:
+            return None, False
+        path, media_type, st = found
+        if st.st_mtime <= now:
+            return None, True
+        item = AudioItem(None, path, media_type, st.st_size, st.st_mtime)
+        if st.st_size < self.spill_bytes:
+            try:
+                with open(path, "rb") as f:
+                    item.data = f.read()
+            except OSError:
+                pass
+        return item, False
+
+    def _mark_pending(self, marker: str):
+        try:
+            open(marker, "a").close()
+            os.utime(marker, None)  # eski (bayat) isaret kaldiysa tazele
+        except OSError:
+            pass
+
+    @staticmethod
+    def _unmark_pending(marker: str):
+        try:
+            os.remove(marker)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _marker_state(marker: str) -> str:
+        """"gone" | "stale" | "busy"."""
+        try:
+            age = time.time() - os.stat(marker).st_mtime
+        except OSError:
+            return "gone"
+        return "stale" if age > PENDING_MAX_AGE else "busy"
+
+    # ── public (event loop'tan; dosya islemleri thread'de) ──
+    async def put(self, data: bytes, media_type: str, ttl_seconds: int = 300, audio_id: str = "") -> str:
+        """
+        audio_id deterministik olmali (ör. metin hash'i); ayni id = ayni dosya.
+        """
+        if not self._valid_id(audio_id):
+            raise ValueError("gecersiz audio_id")
+        ext = _MEDIA_TO_EXT.get(media_type, "wav")
+        expires_at = time.time() + ttl_seconds
+        path = self._path(audio_id, ext)
+
+        if not await asyncio.to_thread(self._disk_write, path, data, expires_at):
+            return ""
+        self._mem_put(audio_id, AudioItem(data, path, media_type, len(data), expires_at))
+        return audio_id
+
+    async def touch(self, audio_id: str, ttl_seconds: int = 300) -> bool:
+        """Dosya zaten varsa omrunu uzat (TTS'e hic gitmeden)."""
+        if not self._valid_id(audio_id):
+            return False
+        expires_at = await asyncio.to_thread(self._disk_touch, audio_id, ttl_seconds)
+        if expires_at is None:
+            return False
+        item = self._mem.get(audio_id)
+        if item is not None:
+            item.expires_at = expires_at
+        return True
+
+    def put_task(self, task: "asyncio.Task", media_type_for, audio_id: str, ttl_seconds: int = 300) -> str:
+        """
+        TTS task'i bitmeden audio_id ver (TwiML hemen dönebilsin).
+        Task sonucu (bytes, fmt) bitince depoya yazilir; wait_pending
+        bu takip görevini (dosya diske yazılana kadar) bekler.
+        """
+        if audio_id not in self._pending:
+            self._pending[audio_id] = asyncio.ensure_future(
+                self._track(task, media_type_for, audio_id, ttl_seconds)
+            )
+        return audio_id
+
+    async def _track(self, task: "asyncio.Task", media_type_for, audio_id: str, ttl_seconds: int):
+        marker = self._pending_marker(audio_id)
+        try:
+            if await self.touch(audio_id, ttl_seconds):
+                task.cancel()
+                return
+            await asyncio.to_thread(self._mark_pending, marker)
+            try:
+                await asyncio.wait({task})
+                if not task.cancelled() and task.exception() is None:
+                    data, fmt = task.result()
+                    if data and len(data) >= 50:
+                        await self.put(data, media_type_for(fmt), ttl_seconds=ttl_seconds, audio_id=audio_id)
+            finally:
+                await asyncio.to_thread(self._unmark_pending, marker)
+        except Exception as e:
+            print(f"[AUDIO] Arka plan yazma hatasi: {e}")
+        finally:
+            self._pending.pop(audio_id, None)
+
+    async def wait_pending(self, audio_id: str, timeout: float = 10.0):
+        task = self._pending.get(audio_id)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+            except Exception:
+                pass
+            return
+
+        # Baska worker'da uretiliyor olabilir: isaret kalkana kadar bekle
+        if not self._valid_id(audio_id):
+            return
+        marker = self._pending_marker(audio_id)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # "stale": ureten worker coktu; beklemenin anlami yok
+            if await asyncio.to_thread(self._marker_state, marker) != "busy":
+                return
+            await asyncio.sleep(0.05)
+
+    async def get(self, audio_id: str) -> Optional[AudioItem]:
+        now = time.time()
+        item = self._mem.get(audio_id)
+        if item is not None and item.expires_at > now:
+            self._mem.move_to_end(audio_id)
+            self.stats["hits"] += 1
+            return item
+        if item is not None:
+            self._mem_drop(audio_id)
+
+        if not self._valid_id(audio_id):
+            self.stats["misses"] += 1
+            return None
+        item, expired = await asyncio.to_thread(self._disk_load, audio_id, now)
+        if item is None:
+            if expired:
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        if item.data is not None:
+            self._mem_put(audio_id, item)
+        return item
+
+    @staticmethod
+    def _sweep_marker(path: str, now: float):
+        try:
+            if now - os.stat(path).st_mtime > PENDING_MAX_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _sweep_disk(self, now: float):
+        """
+        Thread'de: suresi dolanlari sil, disk butcesini asarsa en yakin bitecekleri sil.
+        _mem'e dokunmaz; silinen id'leri döndürür (bellekten loop'ta düşülür).
+        """
+        removed, evicted = 0, 0
+        dropped = []
+        alive = []
+        for name in os.listdir(self.directory):
+            audio_id, _, ext = name.partition(".")
+            if ext == _PENDING_EXT:
+                self._sweep_marker(os.path.join(self.directory, name), now)
+                continue
+            if ext not in _EXT_TO_MEDIA:
+                continue
+            p = os.path.join(self.directory, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            if st.st_mtime <= now:
+                try:
+                    os.remove(p)
+                    removed += 1
+                except OSError:
+                    pass
+                dropped.append(audio_id)
+                continue
+            alive.append((st.st_mtime, st.st_size, p, audio_id))
+
+        total = sum(a[1] for a in alive)
+        for _, size, p, audio_id in sorted(alive):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(p)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+            dropped.append(audio_id)
+        return removed, evicted, dropped
+
+    async def sweep(self) -> int:
+        now = time.time()
+        removed, evicted, dropped = await asyncio.to_thread(self._sweep_disk, now)
+        # Bellek katmanı sadece loop'ta değişir
+        for audio_id in dropped:
+            self._mem_drop(audio_id)
+        for audio_id in [k for k, it in self._mem.items() if it.expires_at <= now]:
+            self._mem_drop(audio_id)
+
+        self.stats["evictions"] += evicted
+        self.stats["expired"] += removed
+        return removed
+
+    async def run_sweeper(self, interval: float = AUDIO_STORE_SWEEP_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                n = await self.sweep()
+                if n:
+                    print(f"[AUDIO] Sweep: {n} ses silindi ({self._mem_bytes // 1024} KB bellekte)")
+            except Exception as e:
+                print(f"[AUDIO] Sweep hatasi: {e}")
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "mem_items": len(self._mem),
+            "mem_bytes": self._mem_bytes,
+            "pending": len(self._pending),
+            "dir": self.directory,
+        }
+
+    def close(self):
+        # Dosyalar paylasimli: diger worker'lar hala kullaniyor olabilir, silme
+        self._mem.clear()
+        self._mem_bytes = 0
+
+
+AUDIO_STORE = AudioStore(AUDIO_STORE_DIR, AUDIO_STORE_MAX_BYTES, AUDIO_STORE_SPILL_BYTES, AUDIO_STORE_DISK_MAX_BYTES)
@@ -0,0 +1,248 @@
+# backend/services/availability_index.py
+# ─────────────────────────────────────────────────
+# İşletme başına bellek içi müsaitlik indeksi
+#
+# Eski hali: booking akışının her turunda DB dolu seti + gün filtresi +
+# mesai parse + slot ızgarası baştan kuruluyordu (O(gün × slot)).
+#
+# Şimdi: (slug, slot_dk) başına gün -> bitmap (int).
+#   bit i = 1  <=>  gün 00:00 + start_min + i*slot_dk slotu boş
+# Bir kez materyalize edilir, sonra:
+#   - book_appointment        -> ilgili bitler anında sıfırlanır
+#   - takvim aynası değişimi  -> etkilenen günler "dirty", ilk okumada yeniden hesaplanır
+#   - işletme oluştur/sil     -> indeks düşürülür
+#   - TTL (başka worker'ın booking'leri / aynasız freebusy için emniyet)
+# Okuma: O(gün + k). "Şimdi"den önceki slotlar okuma anında atlanır.
+# Uzun hizmet (süre > slot): n ardışık boş slot = bits & bits>>1 & ... >>(n-1)
+#   -> çok-slot taraması yok, gün başına n-1 int işlemi.
+#
+# Yükleme (DB + takvim) database.py'deki loader'da; bu modül saf bellek.
+# Son kapı yine database._slot_is_currently_available — indeks sadece öneri/liste.
+# ─────────────────────────────────────────────────
+
+import threading, time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class _Entry:
+    __slots__ = (
+        "calendar_id", "start_min", "end_min", "slot_minutes", "cap",
+        "clock", "days", "dirty", "built_at", "ttl",
+    )
+
+    def __init__(self, data: dict, slot_minutes: int):
+        self.calendar_id: str = data.get("calendar_id", "")
+        self.start_min: int = data["start_min"]
+        self.end_min: int = data["end_min"]
+        self.slot_minutes = slot_minutes
+        self.cap: int = data.get("cap", 0)
+        self.clock: Callable[[], datetime] = data["clock"]
+        self.days: Dict[date, int] = dict(data["days"])
+        self.dirty: set = set()
+        self.built_at = time.monotonic()
+        self.ttl: float = data["ttl"]
+
+    def fresh(self) -> bool:
+        return time.monotonic() - self.built_at < self.ttl
+
+    def ready(self, first: date, n_days: int) -> bool:
+        for d in range(n_days):
+            day = first + timedelta(days=d)
+            if day not in self.days or day in self.dirty:
+                return False
+        return True
+
+
+def fit_duration(bits: int, need: int) -> int:
+    """Ardından (need-1) slot daha boş olan başlangıçlar."""
+    out = bits
+    for k in range(1, need):
+        out &= bits >> k
+    return out
+
+
+def bitmap_from_slots(slot_starts: Iterable[datetime], start_min: int, slot_minutes: int) -> Dict[date, int]:
+    """Boş slot başlangıçları -> gün başına bitmap."""
+    days: Dict[date, int] = {}
+    for st in slot_starts:
+        i = (st.hour * 60 + st.minute - start_min) // slot_minutes
+        if i < 0:
+            continue
+        d = st.date()
+        days[d] = days.get(d, 0) | (1 << i)
+    return days
+
+
+class AvailabilityIndex:
+    def __init__(self, loader: Callable[..., Optional[dict]]):
+        """
+        loader(slug, slot_minutes, first_day: Optional[date], n_days) -> dict | None
+          {"calendar_id", "start_min", "end_min", "cap", "clock", "ttl",
+           "days": {date: bitmap}}  (first_day None => bugün)
+        """
+        self._loader = loader
+        self._entries: Dict[Tuple[str, int], _Entry] = {}
+        self._gen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "loads": 0, "day_reloads": 0, "invalidations": 0}
+
+    # ── okuma ──
+    def _collect(self, e: _Entry, first: date, n_days: int, cap: int, duration_minutes: int = 0) -> List[dict]:
+        now = e.clock()
+        base = datetime(first.year, first.month, first.day)
+        need = max(1, -(-duration_minutes // e.slot_minutes))
+        out: List[dict] = []
+        for d in range(n_days):
+            bits = fit_duration(e.days.get(first + timedelta(days=d), 0), need)
+            day0 = base + timedelta(days=d, minutes=e.start_min)
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                st = day0 + timedelta(minutes=(low.bit_length() - 1) * e.slot_minutes)
+                if st <= now:
+                    continue
+                out.append({"slot_at": st.strftime("%Y-%m-%d %H:%M"), "display": st.strftime("%d.%m.%Y %H:%M")})
+                if cap and len(out) >= cap:
+                    return out
+        return out
+
+    def _ready_entry(self, slug: str, slot_minutes: int, first: Optional[date], n_days: int) -> Optional[_Entry]:
+        with self._lock:
+            e = self._entries.get((slug, slot_minutes))
+        if e is None or not e.fresh():
+            return None
+        if not e.ready(first or e.clock().date(), n_days):
+            return None
+        return e
+
+    def peek(self, slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0) -> Optional[List[dict]]:
+        """Sadece bellekten. Hazır değilse None (çağıran blocking yola düşer)."""
+        e = self._ready_entry(slug, slot_minutes, None, days)
+        if e is None:
+            return None
+        self.stats["hits"] += 1
+        return self._collect(e, e.clock().date(), days, e.cap, duration_minutes)
+
+    def peek_day(self, slug: str, day: date, slot_minutes: int = 30, duration_minutes: int = 0) -> Optional[List[dict]]:
+        e = self._ready_entry(slug, slot_minutes, day, 1)
+        if e is None:
+            return None
+        self.stats["hits"] += 1
+        return self._collect(e, day, 1, 0, duration_minutes)
+
+    def slots(self, slug: str, days: int = 7, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+        """Blocking: eksik/dirty günleri yükler (executor thread'inde çağır)."""
+        out = self.peek(slug, days, slot_minutes, duration_minutes)
+        if out is not None:
+            return out
+        e = self._ensure(slug, slot_minutes, None, days)
+        return self._collect(e, e.clock().date(), days, e.cap, duration_minutes) if e else []
+
+    def day(self, slug: str, day: date, slot_minutes: int = 30, duration_minutes: int = 0) -> List[dict]:
+        out = self.peek_day(slug, day, slot_minutes, duration_minutes)
+        if out is not None:
+            return out
+        e = self._ensure(slug, slot_minutes, day, 1)
+        return self._collect(e, day, 1, 0, duration_minutes) if e else []
+
+    # ── yükleme ──
+    def _ensure(self, slug: str, slot_minutes: int, first: Optional[date], n_days: int) -> Optional[_Entry]:
+        self.stats["misses"] += 1
+        key = (slug, slot_minutes)
+        with self._lock:
+            e = self._entries.get(key)
+            gen = self._gen.get(slug, 0)
+
+        if e is None or not e.fresh():
+            data = self._loader(slug, slot_minutes, first, n_days)
+            self.stats["loads"] += 1
+            if not data:
+                return None
+            e = _Entry(data, slot_minutes)
+            with self._lock:
+                # Yükleme sırasında booking/invalidate olduysa eski veriyi saklama
+                if self._gen.get(slug, 0) == gen and data["ttl"] > 0:
+                    self._entries[key] = e
+            return e
+
+        first = first or e.clock().date()
+        need = [
+            first + timedelta(days=d) for d in range(n_days)
+            if (first + timedelta(days=d)) not in e.days or (first + timedelta(days=d)) in e.dirty
+        ]
+        if not need:
+            return e
+
+        # Eksik günler genelde ardışık (ufuk uzadı) -> tek loader çağrısı
+        data = self._loader(slug, slot_minutes, need[0], (need[-1] - need[0]).days + 1)
+        self.stats["day_reloads"] += len(need)
+        if not data:
+            return None
+        with self._lock:
+            # Yükleme sırasında booking olduysa: bu seferlik kullan, sonraki okumada tekrar yükle
+            stale = self._gen.get(slug, 0) != gen
+            for day in need:
+                e.days[day] = data["days"].get(day, 0)
+                if stale:
+                    e.dirty.add(day)
+                else:
+                    e.dirty.discard(day)
+        return e
+
+    # ── artımlı güncellemeler ──
+    def mark_booked(self, slug: str, start: datetime, duration_minutes: int):
+        """Yeni randevu: [start, start+süre) ile çakışan slot bitlerini sıfırla."""
+        end = start + timedelta(minutes=max(duration_minutes, 1))
+        with self._lock:
+            self._gen[slug] = self._gen.get(slug, 0) + 1
+            for (s, _), e in self._entries.items():
+                if s != slug:
+                    continue
+                day = start.date()
+                if day not in e.days:
+                    continue
+                base = datetime(day.year, day.month, day.day) + timedelta(minutes=e.start_min)
+                i = max(0, int((start - base).total_seconds() // 60) // e.slot_minutes)
+                while True:
+                    st = base + timedelta(minutes=i * e.slot_minutes)
+                    if st >= end:
+                        break
+                    if st + timedelta(minutes=e.slot_minutes) > start:
+                        e.days[day] &= ~(1 << i)
+                    i += 1
+
+    def calendar_changed(self, calendar_id: str, intervals: Optional[List[Tuple[datetime, datetime]]]):
+        """
+        Takvim aynası dinleyicisi (executor thread'inden çağrılır).
+        intervals None => tam senkron, o takvimi kullanan indeksler düşer.
+        """
+        with self._lock:
+            for key, e in list(self._entries.items()):
+                if e.calendar_id != calendar_id:
+                    continue
+                if intervals is None:
+                    self._entries.pop(key, None)
+                    self._gen[key[0]] = self._gen.get(key[0], 0) + 1
+                    continue
+                for s, end in intervals:
+                    day = s.date()
+                    last = (end - timedelta(microseconds=1)).date()
+                    while day <= last:
+                        if day in e.days:
+                            e.dirty.add(day)
+                        day += timedelta(days=1)
+
+    def invalidate(self, slug: Optional[str] = None):
+        with self._lock:
+            for key in [k for k in self._entries if slug is None or k[0] == slug]:
+                self._entries.pop(key, None)
+            for s in ([slug] if slug else list(self._gen)):
+                self._gen[s] = self._gen.get(s, 0) + 1
+        self.stats["invalidations"] += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+            days = sum(len(e.days) for e in self._entries.values())
+        return {**self.stats, "entries": entries, "days": days}
@@ -0,0 +1,280 @@
+# backend/services/calendar_mirror.py
+# ─────────────────────────────────────────────────
+# Google Calendar yerel aynası (busy aralıkları)
+#
+# Her turda freebusy sorgusu yerine: arka planda events.list + syncToken
+# ile sadece DEĞİŞEN etkinlikler çekilir, takvim başına busy aralıkları
+# bellekte tutulur. get_available_slots_google önce buraya bakar —
+# ayna tazeyse çağrı yolunda hiç network yok.
+#
+# - ilk senkron / token süresi dolunca (HTTP 410): tam senkron
+# - iptal edilen etkinlik -> silinir; "transparent" (müsait göster) -> busy değil
+# - kendi create_google_event yazdığımız etkinlik anında eklenir
+# - dinleyiciler (ör. müsaitlik indeksi) değişen aralıkları alır;
+#   tam senkronda aralık yerine None gelir (hepsini geçersiz say)
+# - pencere: sadece [dün, bugün + horizon) tutulur (tam senkron timeMin/timeMax
+#   ile, artımlı değişiklikler pencereye göre süzülür). Pencere dışı sorgu
+#   None döner -> freebusy. Pencere resync_hours'ta bir tam senkronla kayar.
+# - sayfa limiti aşılırsa takvim geri çekilir (backoff): her turda yeniden
+#   tam senkron denenmez, bu sürede freebusy kullanılır
+# - sorgu: başlangıca göre sıralı liste + bisect (tüm etkinlikleri taramaz)
+# ─────────────────────────────────────────────────
+
+import bisect, threading, time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+TR_TZ = timezone(timedelta(hours=3))
+
+# Tek senkronda en fazla sayfa (sonsuz tekrar eden etkinliklere karşı emniyet)
+_MAX_PAGES = 50
+# Sayfa limiti aşılınca bekleme: 15 dk'dan başlar, her seferinde 2x, en fazla 1 gün
+_BACKOFF_MIN = 900.0
+_BACKOFF_MAX = 86400.0
+
+
+class _PageLimit(Exception):
+    pass
+
+
+def _event_interval(ev: dict) -> Optional[Tuple[datetime, datetime]]:
+    """Etkinlik -> (başlangıç, bitiş) TR naive. Busy sayılmıyorsa None."""
+    if ev.get("status") == "cancelled" or ev.get("transparency") == "transparent":
+        return None
+    start, end = ev.get("start") or {}, ev.get("end") or {}
+    try:
+        if start.get("dateTime") and end.get("dateTime"):
+            s = datetime.fromisoformat(start["dateTime"].replace("Z", "+00:00"))
+            e = datetime.fromisoformat(end["dateTime"].replace("Z", "+00:00"))
+            if s.tzinfo:
+                s = s.astimezone(TR_TZ).replace(tzinfo=None)
+            if e.tzinfo:
+                e = e.astimezone(TR_TZ).replace(tzinfo=None)
+            return s, e
+        if start.get("date") and end.get("date"):
+            # Tüm gün etkinliği: bitiş tarihi hariç
+            return datetime.strptime(start["date"], "%Y-%m-%d"), datetime.strptime(end["date"], "%Y-%m-%d")
+    except ValueError:
+        return None
+    return None
+
+
+class _CalendarState:
+    __slots__ = ("events", "sync_token", "synced_at", "full_at", "window", "lock",
+                 "sorted", "starts", "max_len", "backoff", "retry_at")
+
+    def __init__(self):
+        self.events: Dict[str, Tuple[datetime, datetime]] = {}
+        self.sync_token = ""
+        self.synced_at = 0.0
+        self.full_at = 0.0  # son tam senkron (monotonic)
+        self.window: Optional[Tuple[datetime, datetime]] = None
+        self.lock = threading.Lock()
+        # Sorgu indeksi (events değişince None -> ilk sorguda yeniden kurulur)
+        self.sorted: Optional[List[Tuple[datetime, datetime]]] = None
+        self.starts: List[datetime] = []
+        self.max_len = timedelta(0)
+        self.backoff = 0.0
+        self.retry_at = 0.0
+
+    def index(self):
+        """Kilit altında çağrılır."""
+        if self.sorted is None:
+            self.sorted = sorted(self.events.values())
+            self.starts = [s for s, _ in self.sorted]
+            self.max_len = max((e - s for s, e in self.sorted), default=timedelta(0))
+
+
+class CalendarMirror:
+    def __init__(self, max_staleness: float, horizon_days: int = 62, resync_hours: float = 24.0):
+        self.max_staleness = max_staleness
+        self.horizon = timedelta(days=max(1, horizon_days))
+        self.resync_seconds = max(0.0, resync_hours) * 3600
+        self._cals: Dict[str, _CalendarState] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable] = []
+        self.stats: Dict[str, int] = {
+            "full_syncs": 0, "incremental_syncs": 0, "hits": 0, "misses": 0,
+            "out_of_window": 0, "page_limit": 0,
+        }
+
+    def register(self, calendar_id: str) -> bool:
+        """Takvimi aynaya ekle (ilk senkron worker'da). Yeni eklendiyse True."""
+        calendar_id = (calendar_id or "").strip()
+        if not calendar_id:
+            return False
+        with self._lock:
+            if calendar_id in self._cals:
+                return False
+            self._cals[calendar_id] = _CalendarState()
+            return True
+
+    def add_listener(self, fn: Callable[[str, Optional[List[Tuple[datetime, datetime]]]], None]):
+        self._listeners.append(fn)
+
+    def _notify(self, calendar_id: str, intervals: Optional[List[Tuple[datetime, datetime]]]):
+        for fn in self._listeners:
+            try:
+                fn(calendar_id, intervals)
+            except Exception as e:
+                print(f"[Mirror] Dinleyici hatası: {e}")
+
+    def calendars(self) -> List[str]:
+        with self._lock:
+            return list(self._cals.keys())
+
+    def _state(self, calendar_id: str) -> Optional[_CalendarState]:
+        with self._lock:
+            return self._cals.get(calendar_id)
+
+    def is_fresh(self, calendar_id: str) -> bool:
+        st = self._state(calendar_id)
+        return bool(st and st.sync_token and time.monotonic() - st.synced_at < self.max_staleness)
+
+    def covers(self, calendar_id: str, start: datetime, end: datetime) -> bool:
+        """Taze ve [start, end) pencerenin içinde mi (değişiklikler dinleyiciye akar)."""
+        if not self.is_fresh(calendar_id):
+            return False
+        st = self._state(calendar_id)
+        with st.lock:
+            return st.window is not None and st.window[0] <= start and end <= st.window[1]
+
+    def busy_between(self, calendar_id: str, start: datetime, end: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+        """
+        [start, end) ile çakışan busy aralıkları (sıralı).
+        Ayna yok/bayatsa None -> çağıran freebusy'ye düşer.
+        """
+        if not self.is_fresh(calendar_id):
+            self.stats["misses"] += 1
+            return None
+        st = self._state(calendar_id)
+        with st.lock:
+            if st.window is None or start < st.window[0] or end > st.window[1]:
+                self.stats["out_of_window"] += 1
+                return None
+            st.index()
+            # s < end ve e > start: s >= start - max_len olanlara bakmak yeter
+            lo = bisect.bisect_left(st.starts, start - st.max_len)
+            hi = bisect.bisect_left(st.starts, end)
+            out = [(s, e) for s, e in st.sorted[lo:hi] if e > start]
+        self.stats["hits"] += 1
+        return out
+
+    def apply_event(self, calendar_id: str, ev: dict, notify: bool = True):
+        st = self._state(calendar_id)
+        if st is None or not ev.get("id"):
+            return
+        iv = _event_interval(ev)
+        with st.lock:
+            if iv is not None and st.window is not None and (iv[1] <= st.window[0] or iv[0] >= st.window[1]):
+                iv = None  # pencere dışı: tutulmaz
+            if iv is None:
+                old = st.events.pop(ev["id"], None)
+            else:
+                old = st.events.get(ev["id"])
+                st.events[ev["id"]] = iv
+            if old != iv:
+                st.sorted = None
+        if notify and old != iv:
+            self._notify(calendar_id, [x for x in (old, iv) if x is not None])
+
+    def sync(self, service, calendar_id: str) -> bool:
+        """
+        Senkron (executor thread'inde çağrılır).
+        syncToken varsa artımlı, yoksa / 410 gelirse tam senkron.
+        """
+        st = self._state(calendar_id)
+        if st is None:
+            return False
+        now = time.monotonic()
+        if now < st.retry_at:
+            return False  # geri çekildi (sayfa limiti); freebusy kullanılıyor
+
+        token = st.sync_token
+        if token and now - st.full_at < self.resync_seconds:
+            try:
+                self._pull(service, calendar_id, st, token, None)
+                self.stats["incremental_syncs"] += 1
+                return True
+            except _PageLimit:
+                # Eski token geçerli kalır, ama bu kadar değişiklik -> pencereyi tazele
+                print(f"[Mirror] {calendar_id}: artımlı senkron sayfa limiti -> tam senkron")
+            except Exception as e:
+                if getattr(getattr(e, "resp", None), "status", None) != 410:
+                    print(f"[Mirror] Artımlı senkron hatası ({calendar_id}): {e}")
+                    return False
+                print(f"[Mirror] syncToken süresi doldu -> tam senkron ({calendar_id})")
+
+        today = datetime.now(TR_TZ).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        window = (today - timedelta(days=1), today + self.horizon)
+        fresh = _CalendarState()
+        fresh.window = window
+        try:
+            self._pull(service, calendar_id, fresh, "", window)
+        except _PageLimit:
+            self.stats["page_limit"] += 1
+            st.backoff = min(_BACKOFF_MAX, max(_BACKOFF_MIN, st.backoff * 2))
+            st.retry_at = time.monotonic() + st.backoff
+            print(f"[Mirror] {calendar_id}: sayfa limiti aşıldı, ayna {st.backoff / 60:.0f} dk kapalı (freebusy)")
+            return False
+        except Exception as e:
+            print(f"[Mirror] Tam senkron hatası ({calendar_id}): {e}")
+            return False
+
+        with st.lock:
+            st.events = fresh.events
+            st.sync_token = fresh.sync_token
+            st.synced_at = fresh.synced_at
+            st.full_at = fresh.synced_at
+            st.window = window
+            st.sorted = None
+            st.backoff = 0.0
+        self._notify(calendar_id, None)
+        self.stats["full_syncs"] += 1
+        print(f"[Mirror] Tam senkron OK ({calendar_id}): {len(st.events)} etkinlik")
+        return True
+
+    def _pull(self, service, calendar_id: str, st: _CalendarState, token: str,
+              window: Optional[Tuple[datetime, datetime]]):
+        """token varsa artımlı (st = canlı durum), yoksa window ile tam (st = yeni durum)."""
+        page_token = None
+        changed = 0
+        for _ in range(_MAX_PAGES):
+            kwargs = {"calendarId": calendar_id, "singleEvents": True, "maxResults": 2500}
+            if token:
+                kwargs["syncToken"] = token
+                kwargs["showDeleted"] = True
+            elif window:
+                kwargs["timeMin"] = window[0].replace(tzinfo=TR_TZ).isoformat()
+                kwargs["timeMax"] = window[1].replace(tzinfo=TR_TZ).isoformat()
+            if page_token:
+                kwargs["pageToken"] = page_token
+            result = service.events().list(**kwargs).execute()
+
+            for ev in result.get("items", []) or []:
+                if token:
+                    self.apply_event(calendar_id, ev)
+                else:
+                    iv = _event_interval(ev)
+                    if iv is not None and ev.get("id") and iv[1] > window[0] and iv[0] < window[1]:
+                        st.events[ev["id"]] = iv
+                changed += 1
+
+            page_token = result.get("nextPageToken")
+            if not page_token:
+                with st.lock:
+                    st.sync_token = result.get("nextSyncToken", "") or st.sync_token
+                    st.synced_at = time.monotonic()
+                if token and changed:
+                    print(f"[Mirror] {calendar_id}: {changed} değişiklik")
+                return
+        raise _PageLimit()
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "calendars": {
+                cid: {"events": len(st.events), "fresh": self.is_fresh(cid), "backoff": st.backoff}
+                for cid, st in list(self._cals.items())
+            },
+        }
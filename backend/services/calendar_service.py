@@ -1,15 +1,57 @@
 # backend/services/calendar_service.py
 # Google Calendar entegrasyonu — müsaitlik (freebusy) + randevu kaydı (event insert)
 
+import asyncio
+import functools
+import importlib.util
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import GOOGLE_CALENDAR_CREDENTIALS_PATH, DEFAULT_GOOGLE_CALENDAR_ID  # noqa: F401
-
-_SERVICE = None
+from config import (  # noqa: F401
+    GOOGLE_CALENDAR_CREDENTIALS_PATH,
+    DEFAULT_GOOGLE_CALENDAR_ID,
+    CALENDAR_MAX_WORKERS,
+    CALENDAR_HTTP_TIMEOUT,
+    CALENDAR_FREEBUSY_TTL,
+    CALENDAR_FREEBUSY_PREFETCH_DAYS,
+    CALENDAR_MIRROR_ENABLED,
+    CALENDAR_MIRROR_INTERVAL,
+    CALENDAR_MIRROR_MAX_STALENESS,
+    CALENDAR_MIRROR_HORIZON_DAYS,
+    CALENDAR_MIRROR_RESYNC_HOURS,
+)
+from services.calendar_mirror import CalendarMirror
+from services.schedule import get_schedule
+
+# numpy opsiyonel: sadece uzun ufuklu slot üretiminde vektörel yol
+# (kurulu mu diye sadece bakılır; import _sweep_free_numpy içinde, ilk kullanımda)
+_NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# googleapiclient/httplib2 thread-safe DEĞİL:
+# her executor thread'i kendi service nesnesini tutar (thread-local havuz).
+# Credentials ise paylaşılabilir, bir kez yüklenir.
+_LOCAL = threading.local()
+_CREDENTIALS = None
+_CREDENTIALS_LOCK = threading.Lock()
+
+# Takvim istekleri event loop'u bloklamasın: ayrı executor + eşzamanlılık limiti
+_EXECUTOR = ThreadPoolExecutor(max_workers=CALENDAR_MAX_WORKERS, thread_name_prefix="gcal")
+_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+# events.list + syncToken ile tutulan yerel busy aynası (calendar_mirror.py)
+CALENDAR_MIRROR: Optional[CalendarMirror] = (
+    CalendarMirror(CALENDAR_MIRROR_MAX_STALENESS, CALENDAR_MIRROR_HORIZON_DAYS, CALENDAR_MIRROR_RESYNC_HOURS)
+    if CALENDAR_MIRROR_ENABLED else None
+)
+_MIRROR_WAKE: Optional[asyncio.Event] = None
+_MIRROR_LOOP: Optional[asyncio.AbstractEventLoop] = None  # event'in sahibi (thread'lerden uyandırmak için)
+_WATCH_CHANNELS: Dict[str, str] = {}  # push channel id -> calendar id
 
 # Python 3.9 uyumlu TR timezone (UTC+03:00)
 TR_TZ = timezone(timedelta(hours=3))
@@ -45,43 +87,88 @@ def resolve_credentials_path() -> Optional[str]:
     return None
 
 
-def _get_calendar_service():
-    """Google Calendar API servis nesnesi (Service Account)."""
-    global _SERVICE
-    if _SERVICE is not None:
-        return _SERVICE
+def _get_credentials():
+    global _CREDENTIALS
+    if _CREDENTIALS is not None:
+        return _CREDENTIALS
 
-    creds_path = resolve_credentials_path()
+    with _CREDENTIALS_LOCK:
+        if _CREDENTIALS is not None:
+            return _CREDENTIALS
 
-    if not creds_path:
-        print("[Calendar] Credentials path BOS. config/env ayarlanmamis.")
-        return None
+        creds_path = resolve_credentials_path()
 
-    if not os.path.isfile(creds_path):
-        print(f"[Calendar] Credentials bulunamadi. Path: {creds_path}")
+        if not creds_path:
+            print("[Calendar] Credentials path BOS. config/env ayarlanmamis.")
+            return None
+
+        if not os.path.isfile(creds_path):
+            print(f"[Calendar] Credentials bulunamadi. Path: {creds_path}")
+            return None
+
+        try:
+            from google.oauth2 import service_account
+
+            SCOPES = [
+                "https://www.googleapis.com/auth/calendar",
+                "https://www.googleapis.com/auth/calendar.events",
+            ]
+            _CREDENTIALS = service_account.Credentials.from_service_account_file(
+                creds_path, scopes=SCOPES
+            )
+            print(f"[Calendar] Credentials OK. creds_path={creds_path}")
+            print(f"[Calendar] Service account: {getattr(_CREDENTIALS, 'service_account_email', '')}")
+            return _CREDENTIALS
+        except Exception as e:
+            print(f"[Calendar] Credentials yuklenemedi: {e}")
+            return None
+
+
+def _get_calendar_service():
+    """Google Calendar API servis nesnesi (Service Account), thread başına bir tane."""
+    service = getattr(_LOCAL, "service", None)
+    if service is not None:
+        return service
+
+    credentials = _get_credentials()
+    if credentials is None:
         return None
 
     try:
-        from google.oauth2 import service_account
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
         from googleapiclient.discovery import build
 
-        SCOPES = [
-            "https://www.googleapis.com/auth/calendar",
-            "https://www.googleapis.com/auth/calendar.events",
-        ]
-        credentials = service_account.Credentials.from_service_account_file(
-            creds_path, scopes=SCOPES
-        )
-        _SERVICE = build("calendar", "v3", credentials=credentials, cache_discovery=False)
+        # Takılan bir istek thread'i sonsuza kadar tutmasın
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT))
+        service = build("calendar", "v3", http=http, cache_discovery=False)
+        _LOCAL.service = service
 
-        print(f"[Calendar] Service OK. creds_path={creds_path}")
-        print(f"[Calendar] Service account: {getattr(credentials, 'service_account_email', '')}")
-        return _SERVICE
+        print(f"[Calendar] Service OK (thread={threading.current_thread().name})")
+        return service
     except Exception as e:
         print(f"[Calendar] Servis olusturulamadi: {e}")
         return None
 
 
+def _get_semaphore() -> asyncio.Semaphore:
+    # Lazy: event loop içinde oluşsun (Python 3.9 uyumu)
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(CALENDAR_MAX_WORKERS)
+    return _SEMAPHORE
+
+
+async def run_calendar_io(fn, *args, **kwargs):
+    """
+    Senkron takvim (veya takvime dokunan DB) fonksiyonunu takvim executor'ında çalıştırır.
+    Yavaş bir freebusy sorgusu diğer aramaları dondurmaz.
+    """
+    loop = asyncio.get_running_loop()
+    async with _get_semaphore():
+        return await loop.run_in_executor(_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+
 def whoami() -> str:
     """Service account email (debug)."""
     creds_path = resolve_credentials_path()
@@ -144,28 +231,6 @@ def add_calendar_to_list(calendar_id: str) -> Tuple[bool, Optional[str]]:
         return False, str(e)
 
 
-def _parse_working_hours(hours_str: str) -> Tuple[int, int]:
-    """Dakika cinsinden baslangic/bitis (09:00-18:00 -> 540, 1080)."""
-    import re
-
-    if not hours_str or not hours_str.strip():
-        return 9 * 60, 18 * 60
-
-    # 09:00-18:00 gibi
-    m = re.search(r"(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})", hours_str)
-    if m:
-        start_h, start_m = int(m.group(1)), int(m.group(2))
-        end_h, end_m = int(m.group(3)), int(m.group(4))
-        return start_h * 60 + start_m, end_h * 60 + end_m
-
-    # 9-18 gibi
-    m2 = re.search(r"(\d{1,2})\s*-\s*(\d{1,2})", hours_str)
-    if m2:
-        return int(m2.group(1)) * 60, int(m2.group(2)) * 60
-
-    return 9 * 60, 18 * 60
-
-
 def _to_rfc3339_tr(dt_naive: datetime) -> str:
     """Naive datetime -> TR (+03:00) timezone ile RFC3339."""
     return dt_naive.replace(tzinfo=TR_TZ).isoformat()
@@ -184,32 +249,154 @@ def _parse_api_time_to_tr_naive(s: str) -> Optional[datetime]:
     return dt
 
 
-def get_available_slots_google(
-    calendar_id: str,
-    working_hours_str: str = "",
-    from_date: Optional[datetime] = None,
-    days: int = 7,
-    slot_minutes: int = 30,
-) -> List[dict]:
+# ─────────────────────────────────────────
+# YEREL AYNA (events.list + syncToken)
+# ─────────────────────────────────────────
+def _mirror_busy(calendar_id: str, time_min: datetime, time_max: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+    """Ayna tazeyse busy aralıkları (TR naive), değilse None."""
+    if CALENDAR_MIRROR is None:
+        return None
+    busy = CALENDAR_MIRROR.busy_between(calendar_id, time_min, time_max)
+    if busy is None:
+        # Bir sonraki worker turunda senkronlansın
+        if CALENDAR_MIRROR.register(calendar_id):
+            request_mirror_sync()
+        return None
+    return busy
+
+
+def register_mirror_calendar(calendar_id: str):
+    if CALENDAR_MIRROR is not None and CALENDAR_MIRROR.register(calendar_id):
+        request_mirror_sync()
+
+
+def sync_calendar_mirror(calendar_id: str) -> bool:
+    """Tek takvimi senkronla (executor thread'inde)."""
+    if CALENDAR_MIRROR is None:
+        return False
+    service = _get_calendar_service()
+    if not service:
+        return False
+    return CALENDAR_MIRROR.sync(service, calendar_id)
+
+
+def request_mirror_sync():
     """
-    Google Calendar freebusy ile dolu saatleri çıkarıp müsait slotları döndürür.
+    Worker'ı beklemeden uyandır (push bildirimi / yeni takvim).
+    Takvim/DB executor thread'lerinden de çağrılır: asyncio.Event thread-safe
+    değil, set() her zaman loop'un kendi thread'inde çalışır.
+    """
+    if _MIRROR_WAKE is None or _MIRROR_LOOP is None:
+        return
+    try:
+        _MIRROR_LOOP.call_soon_threadsafe(_MIRROR_WAKE.set)
+    except RuntimeError:
+        pass  # loop kapandı (shutdown)
+
+
+async def run_calendar_mirror_worker():
+    """Tüm kayıtlı takvimleri periyodik (ya da uyandırılınca) senkronlar."""
+    global _MIRROR_WAKE, _MIRROR_LOOP
+    if CALENDAR_MIRROR is None:
+        return
+    _MIRROR_LOOP = asyncio.get_running_loop()
+    _MIRROR_WAKE = asyncio.Event()
+    print(f"[Mirror] Senkron worker başladı (her {CALENDAR_MIRROR_INTERVAL:.0f} sn)")
+
+    while True:
+        _MIRROR_WAKE.clear()
+        for calendar_id in CALENDAR_MIRROR.calendars():
+            try:
+                await run_calendar_io(sync_calendar_mirror, calendar_id)
+            except Exception as e:
+                print(f"[Mirror] Hata ({calendar_id}): {e}")
+        try:
+            await asyncio.wait_for(_MIRROR_WAKE.wait(), timeout=CALENDAR_MIRROR_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def watch_calendar(calendar_id: str, webhook_url: str) -> Optional[str]:
+    """
+    Push bildirimi kanalı aç (events.watch). Google değişiklikte webhook_url'e POST atar.
+    webhook_url HTTPS ve doğrulanmış domain olmalı.
     """
     service = _get_calendar_service()
     if not service:
-        print("[Calendar] service yok -> slots boş")
-        return []
+        return None
+    import uuid
+    channel_id = uuid.uuid4().hex
+    try:
+        service.events().watch(
+            calendarId=calendar_id,
+            body={"id": channel_id, "type": "web_hook", "address": webhook_url},
+        ).execute()
+        _WATCH_CHANNELS[channel_id] = calendar_id
+        print(f"[Mirror] Push kanalı açıldı: {calendar_id}")
+        return channel_id
+    except Exception as e:
+        print(f"[Mirror] Push kanalı açılamadı ({calendar_id}): {e}")
+        return None
+
+
+def calendar_for_channel(channel_id: str) -> str:
+    return _WATCH_CHANNELS.get(channel_id or "", "")
+
+
+# ─────────────────────────────────────────
+# FREEBUSY CACHE
+# Her booking turunda 7 günlük freebusy + book_appointment'ta tekrar
+# (daha geniş pencere) soruluyordu. Takvim başına kısa TTL'li cache:
+# - istenen pencereyi kapsayan (superset) kayıt varsa Google'a gitmez
+# - sorgu en az FREEBUSY_PREFETCH_DAYS gün çekilir (sonraki sorgular kapsansın)
+# - create_google_event başarılı olunca o takvimin cache'i silinir
+# ─────────────────────────────────────────
+_FREEBUSY_CACHE: Dict[str, List[Tuple[datetime, datetime, float, List[Tuple[datetime, datetime]]]]] = {}
+_FREEBUSY_LOCK = threading.Lock()
+_FREEBUSY_MAX_ENTRIES = 4  # takvim başına
+
+
+def _freebusy_cached(calendar_id: str, time_min: datetime, time_max: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+    now = time.monotonic()
+    with _FREEBUSY_LOCK:
+        entries = _FREEBUSY_CACHE.get(calendar_id) or []
+        entries = [e for e in entries if now - e[2] < CALENDAR_FREEBUSY_TTL]
+        _FREEBUSY_CACHE[calendar_id] = entries
+        for e_min, e_max, _, busy in entries:
+            if e_min <= time_min and e_max >= time_max:
+                return busy
+    return None
 
-    # Başlangıç günü (TR) 00:00
-    from_date = from_date or datetime.now(TR_TZ).replace(tzinfo=None).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
-    start_min, end_min = _parse_working_hours(working_hours_str)
-    time_max = from_date + timedelta(days=days)
 
-    time_min_str = _to_rfc3339_tr(from_date)
-    time_max_str = _to_rfc3339_tr(time_max)
+def _freebusy_store(calendar_id: str, time_min: datetime, time_max: datetime, busy: List[Tuple[datetime, datetime]]):
+    with _FREEBUSY_LOCK:
+        entries = _FREEBUSY_CACHE.setdefault(calendar_id, [])
+        entries.append((time_min, time_max, time.monotonic(), busy))
+        del entries[:-_FREEBUSY_MAX_ENTRIES]
+
+
+def invalidate_freebusy(calendar_id: str = ""):
+    """Kendi yazdığımız etkinlikten sonra (veya tümü) cache'i boşalt."""
+    with _FREEBUSY_LOCK:
+        if calendar_id:
+            _FREEBUSY_CACHE.pop(calendar_id, None)
+        else:
+            _FREEBUSY_CACHE.clear()
+
+
+def _query_freebusy(service, calendar_id: str, time_min: datetime, time_max: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+    """Busy aralıkları (cache'ten ya da Google'dan, parse edilmiş). Hata olursa None."""
+    if CALENDAR_FREEBUSY_TTL > 0:
+        busy = _freebusy_cached(calendar_id, time_min, time_max)
+        if busy is not None:
+            print(f"[Calendar] freebusy cache hit cal_id={calendar_id} ({len(busy)} meşgul dilim)")
+            return busy
+
+    # Sonraki (daha uzun) sorgular da kapsansın diye pencereyi genişlet
+    fetch_max = max(time_max, time_min + timedelta(days=CALENDAR_FREEBUSY_PREFETCH_DAYS))
+    time_min_str = _to_rfc3339_tr(time_min)
+    time_max_str = _to_rfc3339_tr(fetch_max)
 
-    # freebusy
     try:
         body = {
             "timeMin": time_min_str,
@@ -220,7 +407,7 @@ def get_available_slots_google(
         result = service.freebusy().query(body=body).execute()
 
         cal_data = result.get("calendars", {}).get(calendar_id, {})
-        busy_list = cal_data.get("busy", []) or []
+        busy_list = _parse_busy(cal_data.get("busy", []) or [])
 
         print(f"[Calendar] freebusy query cal_id={calendar_id}")
         print(f"[Calendar] timeMin={time_min_str} timeMax={time_max_str}")
@@ -228,43 +415,207 @@ def get_available_slots_google(
 
     except Exception as e:
         print(f"[Calendar] freebusy hatasi: {e}")
-        return []
+        return None
+
+    if CALENDAR_FREEBUSY_TTL > 0:
+        _freebusy_store(calendar_id, time_min, fetch_max, busy_list)
+    return busy_list
+
+
+# ─────────────────────────────────────────
+# SLOT ÜRETİMİ (interval sweep)
+# Eski hali: her slot için tüm busy listesi + her seferinde fromisoformat
+#   -> O(slot × busy). Şimdi busy bir kez parse + sırala + birleştir,
+#   slot ızgarası ile tek geçişte karşılaştır -> O(slot + busy).
+# Uzun ufuklarda (çok slot) numpy varsa vektörel yol.
+# ─────────────────────────────────────────
+_NUMPY_MIN_SLOTS = 2000
+
+
+def _parse_busy(busy_list: List[dict]) -> List[Tuple[datetime, datetime]]:
+    """Google freebusy busy listesi -> TR naive (başlangıç, bitiş), bir kez."""
+    out = []
+    for b in busy_list:
+        b_start = _parse_api_time_to_tr_naive(b.get("start", ""))
+        b_end = _parse_api_time_to_tr_naive(b.get("end", ""))
+        if b_start is None or b_end is None:
+            continue
+        out.append((b_start, b_end))
+    return out
+
+
+def merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """Sırala + çakışan/bitişik aralıkları birleştir."""
+    merged: List[Tuple[datetime, datetime]] = []
+    for s, e in sorted(i for i in intervals if i[1] > i[0]):
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+    return merged
 
-    # slot üret, busy ile çakışanları çıkar
-    slots: List[dict] = []
-    now_naive = datetime.now(TR_TZ).replace(tzinfo=None)
 
+def _slot_grid(from_date: datetime, days: int, start_min: int, end_min: int, slot_minutes: int, now_naive: datetime):
+    """Mesai içi slot başlangıçları (kronolojik), geçmiş hariç."""
+    offsets = range(start_min, end_min, slot_minutes)
     for d in range(days):
-        day = from_date + timedelta(days=d)
+        day = (from_date + timedelta(days=d)).replace(hour=0, minute=0, second=0, microsecond=0)
         if day.date() < now_naive.date():
             continue
+        for m in offsets:
+            slot_start = day + timedelta(minutes=m)
+            if slot_start > now_naive:
+                yield slot_start
+
+
+def _sweep_free(grid, busy: List[Tuple[datetime, datetime]], slot_len: timedelta, limit: Optional[int]) -> List[datetime]:
+    free: List[datetime] = []
+    i, n = 0, len(busy)
+    for slot_start in grid:
+        # slot_start'tan önce biten busy'leri geç (tekrar bakılmaz)
+        while i < n and busy[i][1] <= slot_start:
+            i += 1
+        if i < n and busy[i][0] < slot_start + slot_len:
+            continue
+        free.append(slot_start)
+        if limit is not None and len(free) >= limit:
+            break
+    return free
+
+
+def _sweep_free_numpy(
+    from_date: datetime,
+    days: int,
+    start_min: int,
+    end_min: int,
+    slot_minutes: int,
+    busy: List[Tuple[datetime, datetime]],
+    now_naive: datetime,
+    limit: Optional[int],
+) -> List[datetime]:
+    """Aynı sonuç; ızgara + çakışma numpy ile (dakika cinsinden int64)."""
+    import numpy as np
+
+    base = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    offsets = np.arange(start_min, end_min, slot_minutes, dtype=np.int64)
+    day_idx = np.arange(days, dtype=np.int64)
+    slot_s = (day_idx[:, None] * 1440 + offsets[None, :]).ravel()
+
+    now_min = (now_naive - base) // timedelta(minutes=1)
+    first_day = max(0, (now_naive.date() - base.date()).days)
+    slot_s = slot_s[(slot_s > now_min) & (slot_s >= first_day * 1440)]
+    if busy:
+        to_min = lambda dt: (dt - base) // timedelta(minutes=1)  # noqa: E731
+        busy_s = np.fromiter((to_min(b[0]) for b in busy), dtype=np.int64, count=len(busy))
+        busy_e = np.fromiter((to_min(b[1]) for b in busy), dtype=np.int64, count=len(busy))
+
+        # Birleştirilmiş busy: bitişler de sıralı -> ilk (bitiş > slot başı) olan busy
+        idx = np.searchsorted(busy_e, slot_s, side="right")
+        has = idx < len(busy_e)
+        overlap = np.zeros(len(slot_s), dtype=bool)
+        overlap[has] = busy_s[idx[has]] < slot_s[has] + slot_minutes
+        slot_s = slot_s[~overlap]
+
+    if limit is not None:
+        slot_s = slot_s[:limit]
+    return [base + timedelta(minutes=int(m)) for m in slot_s]
+
+
+def generate_free_slots(
+    from_date: datetime,
+    days: int,
+    start_min: int,
+    end_min: int,
+    slot_minutes: int,
+    busy: List[Tuple[datetime, datetime]],
+    now_naive: datetime,
+    limit: Optional[int] = None,
+) -> List[datetime]:
+    """Busy ile çakışmayan slot başlangıçları (kronolojik)."""
+    merged = merge_intervals(busy)
+
+    n_slots = days * max(0, (end_min - start_min) // max(1, slot_minutes))
+    if _NUMPY_AVAILABLE and limit is None and n_slots >= _NUMPY_MIN_SLOTS:
+        return _sweep_free_numpy(from_date, days, start_min, end_min, slot_minutes, merged, now_naive, limit)
+
+    grid = _slot_grid(from_date, days, start_min, end_min, slot_minutes, now_naive)
+    return _sweep_free(grid, merged, timedelta(minutes=slot_minutes), limit)
+
 
-        for m in range(start_min, end_min, slot_minutes):
-            h, mn = divmod(m, 60)
-            slot_start = day.replace(hour=h, minute=mn, second=0, microsecond=0)
-            slot_end = slot_start + timedelta(minutes=slot_minutes)
-
-            if slot_start <= now_naive:
-                continue
-
-            overlap = False
-            for b in busy_list:
-                b_start = _parse_api_time_to_tr_naive(b.get("start", ""))
-                b_end = _parse_api_time_to_tr_naive(b.get("end", ""))
-                if b_start is None or b_end is None:
-                    continue
-                if slot_start < b_end and slot_end > b_start:
-                    overlap = True
-                    break
-
-            if not overlap:
-                key = slot_start.strftime("%Y-%m-%d %H:%M")
-                slots.append(
-                    {"slot_at": key, "display": slot_start.strftime("%d.%m.%Y %H:%M")}
-                )
+def get_available_slots_google(
+    calendar_id: str,
+    working_hours_str: str = "",
+    from_date: Optional[datetime] = None,
+    days: int = 7,
+    slot_minutes: int = 30,
+) -> List[dict]:
+    """
+    Dolu saatleri çıkarıp müsait slotları döndürür.
+    Önce yerel ayna (network yok); ayna yok/bayatsa Google freebusy.
+    """
+    # Başlangıç günü (TR) 00:00
+    from_date = from_date or datetime.now(TR_TZ).replace(tzinfo=None).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    sched = get_schedule(working_hours_str or "")
+    time_max = from_date + timedelta(days=days)
+
+    busy_list = get_busy_intervals(calendar_id, from_date, time_max)
+    if busy_list is None:
+        return []
+
+    now_naive = datetime.now(TR_TZ).replace(tzinfo=None)
+    slot_starts = [
+        st for st in generate_free_slots(
+            from_date, days, sched.start_min, sched.end_min, slot_minutes, busy_list, now_naive,
+        )
+        if sched.fits(st, slot_minutes)  # gün/mola/kapalı tarih
+    ][:50]  # ✅ 50 yeterli
+    slots = [
+        {"slot_at": st.strftime("%Y-%m-%d %H:%M"), "display": st.strftime("%d.%m.%Y %H:%M")}
+        for st in slot_starts
+    ]
 
     print(f"[Calendar] {len(slots)} müsait slot üretildi")
-    return slots[:50]  # ✅ 50 yeterli
+    return slots
+
+
+def get_busy_intervals(calendar_id: str, time_min: datetime, time_max: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+    """
+    [time_min, time_max) busy aralıkları (TR naive).
+    Önce yerel ayna (network yok); ayna yok/bayatsa Google freebusy (cache'li).
+    Takvime ulaşılamazsa None.
+    """
+    busy = _mirror_busy(calendar_id, time_min, time_max)
+    if busy is not None:
+        return busy
+
+    service = _get_calendar_service()
+    if not service:
+        print("[Calendar] service yok -> busy alınamadı")
+        return None
+    return _query_freebusy(service, calendar_id, time_min, time_max)
+
+
+def is_mirrored(calendar_id: str, time_min: datetime, time_max: datetime) -> bool:
+    """Takvim aynası bu aralık için taze mi (değişiklikler dinleyiciye akıyor mu)."""
+    return CALENDAR_MIRROR is not None and CALENDAR_MIRROR.covers(calendar_id, time_min, time_max)
+
+
+def is_interval_free_google(calendar_id: str, start: datetime, end: datetime) -> Optional[bool]:
+    """
+    Tek aralık için takvim kontrolü (booking son kapısı).
+    Ufuk ne kadar uzak olursa olsun sadece o günün busy'sine bakılır.
+    True/False; takvime ulaşılamazsa None.
+    """
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    busy = get_busy_intervals(calendar_id, day_start, end)
+    if busy is None:
+        return None
+
+    return not any(b_start < end and b_end > start for b_start, b_end in busy)
 
 
 def create_google_event(
@@ -293,9 +644,32 @@ def create_google_event(
             "start": {"dateTime": start_iso, "timeZone": TR_TZ_NAME},
             "end": {"dateTime": end_iso, "timeZone": TR_TZ_NAME},
         }
-        service.events().insert(calendarId=calendar_id, body=event).execute()
+        created = service.events().insert(calendarId=calendar_id, body=event).execute()
+        invalidate_freebusy(calendar_id)
+        if CALENDAR_MIRROR is not None and isinstance(created, dict):
+            # Kendi yazdığımız etkinlik aynada hemen görünsün
+            CALENDAR_MIRROR.apply_event(calendar_id, created)
         print(f"[Calendar] Etkinlik olusturuldu: {start_datetime} - {summary}")
         return True
     except Exception as e:
         print(f"[Calendar] Etkinlik olusturma hatasi: {e}")
         return False
+
+
+# ─────────────────────────────────────────
+# ASYNC FACADE (event loop'tan çağırmak için)
+# ─────────────────────────────────────────
+async def list_calendars_async() -> Tuple[List[dict], Optional[str]]:
+    return await run_calendar_io(list_calendars)
+
+
+async def add_calendar_to_list_async(calendar_id: str) -> Tuple[bool, Optional[str]]:
+    return await run_calendar_io(add_calendar_to_list, calendar_id)
+
+
+async def whoami_async() -> str:
+    return await run_calendar_io(whoami)
+
+
+async def watch_calendar_async(calendar_id: str, webhook_url: str) -> Optional[str]:
+    return await run_calendar_io(watch_calendar, calendar_id, webhook_url)
@@ -0,0 +1,212 @@
+# backend/services/conversation_memory.py
+# ─────────────────────────────────────────────────
+# Token bütçeli konuşma hafızası
+#
+# Eski hali: son 16 ham mesaj + tam system prompt her turda yeniden
+# gönderiliyordu; arama uzadıkça prompt (ve LLM gecikmesi) büyüyordu,
+# 16'yı aşan eski mesajlar ise (verilen isim/telefon dahil) tamamen düşüyordu.
+#
+# Şimdi:
+#   - son mesajlar olduğu gibi kalır (en az min_recent adet)
+#   - geçmiş token bütçesini aşınca en eski mesajlar ÖZETE katlanır:
+#     toplanan booking alanları (hizmet, personel, tarih, saat, ad, telefon)
+#   - özet tek satır: "ONCEKI KONUSMA OZETI: hizmet=...; tarih=...; ..."
+#   - araç turları: "book" çağrısının argümanları özete girer, araç sonuçları
+#     (slot listeleri) sadece sayılır
+#   - göreli tarihler ("yarın", "cuma") katlama anında mutlak tarihe çevrilir
+#     (özet ertesi gün okunsa da doğru kalır)
+# Prompt boyu konuşma uzunluğundan bağımsız olarak ~sabit kalır.
+# Token sayısı tahmini (tokenizer yok): ~3.5 karakter / token.
+# ─────────────────────────────────────────────────
+
+import json, re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+_CHARS_PER_TOKEN = 3.5
+
+_PHONE_RE = re.compile(r"(?:\+?90)?0?5\d{9}")
+_NAME_RE = re.compile(
+    r"\b(?:ad[ıi]m|ismim|ad soyad[ıi]m)\s*[:\-]?\s*"
+    r"([A-ZÇĞİÖŞÜa-zçğıöşü]{2,}(?:\s+[A-ZÇĞİÖŞÜa-zçğıöşü]{2,}){0,2})",
+    re.IGNORECASE,
+)
+_RANDEVU_RE = re.compile(r"RANDEVU:\s*(\d{4}-\d{2}-\d{2})\s+(\d{1,2}:\d{2})\s*\|\s*(.+?)\s*\|\s*(\S+)")
+_BOOK_CALL_RE = re.compile(r"ARAC:\s*(\{.*\})", re.DOTALL)
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DOT_DATE_RE = re.compile(r"\b(\d{1,2})[./](\d{1,2})[./](\d{2,4})\b")
+_TIME_RE = re.compile(r"\b(\d{1,2})[:.](\d{2})\b")
+_SAAT_RE = re.compile(r"\bsaat\s+(\d{1,2})\b")
+_MONTH_RE = re.compile(r"\b(\d{1,2})\s+(ocak|şubat|subat|mart|nisan|mayıs|mayis|haziran|temmuz|ağustos|agustos|eylül|eylul|ekim|kasım|kasim|aralık|aralik)\b")
+
+_MONTHS = {
+    "ocak": 1, "şubat": 2, "subat": 2, "mart": 3, "nisan": 4, "mayıs": 5, "mayis": 5,
+    "haziran": 6, "temmuz": 7, "ağustos": 8, "agustos": 8, "eylül": 9, "eylul": 9,
+    "ekim": 10, "kasım": 11, "kasim": 11, "aralık": 12, "aralik": 12,
+}
+_WEEKDAYS = (
+    ("pazartesi", 0), ("salı", 1), ("sali", 1), ("çarşamba", 2), ("carsamba", 2),
+    ("perşembe", 3), ("persembe", 3), ("cumartesi", 5), ("cuma", 4), ("pazar", 6),
+)
+_NOT_NAMES = {"randevu", "istiyorum", "evet", "tamam", "musait", "müsait", "arıyorum", "ariyorum"}
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text or "") / _CHARS_PER_TOKEN) + 1
+
+
+def message_tokens(msg: Dict[str, str]) -> int:
+    # "User: " / "Assistant: " öneki + satır sonu
+    return estimate_tokens(msg.get("content", "")) + 3
+
+
+def _lower(text: str) -> str:
+    return (text or "").replace("İ", "i").replace("I", "ı").lower()
+
+
+def _resolve_date(t: str, now: datetime) -> Optional[str]:
+    m = _ISO_DATE_RE.search(t)
+    if m:
+        return m.group(0)
+    m = _MONTH_RE.search(t)
+    if m:
+        try:
+            return datetime(now.year, _MONTHS[m.group(2)], int(m.group(1))).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    m = _DOT_DATE_RE.search(t)
+    if m:
+        year = int(m.group(3))
+        if year < 100:
+            year += 2000
+        try:
+            return datetime(year, int(m.group(2)), int(m.group(1))).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    if "öbür gün" in t or "obur gun" in t:
+        return (now + timedelta(days=2)).strftime("%Y-%m-%d")
+    if "yarın" in t or "yarin" in t:
+        return (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    if "bugün" in t or "bugun" in t:
+        return now.strftime("%Y-%m-%d")
+    for word, wd in _WEEKDAYS:
+        if re.search(rf"\b{word}", t):
+            ahead = (wd - now.weekday()) % 7 or 7
+            return (now + timedelta(days=ahead)).strftime("%Y-%m-%d")
+    return None
+
+
+def _resolve_time(t: str) -> Optional[str]:
+    m = _TIME_RE.search(t)
+    if m and int(m.group(1)) <= 23 and int(m.group(2)) <= 59:
+        return f"{int(m.group(1)):02d}:{m.group(2)}"
+    m = _SAAT_RE.search(t)
+    if m and int(m.group(1)) <= 23:
+        return f"{int(m.group(1)):02d}:00"
+    return None
+
+
+def _find_named(t: str, items) -> str:
+    for it in items or []:
+        name = (it.get("name") or "").strip() if isinstance(it, dict) else ""
+        if name and _lower(name) in t:
+            return name
+    return ""
+
+
+class BookingSummary:
+    """Katlanmış mesajlardan toplanan booking alanları."""
+
+    __slots__ = ("service", "staff", "date", "time", "name", "phone", "folded")
+    FIELDS = (("service", "hizmet"), ("staff", "personel"), ("date", "tarih"),
+              ("time", "saat"), ("name", "ad"), ("phone", "telefon"))
+
+    def __init__(self):
+        self.service = self.staff = self.date = self.time = self.name = self.phone = ""
+        self.folded = 0
+
+    def fold(self, msg: Dict[str, str], biz: dict, now: datetime):
+        content = msg.get("content", "") or ""
+        t = _lower(content)
+        self.folded += 1
+        if msg.get("role") == "tool":
+            return
+        self.service = _find_named(t, biz.get("services")) or self.service
+        self.staff = _find_named(t, biz.get("staff")) or self.staff
+
+        if msg.get("role") == "assistant":
+            m = _RANDEVU_RE.search(content)
+            if m:
+                self.date, self.time, self.name, self.phone = m.group(1), m.group(2), m.group(3).strip(), m.group(4)
+            self._fold_book_call(content)
+            return
+
+        self.date = _resolve_date(t, now) or self.date
+        self.time = _resolve_time(t) or self.time
+        m = _PHONE_RE.search(re.sub(r"[\s\-()]", "", content))
+        if m:
+            self.phone = m.group(0)
+        m = _NAME_RE.search(content)
+        if m and _lower(m.group(1)).split()[0] not in _NOT_NAMES:
+            self.name = m.group(1).strip()
+
+    def _fold_book_call(self, content: str):
+        m = _BOOK_CALL_RE.search(content)
+        if not m:
+            return
+        try:
+            call = json.loads(m.group(1))
+        except ValueError:
+            return
+        args = call.get("args") if isinstance(call, dict) and call.get("tool") == "book" else None
+        if not isinstance(args, dict):
+            return
+        parts = str(args.get("datetime") or "").split()
+        if len(parts) == 2:
+            self.date, self.time = parts
+        self.name = str(args.get("name") or "").strip() or self.name
+        self.phone = str(args.get("phone") or "").strip() or self.phone
+        self.service = str(args.get("service") or "").strip() or self.service
+
+    def render(self) -> str:
+        parts = [f"{label}={getattr(self, attr)}" for attr, label in self.FIELDS if getattr(self, attr)]
+        if not parts:
+            return ""
+        return "ONCEKI KONUSMA OZETI: " + "; ".join(parts) + "\n"
+
+    def to_dict(self) -> dict:
+        d = {attr: getattr(self, attr) for attr, _ in self.FIELDS if getattr(self, attr)}
+        if self.folded:
+            d["n"] = self.folded
+        return d
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "BookingSummary":
+        s = cls()
+        for attr, _ in cls.FIELDS:
+            setattr(s, attr, (data or {}).get(attr, ""))
+        s.folded = int((data or {}).get("n", 0))
+        return s
+
+
+def fold_to_budget(
+    history: List[Dict[str, str]],
+    summary: BookingSummary,
+    biz: dict,
+    budget_tokens: int,
+    min_recent: int,
+    max_messages: int,
+    now: datetime,
+) -> int:
+    """
+    Geçmiş bütçeyi (veya mesaj sınırını) aşıyorsa en eskileri özete katla.
+    history yerinde değişir; katlanan mesaj sayısını döndürür.
+    """
+    total = sum(message_tokens(m) for m in history)
+    folded = 0
+    while len(history) > min_recent and (total > budget_tokens or len(history) > max_messages):
+        msg = history.pop(0)
+        total -= message_tokens(msg)
+        summary.fold(msg, biz, now)
+        folded += 1
+    return folded
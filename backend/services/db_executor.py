@@ -0,0 +1,74 @@
+# backend/services/db_executor.py
+# ─────────────────────────────────────────────────
+# SQLite için async yürütücü
+#
+# Önceden handler'lar (hepsi async def) get_business_by_slug,
+# list_businesses, ses blob'ları vb. senkron sqlite3 çağrılarını
+# event loop üzerinde yapıyordu: yavaş disk ya da yazma kilidi
+# (busy_timeout 5 sn'ye kadar bekler) o anda süren TÜM aramaları donduruyordu.
+#
+# Şimdi:
+#   - okumalar "sqlite" thread havuzunda (WAL: okurlar birbirini beklemez)
+#   - yazmalar tek "sqlite-w" thread'inde sırayla: yazarlar kilit için
+#     busy döngüsünde yarışmaz, sıra kuyrukta bekler
+#   - istek birleştirme: aynı (fonksiyon, argüman) okuması zaten
+#     uçuştaysa yeni sorgu açılmaz, aynı sonucu bekler
+#     (ör. aynı anda gelen 20 arama aynı işletmeyi ister -> 1 sorgu)
+#   - bağlantılar db_pool'dan: her worker thread kendi bağlantısını tutar
+# Google'a da dokunan işler (slot / booking) takvim executor'ında kalır.
+# ─────────────────────────────────────────────────
+
+import asyncio, functools, os, sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DB_READ_WORKERS
+
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, DB_READ_WORKERS), thread_name_prefix="sqlite")
+_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-w")
+
+# (loop, fn, args) -> uçuştaki okuma
+_INFLIGHT: Dict[Tuple[Any, ...], "asyncio.Future"] = {}
+DB_EXECUTOR_STATS: Dict[str, int] = {"reads": 0, "coalesced": 0, "writes": 0}
+
+
+def _clone(value):
+    """Birleştirilmiş okumada her bekleyen kendi kopyasını alır (dict'i değiştiren diğerini bozmasın)."""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    return value
+
+
+async def run_db_read(fn: Callable, *args):
+    """Okuma: havuzda çalıştır; aynı okuma zaten sürüyorsa onu bekle."""
+    loop = asyncio.get_running_loop()
+    key = (loop, fn, args)
+    fut = _INFLIGHT.get(key)
+    if fut is not None:
+        DB_EXECUTOR_STATS["coalesced"] += 1
+        return _clone(await asyncio.shield(fut))
+
+    DB_EXECUTOR_STATS["reads"] += 1
+    fut = loop.run_in_executor(_READ_EXECUTOR, functools.partial(fn, *args))
+    _INFLIGHT[key] = fut
+    fut.add_done_callback(lambda f: _INFLIGHT.pop(key, None) if _INFLIGHT.get(key) is f else None)
+    return _clone(await asyncio.shield(fut))
+
+
+async def run_db_write(fn: Callable, *args, **kwargs):
+    """Yazma: tek yazar thread'inde sırayla."""
+    DB_EXECUTOR_STATS["writes"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_WRITE_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+
+def db_executor_info() -> dict:
+    return {**DB_EXECUTOR_STATS, "inflight": len(_INFLIGHT)}
+
+
+def flush_db_writes(timeout: float = 10.0):
+    """Shutdown: kuyruktaki yazmalar bitene kadar bekle."""
+    _WRITE_EXECUTOR.submit(lambda: None).result(timeout=timeout)
@@ -0,0 +1,116 @@
+# backend/services/db_pool.py
+# ─────────────────────────────────────────────────
+# SQLite bağlantı havuzu
+#
+# Önceden her fonksiyon yeni sqlite3.connect açıyordu (WAL yok,
+# busy_timeout yok, statement cache her seferinde boş); reminder
+# zamanlayıcısı da kendi ayarıyla ayrı bağlantı açıyordu.
+# Eşzamanlı booking + okuma dosya kilidinde sıraya giriyordu,
+# meşgulse "database is locked" hemen patlıyordu.
+#
+# Şimdi:
+#   - thread başına TEK bağlantı (sqlite3 bağlantıları thread'ler arası paylaşılmaz)
+#   - bir kez ayarlanır: WAL (okurlar yazarı beklemez), synchronous,
+#     busy_timeout, cache_size, temp_store
+#   - statement cache (cached_statements): aynı SQL tekrar derlenmez
+#   - conn.close() bağlantıyı kapatmaz, bırakır: mevcut
+#     "conn = get_db() ... conn.close()" kodu aynen çalışır.
+#     İç içe kullanım sayılır; en dıştaki bırakmada yarım kalan
+#     transaction geri alınır (yazma kilidi asılı kalmasın).
+#     Alırken de açık transaction her durumda geri alınır: close()
+#     atlanıp depth sızsa bile sonraki kullanıcı kilidi devralmaz.
+# ─────────────────────────────────────────────────
+
+import os, sqlite3, sys, threading, weakref
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    DB_PATH,
+    DB_WAL_ENABLED,
+    DB_SYNCHRONOUS,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_STATEMENT_CACHE,
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """close() = havuza bırak. Gerçekten kapatmak için really_close()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = 0
+
+    def acquire(self) -> "PooledConnection":
+        if self.in_transaction:
+            # Önceki kullanıcı commit/rollback etmeden bırakmış (ya da close atlanmış)
+            self.rollback()
+        self.depth += 1
+        return self
+
+    def close(self):
+        if self.depth > 0:
+            self.depth -= 1
+        if self.depth == 0 and self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        super().close()
+
+
+_LOCAL = threading.local()
+_ALL: "weakref.WeakSet[PooledConnection]" = weakref.WeakSet()
+_ALL_LOCK = threading.Lock()
+POOL_STATS: Dict[str, int] = {"opened": 0, "acquired": 0}
+
+
+def open_connection(path: str = "", check_same_thread: bool = True) -> PooledConnection:
+    """Ayarlı yeni bağlantı (havuz dışı kullanım için de: ör. data_version izleyici)."""
+    conn = sqlite3.connect(
+        path or str(DB_PATH),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=DB_STATEMENT_CACHE,
+        check_same_thread=check_same_thread,
+        factory=PooledConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    if DB_WAL_ENABLED:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    POOL_STATS["opened"] += 1
+    with _ALL_LOCK:
+        _ALL.add(conn)
+    return conn
+
+
+def get_connection() -> PooledConnection:
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = open_connection()
+        _LOCAL.conn = conn
+    POOL_STATS["acquired"] += 1
+    return conn.acquire()
+
+
+def close_all():
+    """Shutdown: açık bağlantıları kapat (WAL checkpoint)."""
+    with _ALL_LOCK:
+        conns = list(_ALL)
+        _ALL.clear()
+    for conn in conns:
+        try:
+            conn.really_close()
+        except sqlite3.ProgrammingError:
+            # başka thread'in bağlantısı: thread bitince zaten kapanır
+            pass
+    _LOCAL.conn = None
+
+
+def pool_info() -> dict:
+    with _ALL_LOCK:
+        live = len(_ALL)
+    return {**POOL_STATS, "connections": live}
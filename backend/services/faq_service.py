@@ -0,0 +1,204 @@
+# backend/services/faq_service.py
+# ─────────────────────────────────────────────────
+# SSS hızlı yolu: LLM'e gitmeden cevaplanan sorular
+#
+# "adresiniz neresi", "kaçta açıksınız", "dolgu ne kadar",
+# "hangi doktorlar var" gibi sorular işletme kaydından (address,
+# working_hours, services[].price, staff) birebir cevaplanabilir;
+# eskiden her biri tam chat() LLM turu (saniyeler) ödüyordu.
+#
+# Şimdi:
+#   - cevap şablonları işletme sürümü başına bir kez derlenir (parmak izi cache)
+#   - niyet eşleme: katlanmış (aksansız) metinde ipucu kalıpları + güven puanı
+#     randevu/tarih/saat içeren, uzun ya da birden çok niyete uyan mesajlar
+#     düşük güven -> LLM'e düşer
+#   - cevap metinleri sabit -> TTS cache'te (işletme sesleriyle birlikte ısıtılır)
+# Ms mertebesinde, ağ yok.
+# ─────────────────────────────────────────────────
+
+import os, re, sys
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import FAQ_FAST_PATH, FAQ_MIN_CONFIDENCE
+from services.schedule import fold_text as _fold, schedule_for
+
+TR_TZ = timezone(timedelta(hours=3))
+
+# niyet -> (güçlü ipuçları, zayıf ipuçları)
+_CUES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "address": (
+        (r"\badres", r"\bnerede(siniz)?\b", r"\bneresi", r"\bkonum", r"yol tarifi", r"nasil gel"),
+        (r"\bhangi semt", r"\bhangi ilce"),
+    ),
+    "hours": (
+        (r"kacta (ac|kapan)", r"calisma saat", r"\bmesai", r"acik mi(siniz)?\b", r"kapali mi(siniz)?\b",
+         r"saat kaca kadar", r"kaca kadar acik"),
+        (r"hangi gunler", r"\bacilis", r"\bkapanis"),
+    ),
+    "price": (
+        (r"ne kadar\b", r"\bfiyat", r"\bucret", r"kac (tl|lira)", r"\bkac para"),
+        (r"\btutar", r"\bpahali"),
+    ),
+    "services": (
+        (r"hangi hizmet", r"\bhizmetleriniz", r"neler yapiyor", r"hangi islem"),
+        (r"\bneler var",),
+    ),
+    "staff": (
+        (r"hangi (doktor|hekim|personel|usta|uzman)", r"(doktor|hekim|personel|uzman)(lar|ler)(iniz)?\b",
+         r"\bkimler (calisiyor|var)"),
+        (r"\bdoktor", r"\bhekim", r"\bpersonel"),
+    ),
+    "phone": (
+        (r"telefon numaraniz", r"\bnumaraniz", r"sizi nasil ararim"),
+        (),
+    ),
+}
+_CUE_RES = {
+    intent: (tuple(re.compile(p) for p in strong), tuple(re.compile(p) for p in weak))
+    for intent, (strong, weak) in _CUES.items()
+}
+# Bunlar varsa soru değil booking/konuşma adımı: LLM / booking akışı karar versin
+_BOOKING_RE = re.compile(
+    r"randev|rezervasyon|\bmusait|\byarin\b|\bbugun\b|\d{1,2}[:.]\d{2}|\bsaat \d|"
+    r"pazartesi|\bsali\b|carsamba|persembe|\bcuma|\bpazar\b|\biptal|\bertele"
+)
+_MAX_WORDS = 14
+
+FAQ_STATS: Dict[str, int] = {"hits": 0, "low_confidence": 0, "no_answer": 0}
+
+
+class FaqAnswers:
+    """İşletme başına derlenmiş cevaplar."""
+
+    __slots__ = ("address", "hours", "phone", "services", "staff", "prices", "open_now", "closed_now")
+
+    def __init__(self, biz: dict):
+        name = (biz.get("name") or "").strip()
+        address = (biz.get("address") or "").strip()
+        hours = (biz.get("working_hours") or "").strip()
+        phone = (biz.get("phone") or "").strip()
+        services = [s for s in (biz.get("services") or []) if isinstance(s, dict) and (s.get("name") or "").strip()]
+        staff = [p for p in (biz.get("staff") or []) if isinstance(p, dict) and (p.get("name") or "").strip()]
+
+        self.address = f"Adresimiz: {address}. Başka bir sorunuz var mı?" if address else ""
+        self.hours = f"Çalışma saatlerimiz: {hours}. Randevu almak ister misiniz?" if hours else ""
+        self.open_now = f"Evet, şu an açığız. Çalışma saatlerimiz: {hours}." if hours else ""
+        self.closed_now = f"Şu an kapalıyız. Çalışma saatlerimiz: {hours}." if hours else ""
+        self.phone = f"{name} telefon numarası: {phone}." if phone else ""
+
+        priced = [s for s in services if s.get("price")]
+        self.services = (
+            "Hizmetlerimiz: " + ", ".join(_service_phrase(s) for s in services[:6]) + ". Hangisiyle ilgileniyorsunuz?"
+            if services else ""
+        )
+        # katlanmış hizmet adı -> cevap (uzun ad önce: "dolgu" < "kanal dolgu")
+        self.prices: List[Tuple[str, str]] = sorted(
+            (
+                (_fold(s["name"].strip()), f"{s['name'].strip()} {s['price']} TL, yaklaşık {s.get('duration') or 30} dakika sürüyor. Randevu oluşturalım mı?")
+                for s in priced
+            ),
+            key=lambda kv: -len(kv[0]),
+        )
+        names = [p["name"].strip() for p in staff]
+        if len(names) > 1:
+            self.staff = f"Ekibimizde {', '.join(names[:-1])} ve {names[-1]} var. Tercih ettiğiniz biri var mı?"
+        elif names:
+            self.staff = f"Ekibimizde {names[0]} var. Randevu almak ister misiniz?"
+        else:
+            self.staff = ""
+
+    def texts(self) -> List[str]:
+        """Tüm sabit cevaplar (TTS ısıtma)."""
+        out = [self.address, self.hours, self.open_now, self.closed_now, self.phone, self.services, self.staff]
+        out += [a for _, a in self.prices]
+        return [t for t in out if t]
+
+
+def _service_phrase(s: dict) -> str:
+    name = s["name"].strip()
+    return f"{name} {s['price']} TL" if s.get("price") else name
+
+
+_FAQ_CACHE: "OrderedDict[str, FaqAnswers]" = OrderedDict()
+_FAQ_CACHE_MAX = 256
+_FAQ_FIELDS = ("slug", "name", "address", "working_hours", "phone", "services", "staff")
+
+
+def compile_faq(biz: dict) -> FaqAnswers:
+    key = repr(tuple(biz.get(k) for k in _FAQ_FIELDS))
+    faq = _FAQ_CACHE.get(key)
+    if faq is None:
+        faq = FaqAnswers(biz)
+        _FAQ_CACHE[key] = faq
+        while len(_FAQ_CACHE) > _FAQ_CACHE_MAX:
+            _FAQ_CACHE.popitem(last=False)
+    else:
+        _FAQ_CACHE.move_to_end(key)
+    return faq
+
+
+def match_faq(text: str, biz: dict, now: Optional[datetime] = None) -> Tuple[str, str, float]:
+    """(niyet, cevap, güven). Cevap yoksa ("", "", 0)."""
+    t = _fold(text)
+    if not t.strip() or _BOOKING_RE.search(t):
+        return "", "", 0.0
+    faq = compile_faq(biz)
+
+    # Fiyat: hizmet adı geçiyorsa en güçlü sinyal
+    scores: Dict[str, float] = {}
+    for intent, (strong, weak) in _CUE_RES.items():
+        if any(rx.search(t) for rx in strong):
+            scores[intent] = 0.9
+        elif any(rx.search(t) for rx in weak):
+            scores[intent] = 0.6
+    service_answer = next((a for name, a in faq.prices if name and name in t), "")
+    if service_answer and "price" in scores:
+        scores["price"] = 1.0
+        scores.pop("services", None)
+
+    if not scores:
+        return "", "", 0.0
+    intent = max(scores, key=scores.get)
+    conf = scores[intent]
+    if len(scores) > 1:
+        conf -= 0.25  # "adres ve fiyat" gibi birleşik sorular LLM'e
+    if len(t.split()) > _MAX_WORDS:
+        conf -= 0.3
+
+    if intent == "price":
+        answer = service_answer or faq.services
+    elif intent == "hours" and re.search(r"(acik|kapali) mi", t) and faq.hours:
+        now = now or datetime.now(TR_TZ).replace(tzinfo=None)
+        answer = faq.open_now if schedule_for(biz).fits(now, 1) else faq.closed_now
+    else:
+        answer = getattr(faq, intent)
+    return intent, answer, conf
+
+
+def answer_faq(text: str, biz: dict) -> Optional[str]:
+    """Yeterince eminsek sabit cevap, değilsek None (LLM'e düş)."""
+    if not FAQ_FAST_PATH:
+        return None
+    intent, answer, conf = match_faq(text, biz)
+    if not intent:
+        return None
+    if not answer:
+        FAQ_STATS["no_answer"] += 1
+        return None
+    if conf < FAQ_MIN_CONFIDENCE:
+        FAQ_STATS["low_confidence"] += 1
+        return None
+    FAQ_STATS["hits"] += 1
+    FAQ_STATS[f"hit_{intent}"] = FAQ_STATS.get(f"hit_{intent}", 0) + 1
+    return answer
+
+
+def faq_texts(biz: dict) -> List[str]:
+    return compile_faq(biz).texts() if FAQ_FAST_PATH else []
+
+
+def faq_stats() -> dict:
+    return dict(FAQ_STATS)
@@ -0,0 +1,84 @@
+# backend/services/http_client.py
+# ─────────────────────────────────────────────────
+# Ortak fal.ai HTTP istemcisi (STT, LLM, TTS)
+#
+# Onceden her cagri yeni bir httpx.AsyncClient aciyordu:
+#   -> her turda 3 kez TCP + TLS handshake (fal.run)
+# Simdi process genelinde TEK istemci:
+#   - keep-alive + baglanti havuzu (limitler config'ten)
+#   - HTTP/2 multiplexing (h2 paketi kuruluysa)
+#   - startup'ta warm-up, shutdown'da kapatma (main.py)
+# ─────────────────────────────────────────────────
+
+import importlib.util, sys, os
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    FAL_WARMUP_URL,
+    HTTP2_ENABLED,
+    HTTP_POOL_MAX_CONNECTIONS,
+    HTTP_POOL_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+)
+
+# Sadece kurulu mu bakılır; h2'yi httpx HTTP/2 açılınca kendisi import eder
+H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = bool(HTTP2_ENABLED and H2_AVAILABLE)
+    if HTTP2_ENABLED and not H2_AVAILABLE:
+        print("[HTTP] h2 paketi yok -> HTTP/1.1 keep-alive (pip install 'httpx[http2]')")
+
+    limits = httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    # Varsayilan timeout; servisler istek bazinda kendi timeout'unu verir
+    timeout = httpx.Timeout(30.0, connect=HTTP_CONNECT_TIMEOUT)
+
+    print(
+        f"[HTTP] Ortak istemci: http2={http2} "
+        f"max_conn={HTTP_POOL_MAX_CONNECTIONS} keepalive={HTTP_POOL_MAX_KEEPALIVE}"
+    )
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process genelindeki paylasilan istemci (lazy olusturulur)."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = _build_client()
+    return _CLIENT
+
+
+async def warmup_http_client() -> bool:
+    """
+    fal.run'a bir baglanti acip havuza birakir.
+    Ilk gercek turda handshake maliyeti odenmesin.
+    """
+    if not FAL_WARMUP_URL:
+        return False
+    client = get_http_client()
+    try:
+        resp = await client.head(FAL_WARMUP_URL, timeout=5.0)
+        print(f"[HTTP] Warm-up OK ({resp.status_code}, {resp.http_version})")
+        return True
+    except Exception as e:
+        print(f"[HTTP] Warm-up hatasi: {e}")
+        return False
+
+
+async def close_http_client():
+    global _CLIENT
+    if _CLIENT is not None and not _CLIENT.is_closed:
+        await _CLIENT.aclose()
+        print("[HTTP] Ortak istemci kapatildi")
+    _CLIENT = None
@@ -7,31 +7,137 @@
 # - Daha az token = daha hizli cevap
 # ─────────────────────────────────────────────────
 
-import httpx, sys, os, re
+import sys, os, re, json, time
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Awaitable, Callable
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import FAL_API_KEY, FAL_LLM_URL, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE
+from config import (
+    FAL_API_KEY, FAL_LLM_URL, FAL_LLM_STREAM_URL, LLM_MODEL, LLM_MAX_TOKENS, LLM_TEMPERATURE,
+    LLM_HISTORY_TOKEN_BUDGET, LLM_MIN_RECENT_MESSAGES, LLM_TOOL_MODE, LLM_TOOL_MAX_STEPS,
+    LLM_ROUTING, LLM_FAST_MODEL, LLM_FAST_MAX_TOKENS, LLM_FAST_TIMEOUT, LLM_FAST_MAX_WORDS, LLM_STRONG_TIMEOUT,
+)
+from services.http_client import get_http_client
+from services.session_store import SessionStore
+from services.conversation_memory import BookingSummary, estimate_tokens, fold_to_budget
+from services.schedule import fold_text as _fold
 
 # Türkiye saati sabit: UTC+03 (Python 3.9 uyumlu)
 TR_TZ = timezone(timedelta(hours=3))
 
 
+_RANDEVU_BLOCK = """9) TELEFON ALINCA HEMEN RANDEVU SATIRINI YAZ (asagida)
+10) Ardindan "Randevunuz olusturuldu" de.
+
+!!! KRITIK - RANDEVU FORMATI !!!
+Ad + Soyad + Telefon aldiktan sonra MUTLAKA bu satiri yaz:
+
+RANDEVU: YYYY-MM-DD HH:MM | AD SOYAD | TELEFON
+
+ORNEK (TAM BU FORMATTA):
+RANDEVU: 2026-02-16 16:00 | Nuray Karakus | 05538521360
+
+KURALLAR:
+- Bu satiri YAZMADAN "Randevunuz olusturuldu" DEME
+- Telefon numarasini tekrar etme, onaylama, DIREKT RANDEVU satirini yaz
+- Format AYNEN bu sekilde olmali: RANDEVU: tarih saat | ad soyad | telefon
+"""
+
+TOOL_MARKER = "ARAC:"
+_TOOL_RESULT_ROLE = "Arac sonucu"
+
+_TOOL_BLOCK = """9) Telefon alinca book aracini cagir (asagida)
+10) Arac sonucu ok ise "Randevunuz olusturuldu" de.
+
+!!! KRITIK - ARACLAR !!!
+Sunucu bu araclari HEMEN calistirir, sonucu "Arac sonucu:" satiriyla sana doner:
+- check_slots {"date":"YYYY-MM-DD","service":"hizmet adi"} -> o gunun bos saatleri
+- book {"datetime":"YYYY-MM-DD HH:MM","name":"Ad Soyad","phone":"05XXXXXXXXX","service":"hizmet adi"} -> randevuyu olusturur
+- suggest_alternatives {"datetime":"YYYY-MM-DD HH:MM","service":"hizmet adi"} -> en yakin bos saatler
+
+Arac cagirmak icin cevabin SADECE bu tek satir olsun:
+ARAC: {"tool":"check_slots","args":{"date":"2026-02-16","service":"Dolgu"}}
+
+KURALLAR:
+- Musteri gun soyleyince check_slots cagir; bos saat UYDURMA, sadece sonuctakileri oner
+- Ad soyad + telefon + onay alinca book cagir, telefonu tekrar etme
+- book ok degilse suggest_alternatives cagir ve 2-3 saat oner
+- book sonucu ok OLMADAN "Randevunuz olusturuldu" DEME
+- ARAC satirini ve arac sonucunu musteriye okuma; dogal bir cumleyle cevap ver
+"""
+
+# Araç uygulamaları main.py'de kaydedilir (DB/takvim erişimi orada):
+#   handler(args, business, session_id) -> dict (JSON'lanabilir)
+ToolHandler = Callable[[Dict[str, Any], dict, str], Awaitable[Dict[str, Any]]]
+_TOOLS: Dict[str, ToolHandler] = {}
+TOOL_STATS: Dict[str, int] = {"calls": 0, "errors": 0, "invalid": 0, "step_limit": 0}
+
+
+def register_tool(name: str, handler: ToolHandler):
+    _TOOLS[name] = handler
+
+
+def _tool_mode() -> bool:
+    return LLM_TOOL_MODE and bool(_TOOLS)
+
+
+# Derlenmiş statik prompt: işletme içeriği değişmedikçe aynı string.
+# Saat satırı EN SONA eklenir -> önündeki kısım turlar/aramalar arasında
+# byte byte aynı kalır (sağlayıcı tarafı prefix cache'i tutar).
+_PROMPT_FIELDS = (
+    "slug", "name", "agent_name", "sector", "address", "phone",
+    "working_hours", "services", "staff", "campaigns", "custom_rules",
+)
+_PROMPT_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_PROMPT_CACHE_MAX = 256
+PROMPT_STATS: Dict[str, int] = {
+    "turns": 0, "bytes_sent": 0, "last_bytes": 0, "prefix_hits": 0, "prefix_builds": 0,
+    "tokens_sent": 0, "last_tokens": 0, "max_tokens": 0, "folded_messages": 0,
+}
+
+
+def _business_fingerprint(biz: dict) -> str:
+    """İşletme sürümü: prompt'a giren alanlar değişince değişir."""
+    return repr((_tool_mode(),) + tuple(biz.get(k) for k in _PROMPT_FIELDS))
+
+
+def compile_system_prefix(biz: dict) -> str:
+    """Prompt'un statik kısmı (işletme sürümü başına bir kez kurulur)."""
+    key = _business_fingerprint(biz)
+    prefix = _PROMPT_CACHE.get(key)
+    if prefix is not None:
+        _PROMPT_CACHE.move_to_end(key)
+        PROMPT_STATS["prefix_hits"] += 1
+        return prefix
+    prefix = _build_static_prompt(biz)
+    PROMPT_STATS["prefix_builds"] += 1
+    _PROMPT_CACHE[key] = prefix
+    while len(_PROMPT_CACHE) > _PROMPT_CACHE_MAX:
+        _PROMPT_CACHE.popitem(last=False)
+    return prefix
+
+
+def _clock_line(now: Optional[datetime] = None) -> str:
+    now = now or datetime.now(TR_TZ)
+    weekday_tr = ["Pzt", "Sal", "Çar", "Per", "Cum", "Cmt", "Paz"][now.weekday()]
+    return f"SU AN: {now:%Y-%m-%d} {now:%H:%M} ({weekday_tr})\n"
+
+
 def build_system_prompt(biz: dict) -> str:
+    """Statik prefix (cache) + her turda güncel saat satırı."""
+    return compile_system_prefix(biz) + _clock_line()
+
+
+def _build_static_prompt(biz: dict) -> str:
     """
-    Optimize edilmis system prompt.
+    Optimize edilmis system prompt (saat satiri haric).
     - Sesli konusma optimizasyonu (1-2 cumle)
     - Randevu akisi + guvenlik
-    - En kritik EK: BUGUNUN TARIHI / SAATI (LLM'in "yarin" sapitmasini keser)
+    - En kritik EK: BUGUNUN TARIHI / SAATI (LLM'in "yarin" sapitmasini keser) -> sondaki SU AN satiri
     - En kritik EK: RANDEVU formatini ZORUNLU kil
     - ✅ FIX: "Bugün istiyorum" ama işletme kapalıysa "müsait yok" demeden açıklayıp en yakın güne yönlendir
     """
-    now = datetime.now(TR_TZ)
-    today_str = now.strftime("%Y-%m-%d")
-    time_str = now.strftime("%H:%M")
-    weekday_tr = ["Pzt", "Sal", "Çar", "Per", "Cum", "Cmt", "Paz"][now.weekday()]
-
     services = "\n".join([
         f"- {s['name']} ({s.get('duration',30)}dk, {s.get('price',0)}TL)"
         for s in biz.get("services", [])
@@ -60,8 +166,8 @@ KONUSMA TARZI (COK ONEMLI):
 - Emoji ve markdown KULLANMA (sesli konusma).
 
 ZAMAN (KESIN):
-- Su an: {today_str} {time_str} ({weekday_tr})
-- "bugun" = {today_str}, "yarin" = bugune +1 gun
+- Su anki tarih/saat en alttaki "SU AN" satirinda
+- "bugun" = o tarih, "yarin" = bugune +1 gun
 - Tarih/saat UYDURMA. Emin degilsen netlestir.
 
 CALISMA SAATLERI: {working_hours}
@@ -77,22 +183,7 @@ RANDEVU AKISI (dogal konusma icinde):
 6) Onay al ("evet/tamam")
 7) Ad soyad al
 8) Telefon al
-9) TELEFON ALINCA HEMEN RANDEVU SATIRINI YAZ (asagida)
-10) Ardindan "Randevunuz olusturuldu" de.
-
-!!! KRITIK - RANDEVU FORMATI !!!
-Ad + Soyad + Telefon aldiktan sonra MUTLAKA bu satiri yaz:
-
-RANDEVU: YYYY-MM-DD HH:MM | AD SOYAD | TELEFON
-
-ORNEK (TAM BU FORMATTA):
-RANDEVU: 2026-02-16 16:00 | Nuray Karakus | 05538521360
-
-KURALLAR:
-- Bu satiri YAZMADAN "Randevunuz olusturuldu" DEME
-- Telefon numarasini tekrar etme, onaylama, DIREKT RANDEVU satirini yaz
-- Format AYNEN bu sekilde olmali: RANDEVU: tarih saat | ad soyad | telefon
-
+{_TOOL_BLOCK if _tool_mode() else _RANDEVU_BLOCK}
 ISLETME: {name}
 Sektor: {biz.get('sector','')}
 Adres: {biz.get('address','')}
@@ -118,9 +209,42 @@ GUVENLIK:
 """
 
 
-# Oturumlar
-sessions: Dict[str, Dict[str, Any]] = {}
-MAX_HISTORY = 16
+# Oturumlar (sınırlı + boşta kalan silinir)
+class ChatSession:
+    __slots__ = ("history", "business", "summary")
+
+    def __init__(self, business: dict):
+        self.history: List[Dict[str, str]] = []
+        self.business = business
+        self.summary = BookingSummary()  # bütçeden taşan eski mesajlar
+
+    # business kaydedilmez: her turda güncel config zaten yazılıyor
+    def dump(self) -> dict:
+        d: Dict[str, Any] = {"h": self.history}
+        s = self.summary.to_dict()
+        if s:
+            d["s"] = s
+        return d
+
+    @classmethod
+    def load(cls, data: dict) -> "ChatSession":
+        sess = cls({})
+        sess.history = list(data.get("h") or [])
+        sess.summary = BookingSummary.from_dict(data.get("s"))
+        return sess
+
+
+sessions = SessionStore("chat", dump=ChatSession.dump, load=ChatSession.load)
+MAX_HISTORY = 16  # token bütçesinden bağımsız üst sınır (taşan da özete katlanır)
+
+
+def _compact(sess: ChatSession):
+    n = fold_to_budget(
+        sess.history, sess.summary, sess.business or {},
+        LLM_HISTORY_TOKEN_BUDGET, LLM_MIN_RECENT_MESSAGES, MAX_HISTORY,
+        datetime.now(TR_TZ).replace(tzinfo=None),
+    )
+    PROMPT_STATS["folded_messages"] += n
 
 
 def _dedupe_repeats(text: str) -> str:
@@ -160,72 +284,554 @@ def _dedupe_repeats(text: str) -> str:
     return t2.strip()
 
 
-async def chat(user_message: str, session_id: str, business_config: dict) -> str:
-    if session_id not in sessions:
-        sessions[session_id] = {"history": [], "business": business_config}
-
-    sess = sessions[session_id]
+def _prepare_turn(user_message: str, session_id: str, business_config: dict) -> Tuple[ChatSession, str]:
+    """Oturuma user mesajini ekler, prompt string'i kurar."""
+    sess = sessions.get_or_create(session_id, lambda: ChatSession(business_config))
 
     # business güncellenmiş olabilir → günceli yaz
-    sess["business"] = business_config
+    sess.business = business_config
 
     # user ekle
-    sess["history"].append({"role": "user", "content": user_message})
+    sess.history.append({"role": "user", "content": user_message})
+
+    # bütçe: eski mesajlar özete
+    _compact(sess)
+    return sess, _render_prompt(sess)
+
+
+_ROLE_PREFIX = {"user": "User", "assistant": "Assistant", "tool": _TOOL_RESULT_ROLE}
 
-    # trim
-    if len(sess["history"]) > MAX_HISTORY:
-        sess["history"] = sess["history"][-MAX_HISTORY:]
 
-    system = build_system_prompt(sess["business"])
+def _render_prompt(sess: ChatSession) -> str:
+    system = build_system_prompt(sess.business) + sess.summary.render()
 
     # Prompt string (router model)
     parts = [f"System: {system}"]
-    for msg in sess["history"]:
-        r = "User" if msg["role"] == "user" else "Assistant"
-        parts.append(f"{r}: {msg['content']}")
+    for msg in sess.history:
+        parts.append(f"{_ROLE_PREFIX.get(msg['role'], 'Assistant')}: {msg['content']}")
     parts.append("Assistant:")
     prompt_str = "\n".join(parts)
 
-    print(f"[LLM] {LLM_MODEL}, {len(prompt_str)} char")
+    sent = len(prompt_str.encode("utf-8"))
+    tokens = estimate_tokens(prompt_str)
+    PROMPT_STATS["turns"] += 1
+    PROMPT_STATS["bytes_sent"] += sent
+    PROMPT_STATS["last_bytes"] = sent
+    PROMPT_STATS["tokens_sent"] += tokens
+    PROMPT_STATS["last_tokens"] = tokens
+    PROMPT_STATS["max_tokens"] = max(PROMPT_STATS["max_tokens"], tokens)
+    return prompt_str
+
+
+async def record_exchange(user_message: str, reply: str, session_id: str, business_config: dict):
+    """LLM'siz cevaplanan tur (ör. SSS): geçmişe yaz, sonraki LLM turunda bağlam kopmasın."""
+    await sessions.refresh(session_id)
+    sess = sessions.get_or_create(session_id, lambda: ChatSession(business_config))
+    sess.business = business_config
+    sess.history.append({"role": "user", "content": user_message})
+    sess.history.append({"role": "assistant", "content": reply})
+    _compact(sess)
+    sessions.save(session_id)
+
+
+def llm_stats() -> dict:
+    turns = PROMPT_STATS["turns"]
+    return {
+        **PROMPT_STATS,
+        "avg_bytes": PROMPT_STATS["bytes_sent"] // turns if turns else 0,
+        "avg_tokens": PROMPT_STATS["tokens_sent"] // turns if turns else 0,
+        "prefix_cached": len(_PROMPT_CACHE),
+        "tools": dict(TOOL_STATS),
+        "routing": router_stats(),
+    }
+
+
+def _llm_payload(prompt_str: str, tier: "Tier") -> Dict[str, Any]:
+    return {
+        "prompt": prompt_str,
+        "model": tier.model,
+        "max_tokens": tier.max_tokens,
+        "temperature": LLM_TEMPERATURE,
+        "stop": ["\nUser:", "\nUser", "User:", "\nSystem:", "System:", f"{_TOOL_RESULT_ROLE}:"],
+    }
+
+
+# ─────────────────────────────────────────
+# MODEL KATMANLARI (fast / strong)
+# ─────────────────────────────────────────
+# Telefon turlarının çoğu önemsiz ("evet", "merhaba", "teşekkürler"):
+# bunlar küçük/hızlı modele, tarih-saat-booking turları LLM_MODEL'e.
+# Hızlı modelin cevabı kalite kontrolünden geçmezse (boş, rol sızıntısı,
+# geçersiz ARAC satırı, önceki cevabın aynısı) tur güçlü modelle tekrarlanır.
+class Tier:
+    __slots__ = ("name", "model", "max_tokens", "timeout")
+
+    def __init__(self, name: str, model: str, max_tokens: int, timeout: float):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+
+
+STRONG = Tier("strong", LLM_MODEL, LLM_MAX_TOKENS, LLM_STRONG_TIMEOUT)
+FAST = Tier("fast", LLM_FAST_MODEL, LLM_FAST_MAX_TOKENS, LLM_FAST_TIMEOUT)
+_ROUTING_ON = LLM_ROUTING and bool(LLM_FAST_MODEL) and LLM_FAST_MODEL != LLM_MODEL
+
+# Alan bilgisi / booking adımı: güçlü model
+_COMPLEX_RE = re.compile(
+    r"randev|rezervasyon|iptal|ertele|degis|musait|\bbos\b|\bsaat|\bgun(u|e|de)?\b|hafta|\bay\b|yarin|bugun|"
+    r"pazartesi|\bsali\b|carsamba|persembe|\bcuma|\bpazar|sabah|ogle|aksam|"
+    r"fiyat|ucret|ne kadar|hizmet|doktor|hekim|\bad(im)?\b|soyad|ismim|telefon|numara|neden|\bnasil\b|hangi"
+)
+# Önceki asistan mesajı booking ortasında mı (saat önerdi / ad-telefon / onay istedi)
+_PENDING_RE = re.compile(r"\d{1,2}[:.]\d{2}|telefon|ad soyad|adiniz|onayl|olusturayim|uygun mu")
+# Kullanıcı bir gün/zaman söyledi mi (booking sürüyor sinyali)
+_WHEN_RE = re.compile(r"\d|yarin|bugun|pazartesi|\bsali\b|carsamba|persembe|\bcuma|\bpazar|sabah|ogle|aksam|hafta")
+_BOOKING_LOOKBACK = 6  # route_turn: sadece son mesajlara bakılır (özet kalıcıdır, sinyal olmaz)
+_ROLE_LEAK_RE = re.compile(r"(^|\n)\s*(User|System|Assistant)\s*:")
+_FAST_CHECK_CHARS = 24  # stream: hızlı model bu kadar yazmadan kontrol edilmeden seslendirilmez
+_LATENCY_WINDOW = 200
+
+ROUTER_STATS: Dict[str, Any] = {
+    "fast": {"turns": 0, "calls": 0, "errors": 0, "escalated": 0},
+    "strong": {"turns": 0, "calls": 0, "errors": 0, "escalated": 0},
+    "reasons": {},
+    "escalations": {},
+}
+_LATENCY: Dict[str, "deque[float]"] = {"fast": deque(maxlen=_LATENCY_WINDOW), "strong": deque(maxlen=_LATENCY_WINDOW)}
+_FIRST_TOKEN: Dict[str, "deque[float]"] = {"fast": deque(maxlen=_LATENCY_WINDOW), "strong": deque(maxlen=_LATENCY_WINDOW)}
+
+
+def _booking_open(sess: ChatSession) -> bool:
+    """Son mesajlarda gün/saat konuşulmuş ve o randevu henüz tamamlanmamış mı."""
+    ok = False
+    for m in list(reversed(sess.history[:-1]))[:_BOOKING_LOOKBACK]:
+        c = m["content"]
+        if m["role"] == "tool":
+            ok = '"ok":true' in c
+            continue
+        if "RANDEVU:" in c or (ok and '"tool":"book"' in c):
+            return False  # randevu alındı
+        ok = False
+        if m["role"] == "user" and _WHEN_RE.search(_fold(c)):
+            return True
+    return False
+
+
+def route_turn(sess: ChatSession, user_message: str) -> Tuple[Tier, str]:
+    """(katman, sebep). Sebep /health'te sayılır (eşik ayarı için)."""
+    if not _ROUTING_ON:
+        return STRONG, "off"
+    t = _fold(user_message)
+    if not t.strip():
+        return STRONG, "empty"
+    if re.search(r"\d", t):
+        return STRONG, "digits"  # tarih, saat, telefon
+    if _COMPLEX_RE.search(t):
+        return STRONG, "domain"
+    if len(t.split()) > LLM_FAST_MAX_WORDS:
+        return STRONG, "long"
+    if _booking_open(sess):
+        return STRONG, "booking"
+    prev = next((m for m in reversed(sess.history[:-1]) if m["role"] != "user"), None)
+    if prev is not None and (prev["role"] == "tool" or _PENDING_RE.search(_fold(prev["content"]))):
+        return STRONG, "booking"  # "evet" burada book aracını tetikleyebilir
+    return FAST, "simple"
+
+
+def _low_quality(text: str, prev_reply: str) -> str:
+    """Hızlı model cevabında sorun varsa sebebi, yoksa ""."""
+    t = (text or "").strip()
+    if len(t) < 2:
+        return "empty"
+    if _ROLE_LEAK_RE.search(t):
+        return "role_leak"
+    if TOOL_MARKER in t:
+        call = _parse_tool_call(t)
+        if call is None or call[0] not in _TOOLS:
+            return "bad_tool"
+    if prev_reply and _fold(t) == _fold(prev_reply):
+        return "repeat"
+    return ""
+
 
+def _last_reply(sess: ChatSession) -> str:
+    return next((m["content"] for m in reversed(sess.history) if m["role"] == "assistant"), "")
+
+
+def _count(bucket: str, key: str):
+    ROUTER_STATS[bucket][key] = ROUTER_STATS[bucket].get(key, 0) + 1
+
+
+def _escalate(reason: str):
+    ROUTER_STATS["fast"]["escalated"] += 1
+    _count("escalations", reason)
+    print(f"[LLM] fast -> strong ({reason})")
+
+
+def _percentile(values: List[float], q: float) -> int:
+    if not values:
+        return 0
+    s = sorted(values)
+    return int(s[min(len(s) - 1, int(q * len(s)))])
+
+
+def router_stats() -> dict:
+    total = ROUTER_STATS["fast"]["turns"] + ROUTER_STATS["strong"]["turns"]
+    tiers = {}
+    for tier in (FAST, STRONG):
+        st = ROUTER_STATS[tier.name]
+        lat = list(_LATENCY[tier.name])
+        ttft = list(_FIRST_TOKEN[tier.name])
+        tiers[tier.name] = {
+            **st,
+            "model": tier.model,
+            "share": round(st["turns"] / total, 3) if total else 0.0,
+            "p50_ms": _percentile(lat, 0.5),
+            "p95_ms": _percentile(lat, 0.95),
+            "first_token_p50_ms": _percentile(ttft, 0.5),
+        }
+    return {
+        "enabled": _ROUTING_ON,
+        **tiers,
+        "reasons": dict(ROUTER_STATS["reasons"]),
+        "escalations": dict(ROUTER_STATS["escalations"]),
+    }
+
+
+async def _routed_complete(prompt_str: str, tier: Tier, prev_reply: str) -> Tuple[str, Tier]:
+    """Hızlı katman hata verir ya da kötü cevap dönerse güçlü katmanla tekrar."""
+    if tier is FAST:
+        try:
+            msg = await _complete(prompt_str, FAST)
+        except Exception as e:
+            ROUTER_STATS["fast"]["errors"] += 1
+            _escalate("error")
+            print(f"[LLM] fast hata: {e}")
+        else:
+            reason = _low_quality(msg, prev_reply)
+            if not reason:
+                return msg, FAST
+            _escalate(reason)
+    return await _complete(prompt_str, STRONG), STRONG
+
+
+async def _routed_stream(prompt_str: str, tier: Tier, prev_reply: str, used: List[Tier]) -> AsyncIterator[str]:
+    """
+    Hızlı katmanda ilk _FAST_CHECK_CHARS karakter (ARAC satırıysa tamamı)
+    tutulur ve kontrol edilir; sorun varsa hiçbir şey yield edilmeden
+    güçlü katmana geçilir. Kontrolden sonra akış olduğu gibi devam eder.
+    used[0]: turun o anki katmanı (sonraki araç adımları da onu kullanır).
+    """
+    if tier is FAST:
+        buf, passed = "", False
+        stream = _stream_completion(prompt_str, FAST)
+        try:
+            async for piece in stream:
+                if passed:
+                    yield piece
+                    continue
+                buf += piece
+                if len(buf) < _FAST_CHECK_CHARS or TOOL_MARKER in buf:
+                    continue
+                reason = _low_quality(buf, "")
+                if reason:
+                    break
+                passed = True
+                yield buf
+        except Exception as e:
+            if passed:
+                raise
+            ROUTER_STATS["fast"]["errors"] += 1
+            print(f"[LLM] fast hata: {e}")
+            reason = "error"
+        else:
+            await stream.aclose()  # kontrolde kesildiyse bağlantıyı hemen bırak
+            if passed:
+                return
+            reason = _low_quality(buf, prev_reply)
+            if not reason:
+                if buf:
+                    yield buf
+                return
+        _escalate(reason)
+        used[0] = STRONG
+    async for piece in _stream_completion(prompt_str, STRONG):
+        yield piece
+
+
+def _start_turn(tier: Tier, reason: str):
+    ROUTER_STATS[tier.name]["turns"] += 1
+    _count("reasons", reason)
+
+
+# ─────────────────────────────────────────
+# ARAÇ ÇAĞRISI (aynı tur içinde)
+# ─────────────────────────────────────────
+_TOOL_CALL_RE = re.compile(re.escape(TOOL_MARKER) + r"\s*(\{.*\})", re.DOTALL)
+
+
+def _parse_tool_call(text: str) -> Optional[Tuple[str, Dict[str, Any], str]]:
+    """(araç, argümanlar, öncesindeki metin) — ARAC satırı yoksa None."""
+    i = (text or "").find(TOOL_MARKER)
+    if i < 0:
+        return None
+    before = text[:i].strip()
+    m = _TOOL_CALL_RE.search(text, i)
+    try:
+        data = json.loads(m.group(1)) if m else {}
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    args = data.get("args")
+    return str(data.get("tool") or ""), (args if isinstance(args, dict) else {}), before
+
+
+async def _run_tool(name: str, args: Dict[str, Any], business: dict, session_id: str) -> Dict[str, Any]:
+    handler = _TOOLS.get(name)
+    if handler is None:
+        TOOL_STATS["invalid"] += 1
+        return {"ok": False, "error": f"bilinmeyen arac: {name or '?'}; ARAC satirini ornekteki JSON ile yaz"}
+    TOOL_STATS["calls"] += 1
+    TOOL_STATS[f"call_{name}"] = TOOL_STATS.get(f"call_{name}", 0) + 1
     try:
-        async with httpx.AsyncClient(timeout=12.0) as client:
-            resp = await client.post(
-                FAL_LLM_URL,
-                headers={"Authorization": f"Key {FAL_API_KEY}", "Content-Type": "application/json"},
-                json={
-                    "prompt": prompt_str,
-                    "model": LLM_MODEL,
-                    "max_tokens": LLM_MAX_TOKENS,
-                    "temperature": LLM_TEMPERATURE,
-                    "stop": ["\nUser:", "\nUser", "User:", "\nSystem:", "System:"],
-                },
-            )
-
-            if resp.status_code != 200:
-                print(f"[LLM] Hata {resp.status_code}: {resp.text[:300]}")
-                return "Bir sorun olustu, tekrar dener misiniz?"
-
-            data = resp.json()
-            msg = _extract(data)
-            if not msg:
-                return "Sizi tam anlayamadim, tekrar soyleyebilir misiniz?"
-
-            msg = _dedupe_repeats(msg)
-
-            # assistant ekle
-            sess["history"].append({"role": "assistant", "content": msg})
-
-            # trim tekrar (assistant ekledik)
-            if len(sess["history"]) > MAX_HISTORY:
-                sess["history"] = sess["history"][-MAX_HISTORY:]
-
-            print(f"[LLM] -> \"{msg[:120]}\"")
-            return msg
+        result = await handler(args, business, session_id)
+    except Exception as e:
+        TOOL_STATS["errors"] += 1
+        print(f"[TOOL] {name} hata: {e}")
+        return {"ok": False, "error": str(e)}
+    print(f"[TOOL] {name} {json.dumps(args, ensure_ascii=False)} -> {json.dumps(result, ensure_ascii=False)[:160]}")
+    return result
+
+
+async def _apply_tool_call(sess: ChatSession, call: Tuple[str, Dict[str, Any], str], session_id: str) -> str:
+    """Çağrıyı + sonucu geçmişe yazar, devam prompt'unu döndürür."""
+    name, args, _ = call
+    result = await _run_tool(name, args, sess.business or {}, session_id)
+    line = json.dumps({"tool": name, "args": args}, ensure_ascii=False, separators=(",", ":"))
+    sess.history.append({"role": "assistant", "content": f"{TOOL_MARKER} {line}"})
+    sess.history.append({"role": "tool", "content": json.dumps(result, ensure_ascii=False, separators=(",", ":"))})
+    return _render_prompt(sess)
+
+
+def _finish_turn(sess: ChatSession, msg: str):
+    # assistant ekle
+    sess.history.append({"role": "assistant", "content": msg})
+    _compact(sess)
+
+
+class LLMError(Exception):
+    pass
+
+
+_ERROR_TEXT = "Bir sorun olustu, tekrar dener misiniz?"
+_EMPTY_TEXT = "Sizi tam anlayamadim, tekrar soyleyebilir misiniz?"
+
+
+async def _complete(prompt_str: str, tier: Tier) -> str:
+    ROUTER_STATS[tier.name]["calls"] += 1
+    t0 = time.perf_counter()
+    client = get_http_client()
+    resp = await client.post(
+        FAL_LLM_URL,
+        headers={"Authorization": f"Key {FAL_API_KEY}", "Content-Type": "application/json"},
+        json=_llm_payload(prompt_str, tier),
+        timeout=tier.timeout,
+    )
+    if resp.status_code != 200:
+        raise LLMError(f"Hata {resp.status_code}: {resp.text[:300]}")
+    msg = _extract(resp.json())
+    _LATENCY[tier.name].append((time.perf_counter() - t0) * 1000)
+    return msg
+
+
+async def chat(user_message: str, session_id: str, business_config: dict) -> str:
+    await sessions.refresh(session_id)
+    sess, prompt_str = _prepare_turn(user_message, session_id, business_config)
+    tier, reason = route_turn(sess, user_message)
+    _start_turn(tier, reason)
+    prev_reply = _last_reply(sess)
+
+    print(f"[LLM] {tier.model} ({tier.name}/{reason}), {PROMPT_STATS['last_bytes']} byte (~{PROMPT_STATS['last_tokens']} token)")
+
+    spoken: List[str] = []
+    try:
+        for step in range(LLM_TOOL_MAX_STEPS + 1):
+            msg, tier = await _routed_complete(prompt_str, tier, prev_reply)
+            call = _parse_tool_call(msg) if _tool_mode() else None
+            if call is None:
+                spoken.append(msg)
+                break
+            if call[2]:
+                spoken.append(call[2])
+            if step == LLM_TOOL_MAX_STEPS:
+                TOOL_STATS["step_limit"] += 1
+                break
+            prompt_str = await _apply_tool_call(sess, call, session_id)
+
+    except Exception as e:
+        print(f"[LLM] {e}")
+        return _ERROR_TEXT
+
+    msg = _dedupe_repeats(" ".join(p for p in spoken if p))
+    if not msg:
+        return _EMPTY_TEXT
+    _finish_turn(sess, msg)
+    sessions.save(session_id)
+
+    print(f"[LLM] -> \"{msg[:120]}\"")
+    return msg
+
+
+def _stream_delta(data, so_far: str) -> str:
+    """
+    Stream event'inden yeni gelen parcayi cikarir.
+    - OpenAI tarzi: choices[0].delta.content / choices[0].text -> parca
+    - fal tarzi: {"output": "..."} -> o ana kadarki TUM metin (kumulatif)
+    """
+    if not isinstance(data, dict):
+        return ""
+    ch = data.get("choices")
+    if ch and isinstance(ch, list):
+        c = ch[0] or {}
+        delta = c.get("delta") or {}
+        if isinstance(delta, dict) and isinstance(delta.get("content"), str):
+            return delta["content"]
+        if isinstance(c.get("text"), str):
+            return c["text"]
+        return ""
+    out = data.get("output")
+    if isinstance(out, str):
+        if out.startswith(so_far):
+            return out[len(so_far):]
+        return ""
+    return ""
+
+
+async def _stream_completion(prompt_str: str, tier: Tier) -> AsyncIterator[str]:
+    payload = _llm_payload(prompt_str, tier)
+    payload["stream"] = True
+    ROUTER_STATS[tier.name]["calls"] += 1
+    t0 = time.perf_counter()
+    first = True
+
+    client = get_http_client()
+    async with client.stream(
+        "POST",
+        FAL_LLM_STREAM_URL,
+        headers={
+            "Authorization": f"Key {FAL_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream",
+        },
+        json=payload,
+        timeout=tier.timeout,
+    ) as resp:
+        if resp.status_code != 200:
+            body = (await resp.aread()).decode("utf-8", "ignore")
+            raise LLMError(f"Stream hata {resp.status_code}: {body[:300]}")
+
+        ct = resp.headers.get("content-type", "")
+        if "event-stream" not in ct:
+            # Sunucu stream etmedi -> tek parca JSON
+            full = _extract(json.loads(await resp.aread() or b"{}"))
+            _LATENCY[tier.name].append((time.perf_counter() - t0) * 1000)
+            if full:
+                yield full
+            return
+
+        full = ""
+        async for line in resp.aiter_lines():
+            line = (line or "").strip()
+            if not line.startswith("data:"):
+                continue
+            raw = line[len("data:"):].strip()
+            if not raw or raw == "[DONE]":
+                continue
+            try:
+                piece = _stream_delta(json.loads(raw), full)
+            except ValueError:
+                continue
+            if piece:
+                if first:
+                    first = False
+                    _FIRST_TOKEN[tier.name].append((time.perf_counter() - t0) * 1000)
+                full += piece
+                yield piece
+        _LATENCY[tier.name].append((time.perf_counter() - t0) * 1000)
+
+
+async def chat_stream(user_message: str, session_id: str, business_config: dict) -> AsyncIterator[str]:
+    """
+    chat() ile ayni tur, ama token'lar geldikce yield edilir.
+    Tur bitince cevap (dedupe edilmis haliyle) history'ye yazilir.
+    Stream acilamazsa tek parca hata mesaji yield edilir.
+    Arac modu: ARAC satiri seslendirilmez (son birkac karakter marker
+    olabilir diye tutulur); arac calisir, cevap ayni turda devam eder.
+    """
+    await sessions.refresh(session_id)
+    sess, prompt_str = _prepare_turn(user_message, session_id, business_config)
+    tier, reason = route_turn(sess, user_message)
+    _start_turn(tier, reason)
+    prev_reply = _last_reply(sess)
+    used = [tier]
+
+    print(f"[LLM] stream {tier.model} ({tier.name}/{reason}), {PROMPT_STATS['last_bytes']} byte (~{PROMPT_STATS['last_tokens']} token)")
+
+    tools = _tool_mode()
+    keep = len(TOOL_MARKER) - 1
+    spoken = ""
+    try:
+        for step in range(LLM_TOOL_MAX_STEPS + 1):
+            text, hold, in_call = "", "", False
+            async for piece in _routed_stream(prompt_str, used[0], prev_reply, used):
+                text += piece
+                if not tools:
+                    spoken += piece
+                    yield piece
+                    continue
+                if in_call:
+                    continue  # ARAC satırı toplanıyor
+                hold += piece
+                i = hold.find(TOOL_MARKER)
+                if i >= 0:
+                    in_call, out, hold = True, hold[:i], ""
+                elif len(hold) > keep:
+                    out, hold = hold[:-keep], hold[-keep:]
+                else:
+                    out = ""
+                if out:
+                    spoken += out
+                    yield out
+
+            if not in_call:
+                if hold:
+                    spoken += hold
+                    yield hold
+                break
+            if step == LLM_TOOL_MAX_STEPS:
+                TOOL_STATS["step_limit"] += 1
+                break
+            prompt_str = await _apply_tool_call(sess, _parse_tool_call(text), session_id)
+            if spoken and not spoken[-1].isspace():
+                spoken += " "
+                yield " "
 
     except Exception as e:
-        print(f"[LLM] Hata: {e}")
-        return "Bir sorun olustu, tekrar dener misiniz?"
+        print(f"[LLM] {e}")
+        if not spoken.strip():
+            yield _ERROR_TEXT
+            return
+
+    msg = _dedupe_repeats(spoken)
+    if not msg:
+        yield _EMPTY_TEXT
+        return
+
+    _finish_turn(sess, msg)
+    sessions.save(session_id)
+    print(f"[LLM] stream -> \"{msg[:120]}\"")
 
 
 def _extract(data) -> str:
@@ -249,5 +855,4 @@ def _extract(data) -> str:
 
 
 def clear_history(session_id: str):
-    if session_id in sessions:
-        del sessions[session_id]
\ No newline at end of file
+    sessions.pop(session_id)
\ No newline at end of file
@@ -10,6 +10,7 @@
 # ═══════════════════════════════════════════════════════════════
 
 import os, sys, html as html_lib
+from typing import List, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
@@ -67,18 +68,23 @@ def create_welcome_twiml(business_config: dict, base_url: str, welcome_audio_url
 </Response>"""
 
 
-def create_response_twiml(ai_text: str, slug: str, session_id: str, base_url: str, end_call: bool = False, audio_url: str = "") -> str:
+def create_response_twiml(ai_text: str, slug: str, session_id: str, base_url: str, end_call: bool = False, audio_url: str = "", audio_urls: Optional[List[str]] = None) -> str:
     """
     ✅ TEK TUR = TEK Gather
+    audio_urls: cumle cumle TTS (pipeline) -> sirayla birden fazla <Play>
     """
     safe_text = _esc(ai_text)
 
     # session_id her zaman aksın
     action_url = _esc(f"{base_url}/api/phone/gather?slug={slug}&session_id={session_id}")
 
+    urls = [u for u in (audio_urls or []) if (u or "").startswith("http")]
+    if not urls and (audio_url or "").startswith("http"):
+        urls = [audio_url]
+
     play_or_say = (
-        f"<Play>{_esc(audio_url)}</Play>"
-        if (audio_url or "").startswith("http")
+        "\n        ".join(f"<Play>{_esc(u)}</Play>" for u in urls)
+        if urls
         else f"<Say language=\"tr-TR\">{safe_text}</Say>"
     )
 
@@ -132,41 +138,38 @@ def format_phone_for_twilio(phone: str) -> str:
     return "+90" + phone
 
 
-import re
-from typing import Optional, Tuple
+from datetime import date
+from typing import Tuple, Union
+from services.schedule import Schedule, get_schedule
 
-def _parse_working_hours_range(working_hours: str) -> Tuple[Optional[int], Optional[int]]:
-    """
-    "Pzt-Cuma 12:00-19:00" gibi stringten start_hour, end_hour alır.
-    """
-    if not working_hours:
-        return None, None
-    m = re.search(r"(\d{1,2})[:.]\d{2}\s*-\s*(\d{1,2})[:.]\d{2}", working_hours)
-    if not m:
-        return None, None
-    return int(m.group(1)), int(m.group(2))
-
-
-def normalize_ambiguous_time(hour: int, minute: int, working_hours: str) -> Tuple[int, int, bool]:
+def normalize_ambiguous_time(
+    hour: int, minute: int, working_hours: Union[Schedule, str], day: Optional[date] = None
+) -> Tuple[int, int, bool]:
     """
     Türkçe konuşmada '2 buçuk' çoğu zaman 14:30 demektir.
-    Kural: İşletme başlangıç saati >= 11 ise ve kullanıcı saati 1..7 verdiyse +12 uygula.
-    (02:30 -> 14:30)
+    Kural (gün bazında): hh:mm o günün çalışma aralıklarına uymuyor ama
+    (hh+12):mm uyuyorsa +12 uygula. (02:30 -> 14:30)
+    day verilmezse: hiçbir günün aralığına uymuyor, bir gününkine uyuyorsa.
+    working_hours: derlenmiş Schedule (ya da ham metin)
     Returns: (new_hour, new_minute, changed?)
     """
-    start_h, end_h = _parse_working_hours_range(working_hours)
+    sched = working_hours if isinstance(working_hours, Schedule) else get_schedule(working_hours or "")
 
-    # çalışma saatini okuyamadıysak dokunma
-    if start_h is None:
+    # çalışma saatini okuyamadıysak ya da saat zaten öğleden sonraysa dokunma
+    if not sched.has_hours or not 1 <= hour <= 11:
         return hour, minute, False
 
-    # işletme öğlen/öğleden sonra açılıyorsa ve saat çok erken gelmişse
-    if start_h >= 11 and 1 <= hour <= 7:
+    days = [sched.intervals(day)] if day is not None else list(sched.week)
+
+    def _open(h: int) -> bool:
+        m = h * 60 + minute
+        return any(s <= m < e for intervals in days for s, e in intervals)
+
+    if not _open(hour) and _open(hour + 12):
         return hour + 12, minute, True
 
     return hour, minute, False
 
-
 import re
 
 def should_end_call(ai_text: str) -> bool:
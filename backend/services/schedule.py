@@ -0,0 +1,258 @@
+# backend/services/schedule.py
+# ─────────────────────────────────────────────────
+# Çalışma saatleri: tek seferde derlenen Schedule
+#
+# Eskiden working_hours metni sıcak yolda 4 ayrı regex fonksiyonuyla
+# (calendar_service, database, main, phone_service) her seferinde
+# yeniden parse ediliyordu ve her biri farklı kural uyguluyordu
+# (ör. "Pazartesi-Cumartesi" bir yerde Pzt-Cmt, diğerinde Pzt-Cuma).
+#
+# Şimdi tek parser; sonuç (haftanın günü -> açık aralıklar, molalar
+# düşülmüş + kapalı tarihler) metin başına bir kez derlenir ve
+# önbellekte tutulur: aynı working_hours = aynı Schedule nesnesi.
+#
+# Anlaşılan biçimler (virgül / noktalı virgül / satır ile ayrılmış parçalar):
+#   "Pzt-Cuma 12:00-19:00"
+#   "Hafta içi 09:00-18:00, Cumartesi 10:00-14:00, Pazar kapalı"
+#   "Pzt, Çar, Cuma 9-17"
+#   "09:00-12:00 / 13:00-18:00"          (gün yok = her gün, 2 aralık)
+#   "Öğle arası 12:30-13:30"             (mola: o günlerden düşülür)
+#   "Pzt-Cmt 09:00-18:00 Öğle arası 12:30-13:30"  (önce açık saat, sonra mola)
+#   "Pazartesi-Cumartesi 09:00-18:00 arası"       ("arası" = between, mola değil)
+#   "01.01.2027 kapalı", "2027-04-23 tatil"
+# Saat yoksa 09:00-18:00; gün bilgisi hiç yoksa her gün açık.
+# ─────────────────────────────────────────────────
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+DEFAULT_START_MIN = 9 * 60
+DEFAULT_END_MIN = 18 * 60
+
+Interval = Tuple[int, int]  # gün içi dakika [başlangıç, bitiş)
+
+_FOLD = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u"})
+
+_DAY_TOKENS = {
+    "pzt": 0, "pts": 0, "pazartesi": 0,
+    "sal": 1, "sali": 1,
+    "car": 2, "crs": 2, "cars": 2, "carsamba": 2,
+    "per": 3, "prs": 3, "pers": 3, "persembe": 3,
+    "cum": 4, "cuma": 4,
+    "cmt": 5, "cts": 5, "cumartesi": 5,
+    "paz": 6, "pzr": 6, "pazar": 6,
+}
+_DAY_GROUPS = (
+    (re.compile(r"\bhafta\s*ici\b"), frozenset(range(5))),
+    (re.compile(r"\bhafta\s*sonu\b"), frozenset({5, 6})),
+    (re.compile(r"\bher\s*gun\b"), frozenset(range(7))),
+)
+_DAY_RANGE_RE = re.compile(r"\b([a-z]{2,9})\.?\s*[-–]\s*([a-z]{2,9})\b")
+_WORD_RE = re.compile(r"[a-z]+")
+_TIME_RANGE_RE = re.compile(r"(\d{1,2})(?:[:.]?(\d{2}))?\s*[-–]\s*(\d{1,2})(?:[:.]?(\d{2}))?")
+_DATE_RES = (
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), (1, 2, 3)),
+    (re.compile(r"\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b"), (3, 2, 1)),
+)
+_CLOSED_WORDS = {"kapali", "tatil"}
+# Mola işareti: SONRASINDAKİ saatler mola ("Öğle arası 12:30-13:30").
+# "09:00-18:00 arası" gibi sondaki "arası" = "between", mola değil.
+_BREAK_RE = re.compile(r"\b(ogle|mola|molasi|ara|arasi)\b")
+_BREAK_ONLY = {"ogle", "mola", "molasi"}  # saatten sonra da gelse mola ("12:30-13:30 öğle arası")
+
+
+def fold_text(text: str) -> str:
+    """Küçük harf + Türkçe karakter katlama (eşleştirme için; faq/llm de kullanır)."""
+    t = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    return t.translate(_FOLD)
+
+
+def _days_in(seg: str) -> Set[int]:
+    days: Set[int] = set()
+    for rx, group in _DAY_GROUPS:
+        if rx.search(seg):
+            days |= group
+    for m in _DAY_RANGE_RE.finditer(seg):
+        a, b = _DAY_TOKENS.get(m.group(1)), _DAY_TOKENS.get(m.group(2))
+        if a is None or b is None:
+            continue
+        cur = a
+        days.add(cur)
+        while cur != b:
+            cur = (cur + 1) % 7
+            days.add(cur)
+    for w in _WORD_RE.findall(seg):
+        if w in _DAY_TOKENS:
+            days.add(_DAY_TOKENS[w])
+    return days
+
+
+def _times_in(seg: str) -> List[Interval]:
+    out: List[Interval] = []
+    for m in _TIME_RANGE_RE.finditer(seg):
+        sh, sm = int(m.group(1)), int(m.group(2) or 0)
+        eh, em = int(m.group(3)), int(m.group(4) or 0)
+        if sh > 24 or eh > 24 or sm > 59 or em > 59:
+            continue
+        start, end = sh * 60 + sm, eh * 60 + em
+        if end > start:
+            out.append((start, end))
+    return out
+
+
+def _subtract(intervals: List[Interval], cut: Interval) -> List[Interval]:
+    out: List[Interval] = []
+    for s, e in intervals:
+        if cut[1] <= s or cut[0] >= e:
+            out.append((s, e))
+            continue
+        if s < cut[0]:
+            out.append((s, cut[0]))
+        if cut[1] < e:
+            out.append((cut[1], e))
+    return out
+
+
+class Schedule:
+    """Derlenmiş çalışma takvimi. Değişmez; işletmeler arasında paylaşılabilir."""
+
+    __slots__ = ("source", "week", "closures", "allowed_weekdays", "has_hours", "start_min", "end_min")
+
+    def __init__(
+        self,
+        source: str,
+        week: Tuple[Tuple[Interval, ...], ...],
+        closures: FrozenSet[date],
+        allowed_weekdays: Optional[FrozenSet[int]],
+        has_hours: bool,
+    ):
+        self.source = source
+        self.week = week
+        self.closures = closures
+        # None = metinde gün bilgisi yok (her gün açık sayılır)
+        self.allowed_weekdays = allowed_weekdays
+        self.has_hours = has_hours
+        opened = [iv for day in week for iv in day]
+        # Slot ızgarasının kapsadığı genel aralık
+        self.start_min = min((s for s, _ in opened), default=DEFAULT_START_MIN)
+        self.end_min = max((e for _, e in opened), default=DEFAULT_END_MIN)
+
+    @property
+    def start_hour(self) -> Optional[int]:
+        """Metinde açık saat yazıyorsa açılış saati, yoksa None."""
+        return self.start_min // 60 if self.has_hours else None
+
+    def intervals(self, d: date) -> Tuple[Interval, ...]:
+        if d in self.closures:
+            return ()
+        return self.week[d.weekday()]
+
+    def is_open_on(self, d: date) -> bool:
+        return bool(self.intervals(d))
+
+    def fits(self, start: datetime, duration_minutes: int) -> bool:
+        """[start, start+süre) tek bir açık aralığın içinde mi?"""
+        m = start.hour * 60 + start.minute
+        end = m + max(duration_minutes, 1)
+        return any(s <= m and end <= e for s, e in self.intervals(start.date()))
+
+    def __repr__(self) -> str:
+        return f"Schedule({self.source!r})"
+
+
+@lru_cache(maxsize=1024)
+def get_schedule(working_hours: str) -> Schedule:
+    """working_hours metni -> Schedule (metin başına bir kez derlenir)."""
+    source = working_hours or ""
+    per_day: Dict[int, List[Interval]] = {}
+    default: List[Interval] = []
+    closed_days: Set[int] = set()
+    closures: Set[date] = set()
+    breaks: List[Tuple[Set[int], Interval]] = []
+    pending_days: Set[int] = set()  # "Pzt, Çar, Cuma 9-17": saatsiz gün parçaları sonrakine bağlanır
+    day_info = False
+    has_hours = False
+
+    for raw in re.split(r"[,;\n]+", fold_text(source)):
+        seg = raw.strip()
+        if not seg:
+            continue
+
+        dates = []
+        for rx, (yi, mi, di) in _DATE_RES:
+            for m in rx.finditer(seg):
+                try:
+                    dates.append(date(int(m.group(yi)), int(m.group(mi)), int(m.group(di))))
+                except ValueError:
+                    pass
+            seg = rx.sub(" ", seg)
+
+        words = set(_WORD_RE.findall(seg))
+        days = _days_in(seg)
+        times = _times_in(seg)
+
+        if words & _CLOSED_WORDS:
+            closures.update(dates)
+            if days:
+                closed_days |= days
+                day_info = True
+            continue
+
+        m = _BREAK_RE.search(seg)
+        if m:
+            cut = _times_in(seg[m.end():])
+            times = _times_in(seg[:m.start()])  # işaretten önceki saatler açık saat
+            if not cut and m.group(1) in _BREAK_ONLY:
+                cut, times = times, []
+            if cut:
+                breaks.extend((days | pending_days, iv) for iv in cut)
+                if not times:
+                    pending_days = set()
+                    continue
+            else:
+                times = _times_in(seg)  # "09:00-18:00 arası": mola yok
+
+        if not times:
+            pending_days |= days
+            continue
+
+        has_hours = True
+        days |= pending_days
+        pending_days = set()
+        if days:
+            day_info = True
+            for d in days:
+                per_day.setdefault(d, []).extend(times)
+        else:
+            default.extend(times)
+
+    if pending_days:
+        # Saat verilmemiş günler: genel saat (ya da varsayılan)
+        day_info = True
+        for d in pending_days:
+            per_day.setdefault(d, [])
+
+    base = default or [(DEFAULT_START_MIN, DEFAULT_END_MIN)]
+    week: List[Tuple[Interval, ...]] = []
+    for wd in range(7):
+        if wd in closed_days:
+            ivs: List[Interval] = []
+        elif wd in per_day:
+            ivs = per_day[wd] or list(base)
+        elif day_info and per_day:
+            ivs = []  # gün listesi verilmiş, bu gün yok -> kapalı
+        else:
+            ivs = list(base)
+        for days, cut in breaks:
+            if not days or wd in days:
+                ivs = _subtract(ivs, cut)
+        week.append(tuple(sorted(set(ivs))))
+
+    allowed = frozenset(wd for wd in range(7) if week[wd]) if day_info else None
+    return Schedule(source, tuple(week), frozenset(closures), allowed, has_hours)
+
+
+def schedule_for(biz: Optional[dict]) -> Schedule:
+    return get_schedule((biz or {}).get("working_hours", "") or "")
@@ -0,0 +1,230 @@
+# backend/services/session_backend.py
+# ─────────────────────────────────────────────────
+# Oturum kalıcılığı (SessionStore'un arkası)
+#
+# Twilio her /api/phone/gather turunu bağımsız bir HTTP isteği olarak
+# gönderir. Birden fazla uvicorn worker'ı varsa ya da arama ortasında
+# restart olursa process içi oturum (LLM geçmişi, booking state) kaybolur,
+# arayan baştan başlar.
+#
+# Arayüz (SessionBackend):
+#   fetch(ns, key, have_rev) -> (rev, blob) | None   bizdekinden yeni kayıt varsa
+#   save(ns, key, rev, blob)                         bloklamaz (write-behind)
+#   delete(ns, key)                                  bloklamaz
+#   expire(ns, idle_ttl) -> int                      boşta kalanları sil
+#   flush()                                          bekleyenleri yaz (shutdown)
+#
+# MemoryBackend : hiçbir şey saklamaz (SessionStore zaten bellekte) = eski davranış
+# SQLiteSessionBackend:
+#   - session_state tablosu (namespace, key) PK, WITHOUT ROWID
+#   - write-behind: kayıtlar kuyrukta birikir, "session-wb" thread'i
+#     SESSION_FLUSH_SECONDS aralıkla hepsini TEK transaction'da yazar
+#     (aynı oturumun art arda kayıtları tek satıra iner)
+#   - rev: her kayıtta artar; eski rev yeni kaydın üstüne yazamaz
+#   - blob: kompakt JSON, SESSION_COMPRESS_MIN_BYTES üstü zlib
+# ─────────────────────────────────────────────────
+
+import json, os, sqlite3, sys, threading, time, zlib
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SESSION_BACKEND, SESSION_FLUSH_SECONDS, SESSION_COMPRESS_MIN_BYTES
+from services.db_pool import get_connection
+
+_RAW = b"j"
+_ZLIB = b"z"
+
+
+def encode_blob(obj: Any) -> bytes:
+    raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= SESSION_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+
+def decode_blob(blob: bytes) -> Any:
+    head, body = blob[:1], blob[1:]
+    if head == _ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body.decode("utf-8"))
+
+
+class SessionBackend:
+    shared = False  # True: başka worker'lar da yazabilir, okumada kontrol et
+
+    def fetch(self, namespace: str, key: str, have_rev: int) -> Optional[Tuple[int, bytes]]:
+        return None
+
+    def save(self, namespace: str, key: str, rev: int, blob: bytes):
+        pass
+
+    def delete(self, namespace: str, key: str):
+        pass
+
+    def expire(self, namespace: str, idle_ttl: float) -> int:
+        return 0
+
+    def flush(self):
+        pass
+
+    def info(self) -> dict:
+        return {"backend": "memory"}
+
+
+class MemoryBackend(SessionBackend):
+    pass
+
+
+class SQLiteSessionBackend(SessionBackend):
+    shared = True
+
+    def __init__(self, flush_seconds: float = SESSION_FLUSH_SECONDS):
+        self.flush_seconds = max(0.0, flush_seconds)
+        # (ns, key) -> (rev, blob, touched) | None (=sil)
+        self._pending: Dict[Tuple[str, str], Optional[Tuple[int, bytes, float]]] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = False
+        self.stats: Dict[str, int] = {"saves": 0, "deletes": 0, "flushes": 0, "rows_written": 0, "fetched": 0, "expired": 0}
+
+    def _conn(self):
+        conn = get_connection()
+        if not self._ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_state (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    rev INTEGER NOT NULL,
+                    touched REAL NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_touched ON session_state(namespace, touched)")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    # ── okuma (DB executor thread'inde çağrılır) ──
+    def fetch(self, namespace: str, key: str, have_rev: int) -> Optional[Tuple[int, bytes]]:
+        with self._cond:
+            pending = self._pending.get((namespace, key), False)
+        if pending is None:
+            return None  # bu worker silmiş, henüz yazılmadı
+        if pending is not False and pending[0] > have_rev:
+            return pending[0], pending[1]
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT rev, data FROM session_state WHERE namespace = ? AND key = ? AND rev > ?",
+            (namespace, key, have_rev),
+        ).fetchone()
+        conn.close()
+        if not row:
+            return None
+        self.stats["fetched"] += 1
+        return int(row[0]), bytes(row[1])
+
+    # ── yazma (event loop'tan; sadece kuyruğa ekler) ──
+    def _enqueue(self, k: Tuple[str, str], item):
+        with self._cond:
+            self._pending[k] = item
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="session-wb", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def save(self, namespace: str, key: str, rev: int, blob: bytes):
+        self.stats["saves"] += 1
+        self._enqueue((namespace, key), (rev, blob, time.time()))
+
+    def delete(self, namespace: str, key: str):
+        self.stats["deletes"] += 1
+        self._enqueue((namespace, key), None)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Pencere boyunca gelenleri de topla
+            if self.flush_seconds:
+                time.sleep(self.flush_seconds)
+            try:
+                self._write_pending()
+            except Exception as e:
+                print(f"[SESSION] write-behind hatası: {e}")
+                time.sleep(1.0)
+
+    def _write_pending(self):
+        with self._cond:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        upserts = [(ns, key, it[0], it[2], sqlite3.Binary(it[1])) for (ns, key), it in batch.items() if it is not None]
+        deletes = [k for k, it in batch.items() if it is None]
+
+        conn = self._conn()
+        try:
+            with conn:
+                if upserts:
+                    conn.executemany(
+                        """
+                        INSERT INTO session_state (namespace, key, rev, touched, data)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(namespace, key) DO UPDATE SET
+                            rev = excluded.rev, touched = excluded.touched, data = excluded.data
+                        WHERE excluded.rev >= session_state.rev
+                        """,
+                        upserts,
+                    )
+                if deletes:
+                    conn.executemany("DELETE FROM session_state WHERE namespace = ? AND key = ?", deletes)
+        except sqlite3.Error:
+            # Yazılamadı: daha yeni bir kayıt gelmediyse geri kuyruğa koy
+            with self._cond:
+                for k, it in batch.items():
+                    self._pending.setdefault(k, it)
+            raise
+        finally:
+            conn.close()
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(batch)
+
+    def expire(self, namespace: str, idle_ttl: float) -> int:
+        if idle_ttl <= 0:
+            return 0
+        conn = self._conn()
+        try:
+            with conn:
+                n = conn.execute(
+                    "DELETE FROM session_state WHERE namespace = ? AND touched < ?",
+                    (namespace, time.time() - idle_ttl),
+                ).rowcount
+        finally:
+            conn.close()
+        self.stats["expired"] += n
+        return n
+
+    def flush(self):
+        self._write_pending()
+
+    def info(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {"backend": "sqlite", **self.stats, "pending": pending}
+
+
+_BACKEND: Optional[SessionBackend] = None
+
+
+def get_session_backend() -> SessionBackend:
+    global _BACKEND
+    if _BACKEND is None:
+        if SESSION_BACKEND == "sqlite":
+            _BACKEND = SQLiteSessionBackend()
+        else:
+            if SESSION_BACKEND != "memory":
+                print(f"[SESSION] Bilinmeyen SESSION_BACKEND={SESSION_BACKEND!r}, memory kullanılıyor")
+            _BACKEND = MemoryBackend()
+    return _BACKEND
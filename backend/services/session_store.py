@@ -0,0 +1,211 @@
+# backend/services/session_store.py
+# ─────────────────────────────────────────────────
+# Sınırlı, kendini temizleyen oturum deposu
+#
+# Eski hali: llm_service.sessions ve main.PHONE_STATE düz dict'ti;
+# sadece reset / başarılı booking'de küçülüyordu. Yarım bırakılan web
+# sohbetleri ve kapatılan aramalar sonsuza kadar bellekte kalıyordu
+# (PHONE_STATE süre kontrolü de sadece aynı oturum geri gelirse yapılıyordu).
+#
+# Şimdi:
+#   - LRU sırası (OrderedDict): her erişim kaydı sona taşır
+#   - max kayıt: dolunca en uzun süredir dokunulmayan atılır
+#   - boşta kalma TTL'i: okumada süresi geçmiş kayıt yok sayılır,
+#     arka plandaki sweeper da periyodik olarak temizler
+#   - kayıtlar __slots__ (dict başına ~100 B ek yük yok)
+#   - sayaçlar + yaklaşık bellek (/health); bellek sweep sırasında ölçülür
+#
+# Kalıcılık (session_backend.py): bu depo bellek içi katman (L1).
+#   save(key)     : tur sonunda çağrılır -> rev++ ve backend'e (write-behind)
+#   refresh(key)  : tur başında; paylaşımlı backend'de başka worker daha
+#                   yeni rev yazdıysa onu yükler (ör. Twilio turu başka worker'a düştü)
+#   L1'den kapasite yüzünden atılan oturum backend'den geri gelir.
+# ─────────────────────────────────────────────────
+
+import asyncio, os, sys, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SESSION_MAX_ENTRIES, SESSION_IDLE_TTL, SESSION_SWEEP_SECONDS
+from services.db_executor import run_db_read, run_db_write
+from services.session_backend import SessionBackend, get_session_backend, encode_blob, decode_blob
+
+
+class _Record:
+    __slots__ = ("value", "created", "touched", "rev")
+
+    def __init__(self, value: Any, now: float, rev: int = 0):
+        self.value = value
+        self.created = now
+        self.touched = now
+        self.rev = rev
+
+
+def approx_size(obj: Any, _depth: int = 0) -> int:
+    """Kaba bellek tahmini (sadece sweep/metrik için, sıcak yolda çağrılmaz)."""
+    size = sys.getsizeof(obj)
+    if _depth > 4:
+        return size
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, _depth + 1) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(approx_size(getattr(obj, s, None), _depth + 1) for s in obj.__slots__)
+    return size
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class SessionStore:
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        backend: Optional[SessionBackend] = None,
+        dump: Callable[[Any], Any] = _identity,
+        load: Callable[[Any], Any] = _identity,
+    ):
+        """dump/load: değer <-> JSON'lanabilir nesne (backend için)."""
+        self.name = name
+        self.max_entries = max(1, max_entries)
+        self.idle_ttl = idle_ttl
+        self.backend = backend if backend is not None else get_session_backend()
+        self._dump = dump
+        self._load = load
+        self._items: "OrderedDict[str, _Record]" = OrderedDict()
+        self._approx_bytes = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0, "misses": 0, "created": 0,
+            "evicted_idle": 0, "evicted_capacity": 0, "peak": 0,
+            "saved": 0, "restored": 0,
+        }
+
+    def _expired(self, rec: _Record, now: float) -> bool:
+        return self.idle_ttl > 0 and now - rec.touched > self.idle_ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        rec = self._items.get(key)
+        if rec is None:
+            self.stats["misses"] += 1
+            return None
+        now = time.monotonic()
+        if self._expired(rec, now):
+            del self._items[key]
+            self.stats["evicted_idle"] += 1
+            self.stats["misses"] += 1
+            return None
+        rec.touched = now
+        self._items.move_to_end(key)
+        self.stats["hits"] += 1
+        return rec.value
+
+    def put(self, key: str, value: Any, rev: Optional[int] = None):
+        now = time.monotonic()
+        rec = self._items.get(key)
+        if rec is not None:
+            rec.value = value
+            rec.touched = now
+            if rev is not None:
+                rec.rev = rev
+            self._items.move_to_end(key)
+            return
+        self._items[key] = _Record(value, now, rev or 0)
+        if rev is None:
+            self.stats["created"] += 1
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.stats["evicted_capacity"] += 1
+        self.stats["peak"] = max(self.stats["peak"], len(self._items))
+
+    def get_or_create(self, key: str, factory: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def pop(self, key: str) -> Optional[Any]:
+        rec = self._items.pop(key, None)
+        self.backend.delete(self.name, key)
+        return rec.value if rec is not None else None
+
+    # ── kalıcılık ──
+    def save(self, key: str):
+        """Tur sonu: güncel değeri backend'e yaz (bloklamaz)."""
+        rec = self._items.get(key)
+        if rec is None:
+            return  # bu tur içinde silinmiş (ör. booking tamamlandı)
+        # Saat tabanlı rev: silinip yeniden oluşan oturum eski satırın altında kalmasın
+        rec.rev = max(rec.rev + 1, int(time.time() * 1_000_000))
+        self.stats["saved"] += 1
+        if self.backend.shared:
+            self.backend.save(self.name, key, rec.rev, encode_blob(self._dump(rec.value)))
+
+    async def refresh(self, key: str):
+        """Tur başı: başka worker/önceki process daha yeni kayıt yazdıysa onu al."""
+        if not self.backend.shared:
+            return
+        rec = self._items.get(key)
+        have = rec.rev if rec is not None and not self._expired(rec, time.monotonic()) else -1
+        try:
+            found = await run_db_read(self.backend.fetch, self.name, key, have)
+        except Exception as e:
+            print(f"[SESSION] {self.name} okuma hatası: {e}")
+            return
+        if found is None:
+            return
+        rev, blob = found
+        self.put(key, self._load(decode_blob(blob)), rev=rev)
+        self.stats["restored"] += 1
+
+    async def aget_or_create(self, key: str, factory: Callable[[], Any]) -> Any:
+        await self.refresh(key)
+        return self.get_or_create(key, factory)
+
+    def __contains__(self, key: str) -> bool:
+        rec = self._items.get(key)
+        return rec is not None and not self._expired(rec, time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def sweep(self) -> int:
+        """Süresi geçenleri at (LRU sırası: ilk taze kayıtta dur). Bellek tahminini günceller."""
+        now = time.monotonic()
+        dropped = 0
+        while self._items:
+            key, rec = next(iter(self._items.items()))
+            if not self._expired(rec, now):
+                break
+            del self._items[key]
+            dropped += 1
+        self.stats["evicted_idle"] += dropped
+        self._approx_bytes = sum(approx_size(r.value) for r in self._items.values())
+        return dropped
+
+    async def run_sweeper(self, interval: float = SESSION_SWEEP_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                n = self.sweep()
+                if self.backend.shared:
+                    n += await run_db_write(self.backend.expire, self.name, self.idle_ttl)
+                if n:
+                    print(f"[SESSION] {self.name}: {n} boşta oturum silindi ({len(self._items)} kaldı)")
+            except Exception as e:
+                print(f"[SESSION] {self.name} sweep hatası: {e}")
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self._items),
+            "max_entries": self.max_entries,
+            "idle_ttl": self.idle_ttl,
+            "approx_bytes": self._approx_bytes,
+            "backend": self.backend.info().get("backend"),
+        }
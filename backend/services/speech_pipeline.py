@@ -0,0 +1,113 @@
+# backend/services/speech_pipeline.py
+# ─────────────────────────────────────────────────
+# LLM stream -> cumle cumle TTS pipeline
+#
+# Onceden: LLM cevabi TAMAMEN bitsin -> sonra TTS -> sonra TwiML
+#   ilk ses = LLM suresi + TTS suresi
+# Simdi: token'lar geldikce cumle sinirinda kesilir, her cumle icin
+# TTS hemen baslar (LLM geri kalani uretmeye devam ederken).
+#   ilk ses ~= ilk cumlenin LLM suresi + TTS suresi
+#
+# "RANDEVU: ..." satiri seslendirilmez (backend booking satiri).
+# ─────────────────────────────────────────────────
+
+import asyncio, re, sys, os
+from typing import AsyncIterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.llm_service import chat_stream, _dedupe_repeats
+from services.tts_service import synthesize_speech
+
+# Cumle sonu: . ! ? … + bosluk, ya da satir sonu.
+# "14.30" / "16.02.2026" bolunmez (noktadan sonra bosluk yok).
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')]*\s+|\n+")
+
+# Cok kisa parcalari (ör. "Tabii.") bir sonrakiyle birlestir; TTS cagri sayisi azalsin
+MIN_SENTENCE_CHARS = 24
+
+_BOOKING_LINE = re.compile(r"RANDEVU:.*", flags=re.DOTALL)
+
+
+def pop_sentences(buf: str, final: bool = False) -> Tuple[List[str], str]:
+    """
+    Buffer'dan tamamlanmis cumleleri ayirir.
+    Returns: (cumleler, kalan_buffer)
+    final=True ise kalan da cumle sayilir.
+    """
+    out: List[str] = []
+    start = 0
+    pending = ""
+    for m in _SENTENCE_END.finditer(buf):
+        piece = buf[start:m.end()]
+        start = m.end()
+        pending += piece
+        if len(pending.strip()) >= MIN_SENTENCE_CHARS or "\n" in piece:
+            if pending.strip():
+                out.append(pending.strip())
+            pending = ""
+
+    rest = pending + buf[start:]
+    if final:
+        if rest.strip():
+            out.append(rest.strip())
+        rest = ""
+    return out, rest
+
+
+async def iter_sentences(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    buf = ""
+    async for tok in tokens:
+        buf += tok
+        sentences, buf = pop_sentences(buf)
+        for s in sentences:
+            yield s
+    sentences, _ = pop_sentences(buf, final=True)
+    for s in sentences:
+        yield s
+
+
+def _speakable(sentence: str) -> str:
+    """RANDEVU satirini seslendirme; oncesindeki kismi birak."""
+    return _BOOKING_LINE.sub("", sentence or "").strip()
+
+
+async def stream_reply_with_tts(
+    user_message: str,
+    session_id: str,
+    business_config: dict,
+) -> Tuple[str, List[Tuple[str, "asyncio.Task"]]]:
+    """
+    LLM'i stream eder, her cumle icin TTS task'ini hemen baslatir.
+    Returns: (tam_cevap_metni, [(cumle, tts_task), ...])
+    tts_task sonucu synthesize_speech ile ayni: (bytes, fmt)
+    """
+    full = ""
+    pieces: List[Tuple[str, asyncio.Task]] = []
+
+    async def _tokens():
+        nonlocal full
+        async for tok in chat_stream(user_message, session_id, business_config):
+            full += tok
+            yield tok
+
+    async for sentence in iter_sentences(_tokens()):
+        spoken = _speakable(sentence)
+        if not spoken:
+            continue
+        task = asyncio.create_task(synthesize_speech(spoken))
+        pieces.append((spoken, task))
+        if len(pieces) == 1:
+            print(f"[PIPE] ilk cumle TTS basladi: \"{spoken[:50]}\"")
+
+    return _dedupe_repeats(full), pieces
+
+
+def same_spoken_text(a: str, b: str) -> bool:
+    """Bosluk/satir farklarini yok sayarak karsilastir."""
+    return " ".join((a or "").split()) == " ".join((b or "").split())
+
+
+def cancel_pieces(pieces: List[Tuple[str, "asyncio.Task"]]):
+    for _, task in pieces:
+        if not task.done():
+            task.cancel()
@@ -17,9 +17,10 @@
 # Ayrica temperature=0.0 cok daha tutarli sonuc verir.
 # ─────────────────────────────────────────────────
 
-import httpx, json, sys, os
+import json, sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import FAL_API_KEY, FAL_STT_URL
+from services.http_client import get_http_client
 
 
 def build_stt_prompt(biz: dict = None) -> str:
@@ -84,33 +85,34 @@ async def transcribe_audio(audio_bytes: bytes, filename: str = "audio.wav", busi
     print(f"[STT] {len(audio_bytes)} byte, mime={mime}")
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(
-                FAL_STT_URL,
-                headers={"Authorization": f"Key {FAL_API_KEY}"},
-                files={"file": (filename, audio_bytes, mime)},
-                data={
-                    "model": "freya-stt-v1",     # DOCS'ta var, onceden gondermiyorduk!
-                    "language": "tr",
-                    "prompt": prompt,             # Baglam ipucu
-                    "response_format": "verbose_json",  # Daha detayli cevap
-                    "temperature": "0.1",         # Deterministik = daha tutarli
-                }
-            )
-            
-            print(f"[STT] Status: {resp.status_code}")
-            
-            if resp.status_code != 200:
-                print(f"[STT] Hata: {resp.text[:300]}")
-                return ""
-            
-            data = resp.json()
-            print(f"[STT] Raw: {json.dumps(data, ensure_ascii=False)[:400]}")
-            
-            text = _extract(data)
-            print(f"[STT] Sonuc: \"{text}\"")
-            return text
-            
+        client = get_http_client()
+        resp = await client.post(
+            FAL_STT_URL,
+            headers={"Authorization": f"Key {FAL_API_KEY}"},
+            files={"file": (filename, audio_bytes, mime)},
+            data={
+                "model": "freya-stt-v1",     # DOCS'ta var, onceden gondermiyorduk!
+                "language": "tr",
+                "prompt": prompt,             # Baglam ipucu
+                "response_format": "verbose_json",  # Daha detayli cevap
+                "temperature": "0.1",         # Deterministik = daha tutarli
+            },
+            timeout=30.0,
+        )
+        
+        print(f"[STT] Status: {resp.status_code}")
+        
+        if resp.status_code != 200:
+            print(f"[STT] Hata: {resp.text[:300]}")
+            return ""
+        
+        data = resp.json()
+        print(f"[STT] Raw: {json.dumps(data, ensure_ascii=False)[:400]}")
+        
+        text = _extract(data)
+        print(f"[STT] Sonuc: \"{text}\"")
+        return text
+        
     except Exception as e:
         print(f"[STT] Hata: {e}")
         return ""
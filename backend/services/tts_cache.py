@@ -0,0 +1,192 @@
+# backend/services/tts_cache.py
+# ─────────────────────────────────────────────────
+# TTS cache (content-addressed)
+#
+# Asistan ayni cumleleri tekrar tekrar soyluyor:
+#   "Sizi tam duyamadim...", karsilama, "Randevuyu tamamlamak icin..."
+# Her seferinde Freya'ya gitmek 1-2 sn. Bu modul:
+#   - anahtar = sha256(normalize(metin) | voice | format)
+#   - 1. katman: bellek ici LRU (byte limitli)
+#   - 2. katman: disk (TTS_CACHE_DIR), boyut limitli, restart'ta korunur
+#     eviction: en eski erisim (mtime, hit'te guncellenir)
+#   - event loop'ta sadece bellek katmani: disk okumalari thread'de
+#     (asyncio.to_thread), yazma + eviction tek "tts-disk" thread'inde arka planda
+# ─────────────────────────────────────────────────
+
+import asyncio, hashlib, os, sys, unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    TTS_CACHE_ENABLED,
+    TTS_CACHE_DIR,
+    TTS_CACHE_MEMORY_MAX_BYTES,
+    TTS_CACHE_DISK_MAX_BYTES,
+)
+
+_FORMATS = ("wav", "mp3")
+
+# Disk yazma/eviction sirayla, loop'u bekletmeden
+_DISK_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-disk")
+
+
+def normalize_text(text: str) -> str:
+    """Ayni cumlenin kucuk yazim farklari ayni anahtara dussun."""
+    t = unicodedata.normalize("NFC", text or "")
+    return " ".join(t.split())
+
+
+def cache_key(text: str, voice: str = "", fmt: str = "") -> str:
+    raw = f"{normalize_text(text)}|{voice or 'default'}|{fmt or 'default'}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory: str, memory_max_bytes: int, disk_max_bytes: int):
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+
+        self._mem: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes = 0  # sadece tts-disk thread'i yazar
+        self.stats: Dict[str, int] = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"[TTS-CACHE] Disk katmani kapali: {e}")
+            self.directory = ""
+        else:
+            _DISK_EXECUTOR.submit(self._disk_scan)
+
+    # ── bellek katmani ──
+    def _mem_put(self, key: str, data: bytes, fmt: str):
+        if len(data) > self.memory_max_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old:
+            self._mem_bytes -= len(old[0])
+        self._mem[key] = (data, fmt)
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self.memory_max_bytes and self._mem:
+            _, (d, _) = self._mem.popitem(last=False)
+            self._mem_bytes -= len(d)
+
+    # ── disk katmani ──
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _disk_scan(self):
+        try:
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+        except OSError as e:
+            print(f"[TTS-CACHE] Disk tarama hatasi: {e}")
+            return
+        print(f"[TTS-CACHE] Disk: {self.directory} ({self._disk_bytes // 1024} KB)")
+
+    def _disk_entries(self):
+        for name in os.listdir(self.directory):
+            key, _, ext = name.partition(".")
+            if ext not in _FORMATS:
+                continue
+            p = os.path.join(self.directory, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            yield p, st.st_mtime, st.st_size
+
+    def _disk_get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        if not self.directory:
+            return None
+        for fmt in _FORMATS:
+            p = self._path(key, fmt)
+            try:
+                with open(p, "rb") as f:
+                    data = f.read()
+                os.utime(p, None)  # LRU: son erisim
+                return data, fmt
+            except OSError:
+                continue
+        return None
+
+    def _disk_put(self, key: str, data: bytes, fmt: str):
+        """tts-disk thread'inde."""
+        p = self._path(key, fmt)
+        if os.path.exists(p):
+            return
+        tmp = f"{p}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, p)  # atomik
+            self._disk_bytes += len(data)
+        except OSError as e:
+            print(f"[TTS-CACHE] Disk yazma hatasi: {e}")
+            return
+        if self._disk_bytes > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        # %90'a kadar indir, her yazmada tekrar taranmasin
+        target = int(self.disk_max_bytes * 0.9)
+        for p, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+                total -= size
+                self.stats["evictions"] += 1
+            except OSError:
+                continue
+        self._disk_bytes = total
+
+    # ── public (event loop'tan) ──
+    async def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        item = self._mem.get(key)
+        if item is not None:
+            self._mem.move_to_end(key)
+            self.stats["mem_hits"] += 1
+            return item
+
+        item = await asyncio.to_thread(self._disk_get, key)
+        if item is not None:
+            self._mem_put(key, item[0], item[1])
+            self.stats["disk_hits"] += 1
+            return item
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, data: bytes, fmt: str):
+        """Bellege hemen, diske arka planda (bloklamaz)."""
+        if not data:
+            return
+        self._mem_put(key, data, fmt)
+        if self.directory and len(data) <= self.disk_max_bytes:
+            _DISK_EXECUTOR.submit(self._disk_put, key, data, fmt)
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "mem_items": len(self._mem),
+            "mem_bytes": self._mem_bytes,
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+_CACHE: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    global _CACHE
+    if not TTS_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        _CACHE = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MEMORY_MAX_BYTES, TTS_CACHE_DISK_MAX_BYTES)
+    return _CACHE
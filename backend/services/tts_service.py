@@ -1,36 +1,57 @@
 # backend/services/tts_service.py
-import httpx, json, sys, os
+import sys, os
 from typing import Tuple
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import FAL_API_KEY, FAL_TTS_URL
+from config import FAL_API_KEY, FAL_TTS_URL, TTS_VOICE, TTS_RESPONSE_FORMAT
+from services.http_client import get_http_client
+from services.tts_cache import get_tts_cache, cache_key
 
-async def synthesize_speech(text: str) -> Tuple[bytes, str]:
+async def synthesize_speech(text: str, use_cache: bool = True) -> Tuple[bytes, str]:
     if not text or not text.strip():
         return b"", "wav"
+
+    # Cache: ayni metin + ses + format -> Freya'ya gitme
+    cache = get_tts_cache() if use_cache else None
+    key = cache_key(text, TTS_VOICE, TTS_RESPONSE_FORMAT)
+    if cache:
+        hit = await cache.get(key)
+        if hit:
+            print(f"[TTS] cache hit \"{text[:50]}\"")
+            return hit
+
     print(f"[TTS] \"{text[:50]}\"")
+    payload = {"input": text, "language": "tr"}
+    if TTS_VOICE:
+        payload["voice"] = TTS_VOICE
+    if TTS_RESPONSE_FORMAT:
+        payload["response_format"] = TTS_RESPONSE_FORMAT
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            resp = await client.post(FAL_TTS_URL,
-                headers={"Authorization": f"Key {FAL_API_KEY}", "Content-Type": "application/json"},
-                json={"input": text, "language": "tr"})
-            if resp.status_code != 200:
-                print(f"[TTS] Hata {resp.status_code}: {resp.text[:200]}")
-                return b"", "wav"
-            ct = resp.headers.get("content-type", "")
-            if "audio" in ct or len(resp.content) > 1000:
-                fmt = "wav"
-                if "mpeg" in ct or "mp3" in ct: fmt = "mp3"
-                print(f"[TTS] -> {len(resp.content)} bytes ({fmt})")
-                return resp.content, fmt
-            if "json" in ct:
-                data = resp.json()
-                for k in ["url","audio_url","output_url"]:
-                    u = data.get(k) or data.get("output",{}).get(k,"")
-                    if isinstance(u, str) and u.startswith("http"):
-                        ar = await client.get(u)
-                        if ar.status_code == 200:
-                            return ar.content, "wav"
+        client = get_http_client()
+        resp = await client.post(FAL_TTS_URL,
+            headers={"Authorization": f"Key {FAL_API_KEY}", "Content-Type": "application/json"},
+            json=payload, timeout=8.0)
+        if resp.status_code != 200:
+            print(f"[TTS] Hata {resp.status_code}: {resp.text[:200]}")
             return b"", "wav"
+        ct = resp.headers.get("content-type", "")
+        if "audio" in ct or len(resp.content) > 1000:
+            fmt = "wav"
+            if "mpeg" in ct or "mp3" in ct: fmt = "mp3"
+            print(f"[TTS] -> {len(resp.content)} bytes ({fmt})")
+            if cache:
+                cache.put(key, resp.content, fmt)
+            return resp.content, fmt
+        if "json" in ct:
+            data = resp.json()
+            for k in ["url","audio_url","output_url"]:
+                u = data.get(k) or data.get("output",{}).get(k,"")
+                if isinstance(u, str) and u.startswith("http"):
+                    ar = await client.get(u, timeout=8.0)
+                    if ar.status_code == 200:
+                        if cache:
+                            cache.put(key, ar.content, "wav")
+                        return ar.content, "wav"
+        return b"", "wav"
     except Exception as e:
         print(f"[TTS] Hata: {e}")
-        return b"", "wav"
\ No newline at end of file
+        return b"", "wav"
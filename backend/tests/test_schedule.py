@@ -0,0 +1,45 @@
+# services/schedule.py için regresyon testleri (çalışma saati metni ayrıştırma)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.schedule import get_schedule
+
+
+def _hm(h, m=0):
+    return h * 60 + m
+
+
+FULL = ((_hm(9), _hm(18)),)
+LUNCH = ((_hm(9), _hm(12, 30)), (_hm(13, 30), _hm(18)))
+
+
+def test_trailing_arasi_is_not_a_break():
+    week = get_schedule("Pazartesi-Cumartesi 09:00-18:00 arası").week
+    assert list(week[:6]) == [FULL] * 6
+    assert week[6] == ()
+
+
+def test_break_after_hours_in_same_segment():
+    week = get_schedule("Pzt-Cmt 09:00-18:00 Öğle arası 12:30-13:30").week
+    assert list(week[:6]) == [LUNCH] * 6
+    assert week[6] == ()
+
+
+def test_break_in_own_segment_applies_to_previous_days():
+    week = get_schedule("Pzt-Cuma 09:00-18:00, Öğle arası 12:30-13:30").week
+    assert list(week[:5]) == [LUNCH] * 5
+    assert week[5] == week[6] == ()
+
+
+def test_break_before_keyword():
+    week = get_schedule("Pzt-Cuma 09:00-18:00, 12:30-13:30 öğle arası").week
+    assert list(week[:5]) == [LUNCH] * 5
+
+
+def test_day_groups_and_closed_day():
+    week = get_schedule("Hafta içi 09:00-18:00, Cumartesi 10:00-14:00, Pazar kapalı").week
+    assert list(week[:5]) == [FULL] * 5
+    assert week[5] == ((_hm(10), _hm(14)),)
+    assert week[6] == ()